@@ -1,12 +1,17 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression
 import plotly.graph_objects as go
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
+
+from src.cache import bytes_digest, cached_frame
+from src.data_loader import load_fleet_csv
+from src.downsample import minmax_downsample
+from src.forecast import Z_P90, fit_fleet, apply_stress, forecast_fleet
+from src import instrument
+from src.instrument import read_metrics, stage
+from src.optimizer import optimize_assignment
+from src.report_service import ReportService, engine_jobs, fleet_payload
+from src.risk_index import STATUS_BINS, STATUSES, RiskIndex
 
 # ----------------------------
 # Config
@@ -81,30 +86,46 @@ def load_demo_fleet():
 # Forecast Functions
 # ----------------------------
 def forecast_engine(df, stress_factor=1.0):
-    X = df["Cycles"].values.reshape(-1, 1)
-    y = df["EGT_Margin"].values
-    model = LinearRegression().fit(X, y)
-    slope, intercept = float(model.coef_[0]) * stress_factor, float(model.intercept_)
-    def to_threshold(th): return (th - intercept) / slope if slope != 0 else np.inf
+    """Single-engine forecast (kept for ad-hoc use; pages use forecast_fleet)."""
+    f = forecast_fleet(df.assign(Engine_ID=0), stress_factor).iloc[0]
     return {
-        "slope": slope,
-        "intercept": intercept,
-        "preventive_cycles": to_threshold(50),
-        "predictive_cycles": to_threshold(30)
+        "slope": f["slope"],
+        "intercept": f["intercept"],
+        "preventive_cycles": f["preventive_cycles"],
+        "predictive_cycles": f["predictive_cycles"]
     }
 
-def plot_fleet(df, forecasts):
-    fig = go.Figure()
-    for eng in df["Engine_ID"].unique():
-        sub = df[df.Engine_ID==eng]
-        f = forecasts[eng]
-        fig.add_trace(go.Scatter(x=sub.Cycles, y=sub.EGT_Margin,
-                                 mode="markers", name=f"{eng} Data",
-                                 marker=dict(color="#1E90FF")))
-        xp = np.linspace(0, max(sub.Cycles)+200, 100)
-        yp = f["intercept"] + f["slope"]*xp
-        fig.add_trace(go.Scatter(x=xp, y=yp, mode="lines", name=f"{eng} Forecast",
-                                 line=dict(color="#0B1E3D")))
+def summary_table(forecasts):
+    return pd.DataFrame({
+        "Engine": forecasts.index,
+        "Model": forecasts["Model"].to_numpy(),
+        "Preventive": forecasts["preventive_cycles"].to_numpy(),
+        "Predictive": forecasts["predictive_cycles"].to_numpy(),
+        # Cycles to the predictive limit if the decline is at its P10 slope
+        "Worst Case": forecasts["predictive_p10"].to_numpy(),
+        "Days Saved": forecasts["days_saved"].to_numpy(),
+        "Value ($)": forecasts["value"].to_numpy(),
+    })
+
+# Larger fleets are drawn as downsampled WebGL traces instead of SVG
+SVG_MAX_ENGINES = 20
+PLOT_MAX_POINTS = 200_000
+
+def plot_fleet(df, forecasts, selected=()):
+    if len(forecasts) > SVG_MAX_ENGINES:
+        fig = plot_fleet_gl(df, forecasts, selected)
+    else:
+        fig = go.Figure()
+        for eng, sub in df.groupby("Engine_ID", sort=False, observed=True):
+            f = forecasts.loc[eng]
+            fig.add_trace(go.Scatter(x=sub.Cycles, y=sub.EGT_Margin,
+                                     mode="markers", name=f"{eng} Data",
+                                     marker=dict(color="#1E90FF")))
+            xp = np.linspace(0, max(sub.Cycles)+200, 100)
+            yp = f["intercept"] + f["slope"]*xp
+            add_band(fig, go.Scatter, xp, yp, f, eng)
+            fig.add_trace(go.Scatter(x=xp, y=yp, mode="lines", name=f"{eng} Forecast",
+                                     line=dict(color="#0B1E3D")))
     fig.add_hline(y=50, line_dash="dot", line_color="#FF7A00",
                   annotation_text="Preventive Limit (50 °C)")
     fig.add_hline(y=30, line_dash="dot", line_color="red",
@@ -112,6 +133,128 @@ def plot_fleet(df, forecasts):
     fig.update_layout(template="simple_white")
     return fig
 
+def add_band(fig, trace, xp, yp, f, eng):
+    """P10-P90 forecast band (forecast.apply_stress) around one engine's forecast line."""
+    half = Z_P90 * f["slope_se"] * np.abs(xp - f["x_mean"])
+    fig.add_trace(trace(x=xp, y=yp + half, mode="lines", line=dict(width=0),
+                        showlegend=False, hoverinfo="skip"))
+    fig.add_trace(trace(x=xp, y=yp - half, mode="lines", line=dict(width=0),
+                        fill="tonexty", fillcolor="rgba(11,30,61,0.15)",
+                        name=f"{eng} P10-P90", hoverinfo="skip"))
+
+def plot_fleet_gl(df, forecasts, selected=()):
+    """
+    Whole fleet in a handful of WebGL traces: min/max-downsampled history
+    as one marker trace, every forecast line as one NaN-separated trace,
+    and full-resolution traces only for the engines in `selected`.
+    """
+    fig = go.Figure()
+    thin = minmax_downsample(df, max(2, PLOT_MAX_POINTS // len(forecasts)))
+    fig.add_trace(go.Scattergl(x=thin.Cycles, y=thin.EGT_Margin, mode="markers",
+                               name="Fleet Data", text=thin.Engine_ID.astype(str),
+                               hovertemplate="%{text}<br>Cycle %{x}<br>EGT %{y:.1f}<extra></extra>",
+                               marker=dict(color="#1E90FF", size=4)))
+
+    # Forecasts are straight lines: two points per engine, NaN between engines
+    x_end = (df.groupby("Engine_ID", sort=False, observed=True)["Cycles"].max()
+               .reindex(forecasts.index).to_numpy(dtype=float) + 200)
+    intercept, slope = forecasts["intercept"].to_numpy(), forecasts["slope"].to_numpy()
+    xs = np.full(3 * len(forecasts), np.nan)
+    ys = np.full(3 * len(forecasts), np.nan)
+    xs[0::3], xs[1::3] = 0, x_end
+    ys[0::3], ys[1::3] = intercept, intercept + slope * x_end
+    fig.add_trace(go.Scattergl(x=xs, y=ys, mode="lines", name="Fleet Forecast",
+                               line=dict(color="#0B1E3D", width=1), opacity=0.4,
+                               hoverinfo="skip"))
+
+    for eng in selected:
+        sub = df[df.Engine_ID == eng]
+        f = forecasts.loc[eng]
+        xp = np.linspace(0, sub.Cycles.max() + 200, 50)
+        add_band(fig, go.Scattergl, xp, f["intercept"] + f["slope"]*xp, f, eng)
+        fig.add_trace(go.Scattergl(x=sub.Cycles, y=sub.EGT_Margin, mode="markers",
+                                   name=f"{eng} Data", marker=dict(color="#FF7A00", size=6)))
+        fig.add_trace(go.Scattergl(x=xp, y=f["intercept"] + f["slope"]*xp, mode="lines",
+                                   name=f"{eng} Forecast", line=dict(color="#FF7A00")))
+    return fig
+
+# ----------------------------
+# Cached Computations
+# ----------------------------
+# Streamlit reruns the whole script on every widget change. These wrap
+# the expensive steps in bounded caches keyed on the data's content hash
+# (plus parameters), so a rerun only recomputes what actually changed.
+# Cached objects are shared between reruns and sessions: treat them as
+# read-only.
+DEMO_KEY = "demo"
+REPORT_WORKERS = 2
+
+def upload_digest(uploaded):
+    """Content hash of an upload, computed once per uploaded file."""
+    digests = st.session_state.setdefault("upload_digests", {})
+    file_id = getattr(uploaded, "file_id", None) or uploaded.name
+    if file_id not in digests:
+        digests[file_id] = bytes_digest(uploaded.getvalue())
+    return digests[file_id]
+
+@st.cache_resource(max_entries=16)
+def cached_fleet(key, _uploaded=None):
+    if _uploaded is None:
+        return load_demo_fleet()
+    return cached_frame("upload", [key], lambda: load_fleet_csv(_uploaded))
+
+@st.cache_resource(max_entries=16)
+def cached_fits(key, _df):
+    return fit_fleet(_df)
+
+@st.cache_resource(max_entries=64)
+def cached_stress_forecast(key, stress, _fits):
+    return apply_stress(_fits, stress)
+
+def cached_forecast(key, fits, stress_by_engine=None):
+    """
+    Forecast table for a per-engine stress assignment, assembled from one
+    cached forecast per distinct stress level. Changing one engine's
+    assignment only swaps that engine's row.
+    """
+    if stress_by_engine is None:
+        return cached_stress_forecast(key, 1.0, fits)
+    stress = stress_by_engine.reindex(fits.index).to_numpy(dtype=float)
+    levels = np.unique(stress)
+    forecasts = cached_stress_forecast(key, float(levels[0]), fits)
+    if len(levels) > 1:
+        forecasts = forecasts.copy()
+        for level in levels[1:]:
+            rows = stress == level
+            forecasts.iloc[rows] = cached_stress_forecast(key, float(level), fits).iloc[rows]
+    return forecasts
+
+@st.cache_resource(max_entries=16)
+def cached_risk_index(key, forecast_key, _forecasts):
+    return RiskIndex.from_forecasts(_forecasts)
+
+def session_risk_index(name, forecasts):
+    """Per-session index kept in step with forecasts that change a few rows at a time."""
+    index = st.session_state.get(name)
+    if index is None:
+        index = st.session_state[name] = RiskIndex.from_forecasts(forecasts)
+    else:
+        index.sync(forecasts)
+    return index
+
+def status_metrics(counts):
+    for col, label in zip(st.columns(len(STATUSES)), STATUSES):
+        col.metric(label, counts[label])
+
+# One render pool for the whole server, shared by every session
+@st.cache_resource
+def report_service():
+    return ReportService(REPORT_WORKERS)
+
+@st.cache_resource(max_entries=16)
+def cached_plot(key, forecast_key, _df, _forecasts, selected=()):
+    return plot_fleet(_df, _forecasts, selected)
+
 # ----------------------------
 # Pages
 # ----------------------------
@@ -139,97 +282,169 @@ def home_page():
 def dashboard_page():
     st.header("Fleet Dashboard")
     uploaded = st.file_uploader("Upload CSV", type=["csv"])
-    df = pd.read_csv(uploaded) if uploaded else load_demo_fleet()
-    forecasts, rows = {}, []
-    for eng in df.Engine_ID.unique():
-        sub = df[df.Engine_ID==eng]
-        f = forecast_engine(sub)
-        forecasts[eng] = f
-        extra = f["predictive_cycles"] - f["preventive_cycles"]
-        days = extra/3
-        value = days*2500
-        rows.append({"Engine":eng,"Model":sub.Engine_Model.iloc[0],
-                     "Preventive":f["preventive_cycles"],
-                     "Predictive":f["predictive_cycles"],
-                     "Days Saved":days,"Value ($)":value})
-    results = pd.DataFrame(rows).round(0)
+    if uploaded:
+        key = upload_digest(uploaded)
+        df = cached_fleet(key, uploaded)
+    else:
+        key = DEMO_KEY
+        df = cached_fleet(key)
+    forecasts = cached_forecast(key, cached_fits(key, df))
+    results = summary_table(forecasts).round(0)
     st.markdown("<div class='card'>", unsafe_allow_html=True)
     st.subheader("Fleet Summary")
     st.dataframe(results.style.format({"Preventive":"{:.0f}","Predictive":"{:.0f}",
-                                       "Days Saved":"{:.0f}","Value ($)":"${:,.0f}"}))
+                                       "Worst Case":"{:.0f}","Days Saved":"{:.0f}",
+                                       "Value ($)":"${:,.0f}"}))
     st.markdown("</div>", unsafe_allow_html=True)
+    index = cached_risk_index(key, "base", forecasts)
     st.subheader("Top 3 At-Risk Engines")
-    st.write(results.nsmallest(3,"Predictive")[["Engine","Model","Predictive"]])
-    st.plotly_chart(plot_fleet(df, forecasts), use_container_width=True)
+    models = index.values("model")
+    model = st.selectbox("Engine model", ["All", *models]) if len(models) > 1 else "All"
+    filters = {} if model == "All" else {"model": model}
+    status_metrics(index.status_counts(**filters))
+    top = [eng for eng, _ in index.top(3, **filters)]
+    st.write(results.set_index("Engine").loc[top, ["Model","Predictive","Worst Case"]].reset_index())
+    selected = ()
+    if len(forecasts) > SVG_MAX_ENGINES:
+        selected = tuple(st.multiselect("Drill down to engines (full resolution)",
+                                        forecasts.index.tolist(), max_selections=10))
+    st.plotly_chart(cached_plot(key, "base", df, forecasts, selected), use_container_width=True)
 
 def fleet_optimization_page():
     st.header("Fleet Optimization – Voyageur Aviation")
-    df = load_demo_fleet()
+    df = cached_fleet(DEMO_KEY)
     mission_options = ["Hard Route", "Moderate Route", "Light Route"]
     stress_map = {"Hard Route": 1.2, "Moderate Route": 1.0, "Light Route": 0.8}
-    assignments, rows, forecasts = {}, [], {}
-    for eng in df.Engine_ID.unique():
-        assignments[eng] = st.selectbox(f"Assign mission for {eng}", mission_options, index=1)
-    for eng in df.Engine_ID.unique():
-        sub = df[df.Engine_ID==eng]
-        stress = stress_map[assignments[eng]]
-        f = forecast_engine(sub, stress_factor=stress)
-        forecasts[eng] = f
-        extra = f["predictive_cycles"] - f["preventive_cycles"]
-        days = extra/3
-        value = days*2500
-        rows.append({"Engine":eng,"Model":sub.Engine_Model.iloc[0],"Assignment":assignments[eng],
-                     "Preventive":f["preventive_cycles"],"Predictive":f["predictive_cycles"],
-                     "Days Saved":days,"Value ($)":value})
-    results = pd.DataFrame(rows).round(0)
+    fits = cached_fits(DEMO_KEY, df)
+    with st.expander("Optimize Assignments"):
+        st.caption("Set how many engines fly each route, then let the solver pick who flies what.")
+        cols = st.columns(len(mission_options))
+        route_counts = {}
+        for col, route in zip(cols, mission_options):
+            default = len(fits) if route == "Moderate Route" else 0
+            route_counts[route] = col.number_input(route, min_value=0, max_value=len(fits),
+                                                   value=default, step=1, key=f"count_{route}")
+        objective = st.radio("Objective", ["value", "earliest"], horizontal=True,
+                             format_func={"value": "Maximize total value",
+                                          "earliest": "Delay earliest removal"}.get)
+        if st.button("Optimize"):
+            if sum(route_counts.values()) != len(fits):
+                st.error(f"Route counts must add up to the fleet size ({len(fits)} engines).")
+            else:
+                best = optimize_assignment(fits, route_counts, stress_map, objective)
+                for eng, route in best.items():
+                    st.session_state[f"mission_{eng}"] = route
+    assignments = {}
+    for eng in fits.index:
+        st.session_state.setdefault(f"mission_{eng}", "Moderate Route")
+        assignments[eng] = st.selectbox(f"Assign mission for {eng}", mission_options,
+                                        key=f"mission_{eng}")
+    assignment = pd.Series(assignments)
+    stress = assignment.map(stress_map)
+    forecasts = cached_forecast(DEMO_KEY, fits, stress)
+    results = summary_table(forecasts)
+    results.insert(2, "Assignment", assignment.reindex(forecasts.index).to_numpy())
+    results = results.round(0)
     st.markdown("<div class='card'>", unsafe_allow_html=True)
     st.subheader("Optimization Results")
     st.dataframe(results.style.format({"Preventive":"{:.0f}","Predictive":"{:.0f}",
-                                       "Days Saved":"{:.0f}","Value ($)":"${:,.0f}"}))
+                                       "Worst Case":"{:.0f}","Days Saved":"{:.0f}",
+                                       "Value ($)":"${:,.0f}"}))
     st.markdown("</div>", unsafe_allow_html=True)
     st.success(f"Total Value Unlocked: ${results['Value ($)'].sum():,.0f}")
-    st.plotly_chart(plot_fleet(df, forecasts), use_container_width=True)
+    index = session_risk_index("risk_index_optimization", forecasts)
+    status_metrics(index.status_counts())
+    first = index.top(1)
+    if first:
+        st.caption(f"First removal under this assignment: {first[0][0]} in {first[0][1]:.0f} cycles")
+    stress_key = bytes_digest(stress.reindex(fits.index).to_numpy(dtype=float).tobytes())
+    st.plotly_chart(cached_plot(DEMO_KEY, stress_key, df, forecasts), use_container_width=True)
 
 def fleet_charts_page():
     st.header("Fleet Charts (Demo Data)")
-    df = load_demo_fleet()
-    forecasts = {eng: forecast_engine(df[df.Engine_ID==eng]) for eng in df.Engine_ID.unique()}
+    df = cached_fleet(DEMO_KEY)
+    forecasts = cached_forecast(DEMO_KEY, cached_fits(DEMO_KEY, df))
     st.subheader("Health Heatmap")
-    health = pd.DataFrame({"Engine":list(forecasts.keys()),
-                           "Predictive Cycles":[f["predictive_cycles"] for f in forecasts.values()]})
-    health["Status"] = pd.cut(health["Predictive Cycles"], bins=[0,150,300,np.inf],
-                              labels=["At Risk","Watch","Healthy"])
+    health = pd.DataFrame({"Engine":forecasts.index,
+                           "Predictive Cycles":forecasts["predictive_cycles"].to_numpy()})
+    health["Status"] = pd.cut(health["Predictive Cycles"], bins=[*STATUS_BINS, np.inf],
+                              labels=list(STATUSES))
+    status_metrics(cached_risk_index(DEMO_KEY, "base", forecasts).status_counts())
     st.dataframe(health)
     st.subheader("Degradation Slopes")
-    slope_df = pd.DataFrame({"Engine":list(forecasts.keys()),
-                             "Slope":[f["slope"] for f in forecasts.values()]})
+    slope_df = pd.DataFrame({"Engine":forecasts.index,
+                             "Slope":forecasts["slope"].to_numpy()})
     st.bar_chart(slope_df.set_index("Engine"))
     st.subheader("Value Unlocked per Engine")
-    val_df = pd.DataFrame({"Engine":list(forecasts.keys()),
-                           "Value":[(f["predictive_cycles"]-f["preventive_cycles"])/3*2500
-                                    for f in forecasts.values()]})
+    val_df = pd.DataFrame({"Engine":forecasts.index,
+                           "Value":forecasts["value"].to_numpy()})
     st.bar_chart(val_df.set_index("Engine"))
 
 def report_page():
     st.header("Generate Demo Report")
-    if st.button("Export Demo Report (PDF)"):
-        doc = SimpleDocTemplate("StarCheck_Report.pdf", pagesize=letter)
-        styles = getSampleStyleSheet()
-        story = []
-        # Custom styles
-        title_style = ParagraphStyle("TitleStyle", parent=styles["Title"], textColor=colors.HexColor("#0B1E3D"))
-        heading_style = ParagraphStyle("Heading", parent=styles["Heading2"], textColor=colors.HexColor("#FF7A00"))
-        normal_style = ParagraphStyle("NormalStyle", parent=styles["Normal"], textColor=colors.HexColor("#0B1E3D"))
-        story.append(Paragraph("StarCheck – Predictive Maintenance Report", title_style))
-        story.append(Spacer(1,12))
-        story.append(Paragraph("Compliance-First Forecasting for Voyageur Aviation", heading_style))
-        story.append(Spacer(1,12))
-        story.append(Paragraph("This demo showcases predictive maintenance within regulatory thresholds "
-                               "for CRJ200 (CF34-3B1) and Dash8-100 (PW120A) engines.", normal_style))
-        story.append(Spacer(1,12))
-        story.append(Paragraph("Forecasts indicate extended usable cycles without breaching preventive or predictive safety margins.", normal_style))
-        doc.build(story)
-        st.success("Demo PDF exported as StarCheck_Report.pdf")
+    service = report_service()
+    col1, col2 = st.columns(2)
+    if col1.button("Export Demo Report (PDF)"):
+        st.session_state["report_demo"] = service.submit("demo", {})
+    if col2.button("Per-Engine Reports (ZIP)"):
+        forecasts = cached_forecast(DEMO_KEY, cached_fits(DEMO_KEY, cached_fleet(DEMO_KEY)))
+        jobs = engine_jobs(forecasts)
+        jobs.append(("fleet.pdf", "fleet", fleet_payload(jobs, "Fleet Report (Demo Data)")))
+        st.session_state["report_zip"] = service.submit_zip(jobs)
+    # Rendering happens in the service's workers; this session only waits on its own future
+    for key, label, file_name, mime in (
+        ("report_demo", "Download StarCheck_Report.pdf", "StarCheck_Report.pdf", "application/pdf"),
+        ("report_zip", "Download StarCheck_Engine_Reports.zip", "StarCheck_Engine_Reports.zip",
+         "application/zip"),
+    ):
+        future = st.session_state.get(key)
+        if future is None:
+            continue
+        try:
+            with stage("report"), st.spinner("Rendering..."):
+                data = future.result()
+        except Exception as exc:
+            # Drop the failed future so later reruns don't raise it again
+            st.session_state.pop(key, None)
+            st.error(f"Report rendering failed: {exc}")
+            continue
+        st.download_button(label, data, file_name=file_name, mime=mime, key=f"{key}_download",
+                           on_click=st.session_state.pop, args=(key, None))
+
+def performance_page():
+    st.header("Performance")
+    metrics = read_metrics()
+    if metrics.empty:
+        st.info("No stage metrics recorded yet. Start the app or pipeline with "
+                "STARCHECK_METRICS=1 (or a file path) to record timings, and "
+                "STARCHECK_PROFILE=cprofile|sample to capture profiles.")
+        return
+    st.caption(f"Reading {instrument.METRICS_PATH or instrument.DEFAULT_METRICS_PATH}")
+    runs = metrics["run"].unique().tolist()[::-1]
+    run = st.selectbox("Run", ["All runs"] + runs)
+    if run != "All runs":
+        metrics = metrics[metrics["run"] == run]
+    for col in ("rows", "bytes", "peak_rss_mb"):
+        if col not in metrics.columns:
+            metrics[col] = np.nan
+    summary = metrics.groupby("stage").agg(
+        Calls=("seconds", "size"),
+        Total_s=("seconds", "sum"),
+        Mean_s=("seconds", "mean"),
+        P95_s=("seconds", lambda s: s.quantile(0.95)),
+        Rows=("rows", "sum"),
+        MB_Read=("bytes", lambda b: b.sum() / 2**20),
+        Peak_RSS_MB=("peak_rss_mb", "max"),
+    ).sort_values("Total_s", ascending=False)
+    summary["Rows/s"] = summary["Rows"] / summary["Total_s"]
+    st.markdown("<div class='card'>", unsafe_allow_html=True)
+    st.subheader("Stage Summary")
+    st.dataframe(summary.round(3))
+    st.markdown("</div>", unsafe_allow_html=True)
+    st.subheader("Time per Stage (s)")
+    st.bar_chart(summary["Total_s"])
+    st.subheader("Recent Stages")
+    st.dataframe(metrics.sort_values("start", ascending=False).head(200))
 
 # ----------------------------
 # Router
@@ -239,11 +454,13 @@ PAGES = {
     "Dashboard": dashboard_page,
     "Fleet Optimization": fleet_optimization_page,
     "Fleet Charts": fleet_charts_page,
-    "Report": report_page
+    "Report": report_page,
+    "Performance": performance_page
 }
 def main():
     st.sidebar.image("logo.png", width=120)
     choice = st.sidebar.radio("Navigate", list(PAGES.keys()))
-    PAGES[choice]()
+    with stage(f"page:{choice}"):
+        PAGES[choice]()
 if __name__ == "__main__":
     main()
@@ -0,0 +1,271 @@
+"""
+Time and memory-profile every stage of the StarCheck stack on synthetic
+CMAPSS-shaped fleets, and compare against a stored baseline.
+
+    python benchmarks/run_benchmarks.py --scales 1 10 100 --out bench.json
+    python benchmarks/run_benchmarks.py --baseline bench.json --threshold 0.25
+
+Scales are multiples of FD001 (100 engines, ~20k rows). Each stage is
+timed best-of --repeats, then run once more under tracemalloc for its
+peak allocation (this process only; CV worker processes aren't traced).
+Stages run once are timed and traced in the same run. Exits 1 when a
+stage is slower or allocates more than baseline * (1 + threshold).
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.synthetic import engines_for_scale, make_cmapss, make_fleet, write_cmapss
+from src import data_loader, features, forecast, model_utils
+from src.feature_spec import DEFAULT_SPEC
+from src.inference import align_features, predict_batch
+
+# Small forests keep the training stages tractable at 10x
+TRAIN_TREES, TRAIN_DEPTH = 20, 12
+# The scoring model is trained once at this scale and reused for every scale
+SCORING_SCALE, SCORING_TREES = 1, 50
+
+
+class Workload:
+    """Synthetic inputs for one scale, built on first use and kept for all stages."""
+
+    def __init__(self, scale, workdir, seed=0):
+        self.scale = scale
+        self.workdir = Path(workdir)
+        self.seed = seed
+        self.n_engines = engines_for_scale(scale)
+
+    @cached_property
+    def fd001_path(self):
+        path = self.workdir / f"FD001_x{self.scale:g}_s{self.seed}.txt"
+        if not path.exists():
+            write_cmapss(make_cmapss(self.n_engines, self.seed), path)
+        return path
+
+    @cached_property
+    def cmapss(self):
+        return data_loader.load_fd001(self.fd001_path)
+
+    @cached_property
+    def featured(self):
+        return features.add_features(features.add_rul(self.cmapss), DEFAULT_SPEC)
+
+    @cached_property
+    def fleet(self):
+        return make_fleet(self.n_engines, self.seed)
+
+
+_scoring_model = {}
+
+def scoring_model(workdir, seed=0):
+    """RF artifact saved and reloaded the way the app serves it (mmap FlatForest)."""
+    if "model" not in _scoring_model:
+        w = Workload(SCORING_SCALE, workdir, seed)
+        df = w.featured
+        model = model_utils.train_random_forest(
+            df[DEFAULT_SPEC.feature_names], df["RUL"], df["engine_id"],
+            n_estimators=SCORING_TREES, max_depth=TRAIN_DEPTH,
+        )
+        path = Path(workdir) / "scoring_model.pkl"
+        model_utils.save_model(model, path, DEFAULT_SPEC.feature_names, DEFAULT_SPEC, mmap=True)
+        _scoring_model["model"] = model_utils.load_model(path, with_spec=True)
+    return _scoring_model["model"]
+
+
+# -----------------------
+# Stages: setup(workload) -> (callable to measure, rows processed)
+# -----------------------
+def bench_load(w):
+    path = w.fd001_path
+    return (lambda: data_loader.load_fd001(path)), len(w.cmapss)
+
+def bench_features(w):
+    df = features.add_rul(w.cmapss)
+    return (lambda: features.add_features(df, DEFAULT_SPEC)), len(df)
+
+def bench_train(w):
+    df = w.featured
+    X, y, groups = df[DEFAULT_SPEC.feature_names], df["RUL"], df["engine_id"]
+    return (lambda: model_utils.train_random_forest(
+        X, y, groups, n_estimators=TRAIN_TREES, max_depth=TRAIN_DEPTH)), len(df)
+
+def bench_inference(w):
+    model, feature_names, _ = scoring_model(w.workdir, w.seed)
+    X = align_features(w.featured, feature_names)
+    return (lambda: predict_batch(model, X)), len(X)
+
+def bench_pipeline(w):
+    import pipeline
+
+    def run():
+        # train_and_report works on ./data, ./models, ./reports (and the
+        # default ./.cache), so every run gets a fresh, cold directory
+        rundir = Path(tempfile.mkdtemp(dir=w.workdir))
+        (rundir / "data").mkdir()
+        shutil.copy(w.fd001_path, rundir / "data" / "FD001.txt")
+        cwd = os.getcwd()
+        os.chdir(rundir)
+        try:
+            pipeline.train_and_report()
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(rundir, ignore_errors=True)
+    return run, len(w.cmapss)
+
+def bench_forecast(w):
+    fleet = w.fleet
+    return (lambda: forecast.forecast_fleet(fleet)), len(fleet)
+
+def bench_plot(w):
+    import app  # Streamlit runs the module in bare mode; pages aren't rendered
+    fleet = w.fleet
+    forecasts = forecast.forecast_fleet(fleet)
+    return (lambda: app.plot_fleet(fleet, forecasts)), len(fleet)
+
+
+@dataclass
+class Stage:
+    setup: object
+    max_scale: float = None  # skipped above this scale
+    repeats: int = None      # overrides --repeats
+
+
+STAGES = {
+    "load": Stage(bench_load),
+    "features": Stage(bench_features),
+    "train": Stage(bench_train, max_scale=10, repeats=1),
+    "inference": Stage(bench_inference),
+    "pipeline": Stage(bench_pipeline, max_scale=1, repeats=1),
+    "forecast": Stage(bench_forecast),
+    "plot": Stage(bench_plot),
+}
+
+
+def measure(fn, repeats):
+    """Wall-clock samples (seconds) and traced peak allocation (bytes)."""
+    times = []
+    # A single repeat is timed in the traced run below
+    for _ in range(repeats if repeats > 1 else 0):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        fn()
+        traced = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return times or [traced], peak
+
+
+def run_benchmarks(scales, stages, repeats=3, workdir=None, seed=0):
+    """Run every (stage, scale) pair; returns the results document."""
+    workdir = Path(workdir or tempfile.mkdtemp(prefix="starcheck-bench-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    results = []
+    for scale in scales:
+        w = Workload(scale, workdir, seed)
+        for name in stages:
+            stage = STAGES[name]
+            if stage.max_scale is not None and scale > stage.max_scale:
+                print(f"⏭️  {name} @ {scale:g}x: skipped (max {stage.max_scale:g}x)")
+                continue
+            fn, rows = stage.setup(w)
+            times, peak = measure(fn, stage.repeats or repeats)
+            best = min(times)
+            results.append({
+                "stage": name,
+                "scale": scale,
+                "engines": w.n_engines,
+                "rows": rows,
+                "seconds": best,
+                "seconds_median": statistics.median(times),
+                "rows_per_sec": rows / best if best > 0 else None,
+                "peak_mb": peak / 2**20,
+            })
+            print(f"⏱️  {name} @ {scale:g}x: {best:.3f}s, {rows / best:,.0f} rows/s, "
+                  f"peak {peak / 2**20:.1f} MB")
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeats": repeats,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold=0.25):
+    """
+    Regressions of `current` against `baseline`: every (stage, scale)
+    present in both whose seconds or peak_mb grew by more than threshold.
+    """
+    base = {(r["stage"], r["scale"]): r for r in baseline["results"]}
+    regressions = []
+    for r in current["results"]:
+        b = base.get((r["stage"], r["scale"]))
+        if b is None:
+            continue
+        for metric in ("seconds", "peak_mb"):
+            if b[metric] > 0 and r[metric] > b[metric] * (1 + threshold):
+                regressions.append({"stage": r["stage"], "scale": r["scale"], "metric": metric,
+                                    "baseline": b[metric], "current": r[metric],
+                                    "ratio": r[metric] / b[metric]})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10, 100],
+                        help="fleet sizes as multiples of FD001 (default: 1 10 100)")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="where synthetic data is kept (default: a temp dir)")
+    parser.add_argument("--out", help="write the results JSON here")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown / memory growth vs baseline (default: 0.25)")
+    args = parser.parse_args(argv)
+
+    current = run_benchmarks(args.scales, args.stages, args.repeats, args.workdir, args.seed)
+    if args.out:
+        Path(args.out).write_text(json.dumps(current, indent=2))
+        print(f"📝 Results written to {args.out}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(current, baseline, args.threshold)
+        for r in regressions:
+            print(f"❌ {r['stage']} @ {r['scale']:g}x {r['metric']}: "
+                  f"{r['baseline']:.3f} -> {r['current']:.3f} ({r['ratio']:.2f}x)")
+        if regressions:
+            return 1
+        print(f"✅ No regressions beyond {args.threshold:.0%} of {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
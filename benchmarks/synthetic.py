@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+from src.data_loader import CMAPSS_COLUMNS, CMAPSS_DTYPES
+
+# FD001 train set: 100 engines run to failure, 128-362 cycles (mean ~206)
+FD001_ENGINES = 100
+LIFE_MEAN, LIFE_STD, LIFE_MIN, LIFE_MAX = 206, 46, 128, 362
+
+
+def engines_for_scale(scale):
+    """Number of engines in a fleet `scale` times the size of FD001."""
+    return max(1, int(round(FD001_ENGINES * scale)))
+
+
+def _lifetimes(rng, n_engines):
+    life = rng.normal(LIFE_MEAN, LIFE_STD, n_engines).round()
+    return np.clip(life, LIFE_MIN, LIFE_MAX).astype(np.int64)
+
+
+def make_cmapss(n_engines, seed=0):
+    """
+    Synthetic run-to-failure fleet with the FD001 layout and dtypes:
+    engine_id, cycle, 3 operational settings and 21 sensors. Sensors
+    drift with wear (quadratically towards end of life) plus noise, so
+    features and RUL models behave roughly like on the real data.
+    """
+    rng = np.random.default_rng(seed)
+    life = _lifetimes(rng, n_engines)
+    n = int(life.sum())
+    engine = np.repeat(np.arange(1, n_engines + 1), life)
+    first = np.repeat(np.cumsum(life) - life, life)
+    cycle = np.arange(n) - first + 1
+    wear = (cycle / np.repeat(life, life)) ** 2
+
+    settings = rng.normal(0, [0.002, 0.0003, 0.0], (n, 3)) + [0.0, 0.0, 100.0]
+    base = rng.uniform(1, 2400, 21)
+    drift = rng.uniform(-0.02, 0.02, 21) * base
+    sensors = base + wear[:, None] * drift + rng.normal(0, 0.002, (n, 21)) * base
+
+    df = pd.DataFrame(np.column_stack([settings, sensors]), columns=CMAPSS_COLUMNS[2:])
+    df.insert(0, "cycle", cycle)
+    df.insert(0, "engine_id", engine)
+    return df.astype(CMAPSS_DTYPES)
+
+
+def write_cmapss(df, path):
+    """Write a frame in the whitespace-delimited C-MAPSS text format."""
+    df.to_csv(path, sep=" ", header=False, index=False, float_format="%.4f")
+    return path
+
+
+def make_fleet(n_engines, seed=0):
+    """
+    Synthetic dashboard fleet (Engine_ID, Engine_Model, Cycles,
+    EGT_Margin) with one reading per cycle and a linear EGT margin
+    decline per engine, typed like data_loader.load_fleet_csv output.
+    """
+    rng = np.random.default_rng(seed)
+    life = _lifetimes(rng, n_engines)
+    n = int(life.sum())
+    first = np.repeat(np.cumsum(life) - life, life)
+    cycles = np.arange(n) - first
+
+    models = np.array(["GE CF34-3B1", "PW120A"])
+    ids = np.array([f"ENG-{i:05d}" for i in range(n_engines)])
+    intercept = rng.uniform(75, 85, n_engines)
+    slope = rng.uniform(0.03, 0.15, n_engines)
+    egt = np.repeat(intercept, life) - np.repeat(slope, life) * cycles + rng.normal(0, 1, n)
+
+    return pd.DataFrame({
+        "Engine_ID": pd.Categorical(np.repeat(ids, life), categories=ids),
+        "Engine_Model": pd.Categorical(np.repeat(models[rng.integers(0, 2, n_engines)], life)),
+        "Cycles": cycles.astype(np.int32),
+        "EGT_Margin": egt.astype(np.float32),
+    })
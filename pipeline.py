@@ -1,113 +1,253 @@
+import argparse
+import json
 import os
-import pandas as pd
+import time
+
 import joblib
 from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_squared_error
+from sklearn.model_selection import GroupShuffleSplit
 import xgboost as xgb
 
+from src import cache, data_loader, features
+from src.model_utils import compact_forest, save_model
+from src.feature_spec import DEFAULT_SPEC
+from src.instrument import stage
+from src.multi_train import load_manifest, train_datasets, write_report
+from src.orchestrator import TrainJob, run_jobs
+from src.out_of_core import RF_MAX_ROWS, train_out_of_core
+from src.tuning import tune
+
 # -----------------------
 # Data loading + features
 # -----------------------
 def load_fd001(path="data/FD001.txt"):
-    col_names = (
-        ["engine_id", "cycle", "setting_1", "setting_2", "setting_3"]
-        + [f"sensor_{i}" for i in range(1, 22)]
-    )
-    df = pd.read_csv(path, sep=r"\s+", header=None, names=col_names)
-    return df
+    return data_loader.load_cmapss(path)
 
 def add_rul(df):
     rul = df.groupby("engine_id")["cycle"].transform("max") - df["cycle"]
     df["RUL"] = rul
     return df
 
-def add_features(df):
-    feat_df = df.copy()
-    for col in [c for c in df.columns if "sensor_" in c]:
-        feat_df[f"{col}_rollmean_w5"] = df.groupby("engine_id")[col].transform(
-            lambda x: x.rolling(window=5, min_periods=1).mean()
-        )
-    return feat_df
+def add_features(df, spec=DEFAULT_SPEC):
+    return features.add_features(df, spec)
+
+def load_features(path="data/FD001.txt", spec=DEFAULT_SPEC):
+    """Parsed + feature-engineered frame, served from the on-disk cache."""
+    digest = cache.file_digest(path)
+    return cache.cached_frame(
+        "features", [digest, spec.to_dict()],
+        lambda: add_features(add_rul(
+            cache.cached_frame("parsed", [digest], lambda: load_fd001(path))
+        ), spec),
+    )
 
 # -----------------------
 # Train + save
 # -----------------------
-def train_and_report():
-    print("📂 Loading data...")
-    df = load_fd001()
-    df = add_rul(df)
-    df_feat = add_features(df)
-
-    X = df_feat.drop(columns=["RUL"])
-    y = df_feat["RUL"]
-
-    # ⚠️ Exclude IDs & raw cycle count (not useful for model)
-    drop_cols = ["engine_id", "cycle"]
-    X = X.drop(columns=drop_cols)
-    feature_names = X.columns.tolist()
-
-    # Train Random Forest
-    print("🌲 Training Random Forest...")
-    rf = RandomForestRegressor(n_estimators=200, random_state=42, n_jobs=-1)
-    rf.fit(X, y)
-    y_pred_rf = rf.predict(X)
-    rmse_rf = mean_squared_error(y, y_pred_rf) ** 0.5
-
-    # Train XGBoost
-    print("⚡ Training XGBoost...")
-    xgbr = xgb.XGBRegressor(
-        n_estimators=300, learning_rate=0.05, max_depth=6, random_state=42, n_jobs=-1
-    )
-    xgbr.fit(X, y)
-    y_pred_xgb = xgbr.predict(X)
-    rmse_xgb = mean_squared_error(y, y_pred_xgb) ** 0.5
+# Written by tune_models; make_models applies it to the data + spec it was tuned on
+TUNED_PARAMS = "models/tuned_params.json"
 
-    # Ensure models dir exists
-    os.makedirs("models", exist_ok=True)
+def tuned_params(data_key, spec, tuned=TUNED_PARAMS):
+    """Saved params per model if they were tuned on this data (file digest) and spec, else {}."""
+    if not (tuned and data_key and os.path.exists(tuned)):
+        return {}
+    with open(tuned, encoding="utf-8") as f:
+        saved = json.load(f)
+    # Compare through JSON so tuples in the spec match the lists read back
+    if saved.get("data_key") != data_key or saved.get("spec") != json.loads(json.dumps(spec.to_dict())):
+        print(f"ℹ️ {tuned} was tuned on other data or features; using the default params")
+        return {}
+    return saved["params"]
+
+def make_models(data_key=None, spec=DEFAULT_SPEC, tuned=TUNED_PARAMS):
+    """
+    Unfitted model configs trained for every dataset. Given the training
+    file's digest, params saved by tune_models for that file + spec apply.
+    """
+    models = {
+        "rf": RandomForestRegressor(n_estimators=200, random_state=42),
+        "xgb": xgb.XGBRegressor(
+            n_estimators=300, learning_rate=0.05, max_depth=6, random_state=42
+        ),
+    }
+    for name, params in tuned_params(data_key, spec, tuned).items():
+        if name in models:
+            models[name].set_params(**params)
+    return models
 
-    # Save models + features
-    joblib.dump(rf, "models/rf_model.pkl")
-    joblib.dump(feature_names, "models/rf_features.pkl")
-    joblib.dump(xgbr, "models/xgb_model.pkl")
-    joblib.dump(feature_names, "models/xgb_features.pkl")
+def train_and_report(spec=DEFAULT_SPEC, path="data/FD001.txt"):
+    with stage("train_and_report"):
+        print("📂 Loading data...")
+        with stage("load_features") as s:
+            df_feat = load_features(path, spec)
+            s.add(rows=len(df_feat))
 
-    # Report
-    os.makedirs("reports", exist_ok=True)
-    with open("reports/training_results.txt", "w", encoding="utf-8") as f:
-        f.write("Model Results:\n")
-        f.write(f"Random Forest RMSE: {rmse_rf:.2f}\n")
-        f.write(f"XGBoost RMSE: {rmse_xgb:.2f}\n")
+        # The spec leaves out IDs & raw cycle count (not useful for model)
+        feature_names = spec.feature_names
+        X = df_feat[feature_names]
+        y = df_feat["RUL"]
+        # Folds split by engine so no engine is scored on its own history
+        groups = df_feat["engine_id"]
 
-    print("✅ Training complete! Results written to reports/training_results.txt")
+        # RF and XGBoost train side by side, splitting the cores between them
+        print("🌲⚡ Training Random Forest + XGBoost...")
+        models = make_models(cache.file_digest(path), spec)
+        jobs = [TrainJob(name, estimator) for name, estimator in models.items()]
+        results = {r.name: r for r in run_jobs(jobs, X, y, groups, feature_names, spec)}
+        failed = [r for r in results.values() if r.error]
+        if failed:
+            raise RuntimeError(f"Training failed: {[(r.name, r.error) for r in failed]}")
+        cv_rf, cv_xgb = results["rf"].cv, results["xgb"].cv
 
-# -----------------------
-# Run from command line
-# -----------------------
-if __name__ == "__main__":
-    train_and_report()
-def run_pipeline(df):
+        # Feature names alongside the packaged models
+        joblib.dump(feature_names, "models/rf_features.pkl")
+        joblib.dump(feature_names, "models/xgb_features.pkl")
+
+        # Report
+        with stage("report"):
+            os.makedirs("reports", exist_ok=True)
+            with open("reports/training_results.txt", "w", encoding="utf-8") as f:
+                f.write("Model Results (5-fold GroupKFold by engine):\n")
+                f.write(f"Random Forest RMSE: {cv_rf.rmse:.2f}\n")
+                f.write(f"XGBoost RMSE: {cv_xgb.rmse:.2f}\n")
+                f.write("\nRandom Forest " + cv_rf.summary() + "\n")
+                f.write("XGBoost " + cv_xgb.summary() + "\n")
+                f.write("\nWall-clock: " + ", ".join(
+                    f"{r.name} {r.seconds:.1f}s on {r.threads} thread(s)" for r in results.values()
+                ) + "\n")
+
+        print("✅ Training complete! Results written to reports/training_results.txt")
+
+def compact_rf(spec=DEFAULT_SPEC, path="data/FD001.txt", rmse_budget=1.0, holdout=0.2):
     """
-    Simple demo pipeline.
-    Takes a dataframe with sensor features and returns
-    a dictionary with compliance analysis results.
+    Compact RF for low-latency scoring: fit the RF config on most engines,
+    then prune/quantize it against the held-out ones (model_utils.compact_forest).
     """
-    # For demo: pretend to analyze the data
-    risk_score = 78  # placeholder number
-    violations = ["GDPR", "SOC2", "FAA"]  # fake issues
-    suggestions = [
-        "Encrypt user data at rest",
-        "Add access control logging",
-        "Update FAA compliance checklist"
-    ]
-
-    results = {
-        "document": "sample_input.csv",
-        "risk_score": risk_score,
-        "violations": violations,
-        "suggestions": suggestions
-    }
+    with stage("compact_rf"):
+        df_feat = load_features(path, spec)
+        X = df_feat[spec.feature_names]
+        y = df_feat["RUL"].to_numpy()
+        groups = df_feat["engine_id"].to_numpy()
+        train_idx, hold_idx = next(GroupShuffleSplit(n_splits=1, test_size=holdout, random_state=42)
+                                   .split(X, y, groups))
+
+        print("🌲 Training Random Forest on the non-held-out engines...")
+        rf = make_models(cache.file_digest(path), spec)["rf"].set_params(n_jobs=-1)
+        rf.fit(X.iloc[train_idx], y[train_idx])
+        print("✂️ Compacting...")
+        compact, report = compact_forest(rf, X.iloc[hold_idx], y[hold_idx], groups[hold_idx],
+                                         rmse_budget=rmse_budget)
+        os.makedirs("models", exist_ok=True)
+        save_model(compact, "models/rf_compact_model.pkl", spec.feature_names, spec)
+
+        os.makedirs("reports", exist_ok=True)
+        with open("reports/compaction_report.txt", "w", encoding="utf-8") as f:
+            f.write(report.summary() + "\n")
+    print(report.summary())
+    print("✅ Compact model written to models/rf_compact_model.pkl")
+    return compact, report
+
+def tune_models(spec=DEFAULT_SPEC, path="data/FD001.txt", n_trials=27, cpu_budget=None):
+    """
+    Search RF + XGBoost hyperparameters (src.tuning) starting from the
+    untuned configs; the winners go to TUNED_PARAMS for make_models.
+    """
+    with stage("tune_models"):
+        df_feat = load_features(path, spec)
+        X = df_feat[spec.feature_names]
+        y = df_feat["RUL"]
+        groups = df_feat["engine_id"]
+        # Same file + spec hits the same trials, however the arrays were built
+        data_key = cache.file_digest(path)
+
+        results = {}
+        for name, estimator in make_models(tuned=None).items():
+            print(f"🔎 Tuning {name} ({n_trials} configs)...")
+            results[name] = tune(name, estimator, X, y, groups, n_trials=n_trials,
+                                 cpu_budget=cpu_budget, spec=spec, data_key=data_key)
+
+        os.makedirs("models", exist_ok=True)
+        tmp = f"{TUNED_PARAMS}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"data_key": data_key, "path": str(path), "spec": spec.to_dict(),
+                   "params": {name: r.best_params for name, r in results.items()}}, f, indent=2)
+        os.replace(tmp, TUNED_PARAMS)
+
+        os.makedirs("reports", exist_ok=True)
+        with open("reports/tuning_results.txt", "w", encoding="utf-8") as f:
+            f.write("Hyperparameter search (successive halving, GroupKFold by engine):\n")
+            for r in results.values():
+                f.write("\n" + r.summary() + "\n")
+    print(f"✅ Tuning complete! Params written to {TUNED_PARAMS}, "
+          "results to reports/tuning_results.txt")
     return results
 
-if uploaded_file is not None:
-    predictions = run_pipeline(data)  # wrapper around your model
-    st.line_chart(predictions)
+def train_manifest(manifest="datasets.json", spec=DEFAULT_SPEC, cpu_budget=None):
+    """Retrain every dataset in a manifest in parallel; one merged report."""
+    start = time.perf_counter()
+    datasets = load_manifest(manifest)
+    print(f"📂 Training {len(datasets)} dataset(s): {', '.join(d.name for d in datasets)}")
+    # Tuned params belong to one file + spec, so every subset trains on the defaults
+    summaries, results = train_datasets(datasets, make_models(), spec, cpu_budget)
+    path = write_report(summaries, results, time.perf_counter() - start)
+    print(f"✅ All datasets trained! Results written to {path}")
+
+def train_large(path="data/FD001.txt", spec=DEFAULT_SPEC, chunksize=data_loader.CHUNK_ROWS,
+                rf_max_rows=RF_MAX_ROWS):
+    """
+    Train both models on a fleet history too large for memory
+    (src.out_of_core): peak memory follows chunksize, not the file size.
+    """
+    models = make_models(cache.file_digest(path), spec)
+    print(f"📂 Streaming {path} in chunks of {chunksize:,} rows...")
+    rf, booster, summary = train_out_of_core(path, models["rf"].set_params(n_jobs=-1), models["xgb"],
+                                             spec, chunksize=chunksize, rf_max_rows=rf_max_rows)
+    os.makedirs("models", exist_ok=True)
+    save_model(rf, "models/rf_model.pkl", spec.feature_names, spec, mmap=True)
+    save_model(booster, "models/xgb_model.pkl", spec.feature_names, spec, mmap=True)
+
+    os.makedirs("reports", exist_ok=True)
+    with open("reports/training_results_ooc.txt", "w", encoding="utf-8") as f:
+        f.write(f"Model Results (out-of-core, {summary['holdout_rows']:,} rows on held-out engines):\n")
+        f.write(f"Random Forest RMSE: {summary['rf_rmse']:.2f} "
+                f"(sample of {summary['rf_sample_rows']:,} / {summary['train_rows']:,} rows)\n")
+        f.write(f"XGBoost RMSE: {summary['xgb_rmse']:.2f} (external memory, all rows)\n")
+        f.write(f"\n{summary['rows']:,} rows, {summary['engines']} engines, "
+                f"{summary['chunks']} chunks of <= {chunksize:,} rows\n")
+        f.write(f"Wall-clock: spill {summary['spill_seconds']:.1f}s, xgb {summary['xgb_seconds']:.1f}s, "
+                f"rf {summary['rf_seconds']:.1f}s\n")
+        if summary["peak_rss_mb"] is not None:
+            f.write(f"Peak RSS: {summary['peak_rss_mb']:.0f} MB\n")
+    print("✅ Training complete! Results written to reports/training_results_ooc.txt")
+    return summary
+
+# -----------------------
+# Run from command line
+# -----------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the RUL models")
+    parser.add_argument("--manifest", help="dataset manifest (JSON) to train every subset in parallel")
+    parser.add_argument("--cpus", type=int,
+                        help="CPU budget for --manifest / --tune (default: all cores)")
+    parser.add_argument("--compact", type=float, metavar="RMSE_BUDGET",
+                        help="build a compact RF within this RMSE of the full one")
+    parser.add_argument("--out-of-core", metavar="PATH",
+                        help="train on a C-MAPSS file larger than memory, streamed in chunks")
+    parser.add_argument("--chunksize", type=int, default=data_loader.CHUNK_ROWS,
+                        help="rows per chunk for --out-of-core")
+    parser.add_argument("--tune", type=int, nargs="?", const=27, metavar="TRIALS",
+                        help="search hyperparameters (default 27 configs per model) "
+                             f"and save them to {TUNED_PARAMS}")
+    args = parser.parse_args()
+    if args.tune is not None and args.tune < 1:
+        parser.error("--tune needs at least 1 trial")
+    if args.tune is not None:
+        tune_models(n_trials=args.tune, cpu_budget=args.cpus)
+    elif args.out_of_core:
+        train_large(args.out_of_core, chunksize=args.chunksize)
+    elif args.compact is not None:
+        compact_rf(rmse_budget=args.compact)
+    elif args.manifest:
+        train_manifest(args.manifest, cpu_budget=args.cpus)
+    else:
+        train_and_report()
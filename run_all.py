@@ -1,14 +1,31 @@
-from pipeline import run_pipeline
-from reports.generate_report import generate_pdf
+import argparse
+import sys
 
-def main():
-    # 1. Run pipeline
-    results = run_pipeline("data/sample_input.txt")
+from src.batch_scoring import DEFAULT_MODELS, FORMATS, run_shards
+from src.data_loader import CHUNK_ROWS
+from src.inference import QUANTILES
 
-    # 2. Generate PDF report
-    generate_pdf(results, "reports/compliance_report.pdf")
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Score fleet files without the UI: RUL per cycle for C-MAPSS sensor "
+                    "shards, cycle forecasts for EGT fleet CSVs (src/batch_scoring.py)")
+    parser.add_argument("shards", nargs="+", help="input files, one task per file")
+    parser.add_argument("--models", nargs="+", default=list(DEFAULT_MODELS),
+                        help="saved model packages (default: %(default)s)")
+    parser.add_argument("--out", default="scores", help="output folder (default: scores)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_ROWS, help="rows per chunk")
+    parser.add_argument("--stress", type=float, default=1.0,
+                        help="mission stress factor for the forecasts")
+    parser.add_argument("--format", choices=FORMATS, help="skip detection, treat every shard as this")
+    parser.add_argument("--intervals", action="store_true",
+                        help="add P10/P50/P90 RUL columns for RandomForest models")
+    args = parser.parse_args(argv)
 
-    print("✅ Compliance analysis complete. Report saved to reports/compliance_report.pdf")
+    run_shards(args.shards, args.models, args.out, args.workers, args.chunksize,
+               args.stress, args.format, QUANTILES if args.intervals else None)
+    print(f"✅ Batch scoring complete. Results written to {args.out}/")
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -1,5 +1,6 @@
 # scripts/make_rul_demo_chart.py
 import os
+import sys
 import pandas as pd
 import numpy as np
 from pathlib import Path
@@ -12,13 +13,16 @@ DATA = ROOT / "data"
 REPORTS = ROOT / "reports"
 REPORTS.mkdir(exist_ok=True, parents=True)
 
-# --- CMAPSS FD001 column schema ---
-cols = ["unit","cycle","op1","op2","op3"] + [f"sensor_{i}" for i in range(1,22)]
+sys.path.insert(0, str(ROOT))
+from src.data_loader import load_cmapss
+
+# CMAPSS subset to chart: python scripts/make_rul_demo_chart.py FD003
+SUBSET = sys.argv[1] if len(sys.argv) > 1 else "FD001"
 
 # --- Load training set (to failure, has true RUL to ~0) ---
-train = pd.read_csv(DATA/"train_FD001.txt", sep=r"\s+", header=None, names=cols)
-# Drop last empty column if present
-train = train.loc[:, train.columns.notna()]
+train = load_cmapss(DATA/f"train_{SUBSET}.txt").rename(columns={
+    "engine_id": "unit", "setting_1": "op1", "setting_2": "op2", "setting_3": "op3",
+})
 
 # Compute true RUL for training engines: max(cycle) - cycle
 max_cycles = train.groupby("unit")["cycle"].transform("max")
@@ -58,10 +62,10 @@ plt.plot(eng_sorted["cycle"], y_pred_smooth, label="Predicted RUL", linewidth=2)
 plt.plot(eng_sorted["cycle"], y_true, label="Actual RUL", linestyle="--", linewidth=2)
 plt.xlabel("Engine Cycles")
 plt.ylabel("Remaining Useful Life (cycles)")
-plt.title(f"RUL for Engine Unit {unit_id} (FD001)")
+plt.title(f"RUL for Engine Unit {unit_id} ({SUBSET})")
 plt.legend()
 plt.grid(True, alpha=0.3)
-out_path = REPORTS / "rul_demo.png"
+out_path = REPORTS / ("rul_demo.png" if SUBSET == "FD001" else f"rul_demo_{SUBSET}.png")
 plt.tight_layout()
 plt.savefig(out_path, dpi=200)
 print(f"✅ Saved chart to {out_path}")
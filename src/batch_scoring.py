@@ -0,0 +1,260 @@
+"""
+Headless batch scoring of fleet files, no Streamlit involved.
+
+    python run_all.py data/fleet_*.txt exports/egt_*.csv --out scores/
+
+Every input file (shard) is one task in a pool of worker processes:
+
+    cmapss / csv   C-MAPSS sensor histories -> RUL per cycle from every saved
+                   model, streamed in chunks (a worker holds one chunk plus
+                   the last few cycles per unfinished engine that the windows need)
+    fleet          EGT margin CSVs -> preventive / predictive cycle forecasts
+
+Results are Parquet files under <out>/rul/ and <out>/forecasts/, one per
+shard, plus <out>/summary.json with rows and rows/sec per shard.
+"""
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sklearn.ensemble import RandomForestRegressor
+
+from src import data_loader
+from src.flat_forest import FlatForest
+from src.forecast import forecast_fleet
+from src.inference import align_features, get_registry, predict_batch, predict_quantiles
+from src.instrument import stage
+
+FORMATS = ("cmapss", "csv", "fleet")
+CHUNK_READERS = {
+    "cmapss": data_loader.iter_cmapss,    # whitespace-delimited train/test FD00x
+    "csv": data_loader.iter_cmapss_csv,   # C-MAPSS layout with a header row
+}
+DEFAULT_MODELS = ("models/rf_model.pkl", "models/xgb_model.pkl")
+
+
+def detect_format(path):
+    """cmapss for text files; for CSVs, fleet if the header has EGT_Margin, else csv."""
+    if Path(path).suffix.lower() != ".csv":
+        return "cmapss"
+    with open(path, encoding="utf-8") as f:
+        header = [c.strip() for c in f.readline().split(",")]
+    return "fleet" if "EGT_Margin" in header else "csv"
+
+
+def model_name(path):
+    """rf for models/rf_model.pkl: names the rul_<name> output column."""
+    return Path(path).stem.removesuffix("_model")
+
+
+def _write_parquet(table_or_frame, path):
+    # Write then rename so a reader never sees half a shard
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    if isinstance(table_or_frame, pd.DataFrame):
+        table_or_frame.to_parquet(tmp, index=False)
+    else:
+        pq.write_table(table_or_frame, tmp)
+    os.replace(tmp, path)
+
+
+# ----------------------------
+# Workers
+# ----------------------------
+def _init_worker(model_paths, threads):
+    """Load every model once per worker; cap their threads to the worker's share."""
+    registry = get_registry()
+    registry.max_models = max(registry.max_models, len(model_paths))
+    registry.warm(model_paths)
+    for path in model_paths:
+        model = registry.get(path).model
+        if hasattr(model, "get_params") and "n_jobs" in model.get_params():
+            model.set_params(n_jobs=threads)
+
+
+def last_cycles(path, fmt, chunksize=data_loader.CHUNK_ROWS):
+    """
+    Last cycle per engine of a C-MAPSS shard, from one pass over two
+    columns. Raises ValueError if an engine's cycles are not strictly
+    increasing in file order, within or across chunks.
+    """
+    last = pd.Series(dtype="int64")
+    for chunk in CHUNK_READERS[fmt](path, chunksize, ["engine_id", "cycle"]):
+        order = np.argsort(chunk["engine_id"].to_numpy(), kind="stable")
+        engine = chunk["engine_id"].to_numpy()[order]
+        cycle = chunk["cycle"].to_numpy()[order]
+        first = np.ones(len(engine), dtype=bool)
+        first[1:] = engine[1:] != engine[:-1]
+        # Cycle before each row: the engine's previous row, or its last in earlier chunks
+        prev = np.empty(len(cycle))
+        prev[1:] = cycle[:-1]
+        prev[first] = last.reindex(engine[first]).to_numpy(dtype=np.float64)
+        bad = np.flatnonzero(cycle <= prev)
+        if len(bad):
+            i = bad[0]
+            raise ValueError(f"{path}: engine {engine[i]} goes from cycle {prev[i]:g} back to "
+                             f"{cycle[i]}; rows must be in cycle order per engine")
+        end = np.append(first[1:], True)
+        last = pd.Series(cycle[end], index=engine[end]).combine_first(last).astype("int64")
+    return last
+
+
+def score_shard(path, fmt, model_paths, out_path, chunksize=data_loader.CHUNK_ROWS,
+                quantiles=None):
+    """
+    RUL per row of a C-MAPSS shard from every model, written as one
+    Parquet row group per chunk: engine_id, cycle, rul_<model>... With
+    quantiles (e.g. (0.1, 0.5, 0.9)), RandomForest models also get
+    rul_<model>_p10 ... columns from the spread of their trees.
+
+    Windowed features carry each engine's last cycles into the next
+    chunk, so an engine's rows must come in cycle order (they may
+    interleave with other engines'); last_cycles checks that up front.
+    """
+    registry = get_registry()
+    entries = {model_name(p): registry.get(p) for p in model_paths}
+    history = max(e.spec.history for e in entries.values())
+    last_cycle = last_cycles(path, fmt, chunksize) if history else None
+    forests = {name for name, e in entries.items()
+               if isinstance(e.model, (FlatForest, RandomForestRegressor))}
+    writer, carry, rows, engines = None, None, 0, set()
+    tmp = out_path.with_name(f"{out_path.name}.{os.getpid()}.tmp")
+    with stage("score_shard", bytes=os.path.getsize(path)) as s:
+        try:
+            for chunk in CHUNK_READERS[fmt](path, chunksize):
+                # Earlier cycles of engines continuing from the previous chunk
+                block = chunk if carry is None else pd.concat([carry, chunk], ignore_index=True)
+                skip = len(block) - len(chunk)
+                out = {"engine_id": chunk["engine_id"].to_numpy(),
+                       "cycle": chunk["cycle"].to_numpy()}
+                for name, entry in entries.items():
+                    X = align_features(entry.featurize(block), entry.feature_names)[skip:]
+                    if quantiles and name in forests:
+                        out[f"rul_{name}"], q = predict_quantiles(entry.forest, X, quantiles,
+                                                                  return_mean=True)
+                        for i, level in enumerate(quantiles):
+                            out[f"rul_{name}_p{level * 100:g}"] = q[:, i]
+                    else:
+                        out[f"rul_{name}"] = predict_batch(entry.model, X)
+                table = pa.table(out)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp, table.schema)
+                writer.write_table(table)
+                rows += len(chunk)
+                engines.update(out["engine_id"].tolist())
+                if history:
+                    tail = block.groupby("engine_id", sort=False).tail(history)
+                    # Engines that reached their last cycle need no history
+                    done = tail["cycle"].to_numpy() >= last_cycle.reindex(tail["engine_id"]).to_numpy()
+                    carry = tail[~done]
+        finally:
+            if writer is not None:
+                writer.close()
+        s.add(rows=rows)
+    if writer is None:  # empty shard: still leave a readable file
+        pq.write_table(pa.table({"engine_id": pa.array([], pa.int32()),
+                                 "cycle": pa.array([], pa.uint16())}), tmp)
+    os.replace(tmp, out_path)
+    return rows, len(engines)
+
+
+def forecast_shard(path, out_path, stress=1.0, chunksize=data_loader.CHUNK_ROWS):
+    """Preventive / predictive cycle forecasts for every engine of a fleet CSV shard."""
+    with stage("forecast_shard", bytes=os.path.getsize(path)) as s:
+        df = data_loader.load_fleet_csv(path, chunksize)
+        forecasts = forecast_fleet(df, stress)
+        _write_parquet(forecasts.reset_index(), out_path)
+        s.add(rows=len(df))
+    return len(df), len(forecasts)
+
+
+def _run_shard(path, fmt, model_paths, out_dir, chunksize, stress, quantiles):
+    start = time.perf_counter()
+    if fmt == "fleet":
+        out_path = Path(out_dir) / "forecasts" / f"{Path(path).stem}.parquet"
+        rows, engines = forecast_shard(path, out_path, stress, chunksize)
+    else:
+        out_path = Path(out_dir) / "rul" / f"{Path(path).stem}.parquet"
+        rows, engines = score_shard(path, fmt, model_paths, out_path, chunksize, quantiles)
+    return {
+        "shard": str(path),
+        "format": fmt,
+        "rows": rows,
+        "engines": engines,
+        "output": str(out_path),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+# ----------------------------
+# Driver
+# ----------------------------
+def run_shards(shards, model_paths=DEFAULT_MODELS, out_dir="scores", workers=None,
+               chunksize=data_loader.CHUNK_ROWS, stress=1.0, fmt=None, quantiles=None):
+    """
+    Score every shard in a pool of `workers` processes (default: all
+    cores). fmt forces one input format; otherwise it's detected per file.
+    quantiles adds per-tree RUL quantiles for RandomForest models.
+    Returns the summary dict that is also written to <out_dir>/summary.json.
+    """
+    jobs = [(str(p), fmt or detect_format(p)) for p in shards]
+    unknown = [f for _, f in jobs if f not in FORMATS]
+    if unknown:
+        raise ValueError(f"Unknown format(s) {unknown}, expected one of {list(FORMATS)}")
+    missing = [p for p, _ in jobs if not Path(p).exists()]
+    if missing:
+        raise FileNotFoundError(f"Shards not found: {missing}")
+    stems = [Path(p).stem for p, _ in jobs]
+    if len(set(stems)) != len(stems):
+        raise ValueError(f"Shard file names must be unique (outputs are named after them): {stems}")
+
+    needs_models = any(f != "fleet" for _, f in jobs)
+    model_paths = [str(p) for p in model_paths] if needs_models else []
+    absent = [p for p in model_paths if not Path(p).exists()]
+    if absent:
+        raise FileNotFoundError(f"Models not found: {absent} (train them with pipeline.py)")
+    if needs_models and not model_paths:
+        raise ValueError("Scoring C-MAPSS shards needs at least one model")
+
+    out_dir = Path(out_dir)
+    for sub in ("rul", "forecasts"):
+        (out_dir / sub).mkdir(parents=True, exist_ok=True)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    start = time.perf_counter()
+    results = []
+    with stage("batch_score", shards=len(jobs), workers=workers) as s, \
+         ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(model_paths, threads)) as pool:
+        futures = [pool.submit(_run_shard, p, f, model_paths, out_dir, chunksize, stress, quantiles)
+                   for p, f in jobs]
+        for future in as_completed(futures):
+            r = future.result()
+            results.append(r)
+            s.add(rows=r["rows"])
+            print(f"✅ {r['shard']}: {r['rows']:,} rows, {r['engines']:,} engines, "
+                  f"{r['rows'] / max(r['seconds'], 1e-9):,.0f} rows/s -> {r['output']}")
+    wall = time.perf_counter() - start
+
+    order = {p: i for i, (p, _) in enumerate(jobs)}
+    results.sort(key=lambda r: order[r["shard"]])
+    total = sum(r["rows"] for r in results)
+    summary = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "models": {model_name(p): p for p in model_paths},
+        "workers": workers,
+        "rows": total,
+        "seconds": wall,
+        "rows_per_sec": total / wall if wall > 0 else None,
+        "shards": results,
+    }
+    (out_dir / "summary.json").write_text(json.dumps(summary, indent=2))
+    print(f"📊 {total:,} rows from {len(results)} shard(s) in {wall:.1f}s "
+          f"({summary['rows_per_sec'] or 0:,.0f} rows/s on {workers} worker(s))")
+    return summary
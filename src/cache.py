@@ -0,0 +1,66 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # cache becomes a pass-through without pyarrow
+    feather = None
+
+CACHE_DIR = Path(os.environ.get("STARCHECK_CACHE_DIR", ".cache/starcheck"))
+# Bump when the on-disk layout or the meaning of a cached frame changes
+CACHE_VERSION = 1
+# Entries kept per cache name before the oldest are evicted
+MAX_ENTRIES = 8
+
+
+def bytes_digest(data):
+    """Content hash of an in-memory buffer (e.g. an uploaded file)."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def file_digest(path, block_size=1 << 20):
+    """Content hash of a file on disk, read in blocks."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def cache_key(*parts):
+    """Stable key for any JSON-serializable parts (digests, specs, params)."""
+    payload = json.dumps([CACHE_VERSION, *parts], sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+def _evict(name, keep):
+    entries = sorted(CACHE_DIR.glob(f"{name}-*.feather"),
+                     key=lambda p: p.stat().st_mtime, reverse=True)
+    for stale in entries[keep:]:
+        stale.unlink(missing_ok=True)
+
+
+def cached_frame(name, key_parts, build):
+    """
+    Return the DataFrame cached under (name, key_parts), building and
+    storing it with build() on a miss. Entries are uncompressed Feather
+    files so hits are memory-mapped rather than parsed.
+    """
+    if feather is None:
+        return build()
+
+    path = CACHE_DIR / f"{name}-{cache_key(*key_parts)}.feather"
+    if path.exists():
+        table = feather.read_table(path, memory_map=True)
+        return table.to_pandas(split_blocks=True)
+
+    df = build()
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    feather.write_feather(df.reset_index(drop=True), tmp,
+                          compression="uncompressed")
+    os.replace(tmp, path)
+    _evict(name, MAX_ENTRIES)
+    return df
@@ -1,21 +1,130 @@
+import os
+
+import numpy as np
 import pandas as pd
 
+from src.instrument import stage
+
+# According to FD001 spec: 26 columns (engine_id, cycle, 3 ops, 21 sensors)
+CMAPSS_COLUMNS = (
+    ['engine_id', 'cycle', 'setting_1', 'setting_2', 'setting_3'] +
+    [f'sensor_{i}' for i in range(1, 22)]
+)
+CMAPSS_DTYPES = {
+    'engine_id': np.int32,
+    'cycle': np.uint16,
+    **{c: np.float32 for c in CMAPSS_COLUMNS[2:]},
+}
+
+# Uploaded fleet CSVs (Engine_ID, Engine_Model, Cycles, EGT_Margin, ...)
+FLEET_DTYPES = {
+    'Engine_ID': str,
+    'Engine_Model': str,
+}
+# Parsed leniently to float32: uploads may have blank or fractional cycles
+FLEET_NUMERIC = ('Cycles', 'EGT_Margin')
+
+# Rows per chunk: ~12 MB per CMAPSS chunk once typed
+CHUNK_ROWS = 100_000
+
+
+def iter_cmapss(path, chunksize=CHUNK_ROWS, columns=None):
+    """
+    Stream a whitespace-delimited C-MAPSS file (train/test FD00x) as
+    typed chunks of at most `chunksize` rows, optionally only `columns`.
+    """
+    reader = pd.read_csv(
+        path,
+        sep=r"\s+",
+        engine="c",
+        header=None,
+        names=CMAPSS_COLUMNS,
+        usecols=list(columns) if columns is not None else range(len(CMAPSS_COLUMNS)),
+        dtype=CMAPSS_DTYPES,
+        chunksize=chunksize,
+    )
+    with reader:
+        yield from reader
+
+
+def load_cmapss(path, chunksize=CHUNK_ROWS):
+    """Load a whole C-MAPSS file through the chunked reader."""
+    with stage("load", bytes=os.path.getsize(path)) as s:
+        df = pd.concat(iter_cmapss(path, chunksize), ignore_index=True)
+        s.add(rows=len(df))
+    return df
+
+
+def iter_cmapss_csv(path, chunksize=CHUNK_ROWS, columns=None):
+    """
+    Stream a fleet export in C-MAPSS layout saved as a CSV with a header
+    row using CMAPSS_COLUMNS names (extra columns are ignored), optionally
+    only `columns`.
+    """
+    columns = list(columns) if columns is not None else CMAPSS_COLUMNS
+    reader = pd.read_csv(path, engine="c", usecols=columns,
+                         dtype=CMAPSS_DTYPES, chunksize=chunksize)
+    with reader:
+        for chunk in reader:
+            yield chunk[columns]
+
+
+def load_cmapss_csv(path, chunksize=CHUNK_ROWS):
+    """Load a whole C-MAPSS-layout CSV export (see iter_cmapss_csv)."""
+    with stage("load", bytes=os.path.getsize(path)) as s:
+        df = pd.concat(iter_cmapss_csv(path, chunksize), ignore_index=True)
+        s.add(rows=len(df))
+    return df
+
+
 def load_fd001(path):
     """
     Load NASA C-MAPSS FD001 dataset.
     Returns dataframe with consistent column names.
     """
-    # According to FD001 spec: 26 columns (engine_id, cycle, 3 ops, 21 sensors)
-    col_names = (
-        ['engine_id', 'cycle', 'setting_1', 'setting_2', 'setting_3'] +
-        [f'sensor_{i}' for i in range(1, 22)]
-    )
+    return load_cmapss(path)
 
-    df = pd.read_csv(
-        path,
-        sep=r"\s+",
-        header=None,
-        names=col_names
+
+def iter_fleet_csv(path_or_buffer, chunksize=CHUNK_ROWS):
+    """
+    Stream an uploaded fleet CSV as chunks with compact dtypes.
+    Known columns are typed (unparseable Cycles / EGT_Margin become NaN);
+    any extra numeric columns are left to pandas.
+    """
+    reader = pd.read_csv(
+        path_or_buffer,
+        engine="c",
+        dtype=FLEET_DTYPES,
+        chunksize=chunksize,
     )
+    with reader:
+        for chunk in reader:
+            for col in FLEET_NUMERIC:
+                if col in chunk.columns:
+                    chunk[col] = pd.to_numeric(chunk[col], errors='coerce').astype(np.float32)
+            for col in ('Engine_ID', 'Engine_Model'):
+                if col in chunk.columns:
+                    chunk[col] = chunk[col].astype('category')
+            yield chunk
+
 
+def load_fleet_csv(path_or_buffer, chunksize=CHUNK_ROWS):
+    """
+    Load a fleet CSV; string columns come back as categoricals. Rows
+    without a usable Cycles / EGT_Margin value are dropped and counted.
+    """
+    with stage("load_fleet") as s:
+        chunks = list(iter_fleet_csv(path_or_buffer, chunksize))
+        df = pd.concat(chunks, ignore_index=True)
+        required = [c for c in FLEET_NUMERIC if c in df.columns]
+        bad = df[required].isna().any(axis=1).to_numpy()
+        if bad.any():
+            print(f"⚠️ Dropped {int(bad.sum())} fleet row(s) with missing or non-numeric {'/'.join(required)}")
+            df = df[~bad].reset_index(drop=True)
+            s.add(dropped=int(bad.sum()))
+        # Per-chunk categories differ, so concat falls back to object dtype
+        for col in ('Engine_ID', 'Engine_Model'):
+            if col in df.columns and df[col].dtype != 'category':
+                df[col] = df[col].astype('category')
+        s.add(rows=len(df))
     return df
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+
+def minmax_downsample(df, points_per_engine, engine_col="Engine_ID",
+                      x_col="Cycles", y_col="EGT_Margin"):
+    """
+    Thin every engine's history to at most ~points_per_engine rows.
+
+    Each engine's cycles (in x order) are cut into points_per_engine / 2
+    equal-count buckets and only the min and max y of every bucket are
+    kept, so dips and spikes survive while flat stretches collapse. All
+    engines are processed in one vectorized pass. Engines already under
+    the budget are returned untouched. Returns a frame of the kept rows
+    sorted by engine (first-appearance order) then x.
+    """
+    codes, _ = pd.factorize(df[engine_col], sort=False)
+    order = _engine_x_order(codes, df[x_col].to_numpy())
+    codes = codes[order]
+    y = df[y_col].to_numpy(dtype=np.float64)[order]
+
+    n = len(order)
+    if n == 0:
+        return df.iloc[:0]
+    counts = np.bincount(codes)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    pos = np.arange(n) - starts[codes]
+
+    buckets = max(1, points_per_engine // 2)
+    bucket_size = np.maximum(1, -(-counts // buckets))  # ceil division
+    bucket = pos // bucket_size[codes]
+    # Segment id grows monotonically in sorted order -> contiguous segments
+    seg_start = np.ones(n, dtype=bool)
+    seg_start[1:] = (codes[1:] != codes[:-1]) | (bucket[1:] != bucket[:-1])
+    seg = np.cumsum(seg_start) - 1
+    first = np.flatnonzero(seg_start)
+
+    # NaNs never win min/max; an all-NaN bucket matches +/-inf and keeps its first row
+    y_lo = np.where(np.isnan(y), np.inf, y)
+    y_hi = np.where(np.isnan(y), -np.inf, y)
+    at_min = _first_match(y_lo == np.minimum.reduceat(y_lo, first)[seg], seg)
+    at_max = _first_match(y_hi == np.maximum.reduceat(y_hi, first)[seg], seg)
+    return df.iloc[order[np.union1d(at_min, at_max)]]
+
+
+def _first_match(mask, seg):
+    """Index of the first True in each run of a sorted segment id array."""
+    hits = np.flatnonzero(mask)
+    hit_seg = seg[hits]
+    is_first = np.ones(len(hits), dtype=bool)
+    is_first[1:] = hit_seg[1:] != hit_seg[:-1]
+    return hits[is_first]
+
+
+def _engine_x_order(codes, x):
+    """Argsort by (engine code, x); integer x is packed into one key."""
+    if np.issubdtype(x.dtype, np.integer) and len(x):
+        lo, span = int(x.min()), int(x.max()) - int(x.min()) + 1
+        if span * (int(codes.max()) + 1) < 2**62:
+            return np.argsort(codes.astype(np.int64) * span + (x - lo))
+    return np.lexsort((x, codes))
@@ -0,0 +1,154 @@
+import re
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+
+SETTINGS = ("setting_1", "setting_2", "setting_3")
+SENSORS = tuple(f"sensor_{i}" for i in range(1, 22))
+OPS = ("rollmean", "diff")
+
+_NAME_RE = re.compile(r"^(?P<sensor>sensor_\d+)_(?:rollmean_w(?P<w>\d+)|diff(?:_(?P<lag>\d+))?)$")
+
+
+@dataclass(frozen=True)
+class FeatureOp:
+    """One windowed op on one sensor: a rolling mean or a lagged diff."""
+    sensor: str
+    op: str
+    window: int = 1  # rolling window for rollmean, lag for diff
+
+    def __post_init__(self):
+        if self.op not in OPS:
+            raise ValueError(f"Unknown feature op {self.op!r}, expected one of {OPS}")
+        if self.window < 1:
+            raise ValueError(f"Window must be >= 1, got {self.window}")
+
+    @property
+    def name(self):
+        if self.op == "rollmean":
+            return f"{self.sensor}_rollmean_w{self.window}"
+        return f"{self.sensor}_diff" if self.window == 1 else f"{self.sensor}_diff_{self.window}"
+
+    @classmethod
+    def from_name(cls, name):
+        """Parse a generated column name back into its op, or None."""
+        m = _NAME_RE.match(name)
+        if m is None:
+            return None
+        if m["w"] is not None:
+            return cls(m["sensor"], "rollmean", int(m["w"]))
+        return cls(m["sensor"], "diff", int(m["lag"] or 1))
+
+
+def _nested(a):
+    return tuple(map(tuple, np.asarray(a, dtype=np.float64).tolist()))
+
+
+@dataclass(frozen=True)
+class RegimeNorm:
+    """
+    Operating-regime normalization fitted by features.fit_regimes:
+    regime centroids over the settings (distances are measured after
+    dividing by `scale`) and per-regime mean/std of every sensor.
+    """
+    centroids: tuple  # (regimes, settings)
+    scale: tuple      # (settings,)
+    mean: tuple       # (regimes, sensors)
+    std: tuple        # (regimes, sensors)
+    settings: tuple = SETTINGS
+    sensors: tuple = SENSORS
+
+    @property
+    def n_regimes(self):
+        return len(self.centroids)
+
+    def to_dict(self):
+        return {
+            "centroids": [list(c) for c in self.centroids],
+            "scale": list(self.scale),
+            "mean": [list(m) for m in self.mean],
+            "std": [list(s) for s in self.std],
+            "settings": list(self.settings),
+            "sensors": list(self.sensors),
+        }
+
+    @classmethod
+    def from_arrays(cls, centroids, scale, mean, std, settings=SETTINGS, sensors=SENSORS):
+        return cls(_nested(centroids), tuple(np.asarray(scale, dtype=np.float64).tolist()),
+                   _nested(mean), _nested(std), tuple(settings), tuple(sensors))
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls.from_arrays(d["centroids"], d["scale"], d["mean"], d["std"],
+                               d["settings"], d["sensors"])
+
+
+@dataclass(frozen=True)
+class FeatureSpec:
+    """
+    Single source of truth for model inputs: raw columns passed through
+    as-is plus the windowed ops computed per engine. With `regimes` set,
+    sensors are standardized per operating regime before anything else.
+    """
+    ops: tuple
+    raw: tuple = field(default=SETTINGS + SENSORS)
+    regimes: RegimeNorm = None
+
+    @property
+    def feature_names(self):
+        return list(self.raw) + [op.name for op in self.ops]
+
+    @property
+    def history(self):
+        """Earlier rows of the same engine the ops look back on (w - 1 for rollmean, lag for diff)."""
+        return max((op.window - 1 if op.op == "rollmean" else op.window for op in self.ops),
+                   default=0)
+
+    def select(self, names):
+        """Spec reduced to what a model trained on `names` needs."""
+        wanted = set(names)
+        return FeatureSpec(
+            ops=tuple(op for op in self.ops if op.name in wanted),
+            raw=tuple(c for c in self.raw if c in wanted),
+            regimes=self.regimes,
+        )
+
+    def with_regimes(self, regimes):
+        """Same spec with a fitted RegimeNorm (or None to drop it)."""
+        return replace(self, regimes=regimes)
+
+    def to_dict(self):
+        d = {
+            "raw": list(self.raw),
+            "ops": [{"sensor": op.sensor, "op": op.op, "window": op.window}
+                    for op in self.ops],
+        }
+        if self.regimes is not None:
+            d["regimes"] = self.regimes.to_dict()
+        return d
+
+    @classmethod
+    def from_dict(cls, d):
+        regimes = d.get("regimes")
+        return cls(ops=tuple(FeatureOp(**op) for op in d["ops"]), raw=tuple(d["raw"]),
+                   regimes=RegimeNorm.from_dict(regimes) if regimes else None)
+
+    @classmethod
+    def from_feature_names(cls, names):
+        """Rebuild a spec from a model's feature_names (for older artifacts)."""
+        ops, raw = [], []
+        for name in names:
+            op = FeatureOp.from_name(name)
+            if op is None:
+                raw.append(name)
+            else:
+                ops.append(op)
+        return cls(ops=tuple(ops), raw=tuple(raw))
+
+
+# Matches feature_list.txt: rolling mean (w=5) and first difference for
+# the sensors that carry most of the degradation signal.
+DEFAULT_SPEC = FeatureSpec(ops=tuple(
+    [FeatureOp(f"sensor_{s}", "rollmean", 5) for s in (7, 11, 12)]
+    + [FeatureOp(f"sensor_{s}", "diff", 1) for s in (7, 11, 12)]
+))
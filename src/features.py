@@ -1,5 +1,9 @@
+import numpy as np
 import pandas as pd
 
+from src.feature_spec import DEFAULT_SPEC, SENSORS, SETTINGS, RegimeNorm
+from src.instrument import stage
+
 def add_rul(df):
     """
     Add Remaining Useful Life (RUL) column.
@@ -10,25 +14,170 @@ def add_rul(df):
     df["RUL"] = rul
     return df
 
-def add_features(df):
+# -----------------------
+# Operating-regime normalization
+# -----------------------
+def fit_regimes(df, n_regimes=6, settings=SETTINGS, sensors=SENSORS, seed=42):
     """
-    Add engineered features to match training + app consistently.
-    Uses rolling mean (window=5) and first difference
-    for selected sensors.
+    Cluster the operating settings into n_regimes (KMeans, settings scaled
+    by their std) and store each regime's centroid plus the mean/std of
+    every sensor within it. FD002/FD004 fly six regimes.
     """
-    df = df.copy()
+    from sklearn.cluster import KMeans
 
-    # Rolling mean (window = 5)
-    for sensor in [7, 11, 12]:
-        df[f"sensor_{sensor}_rollmean_w5"] = (
-            df.groupby("engine_id")[f"sensor_{sensor}"]
-              .transform(lambda x: x.rolling(window=5, min_periods=1).mean())
-        )
+    X = df[list(settings)].to_numpy(dtype=np.float64)
+    scale = X.std(axis=0)
+    scale[~(scale > 0)] = 1.0
+    labels = KMeans(n_regimes, n_init=10, random_state=seed).fit_predict(X / scale)
+    centroids = np.array([X[labels == r].mean(axis=0) for r in range(n_regimes)])
 
-    # First difference (delta from previous cycle)
-    for sensor in [7, 11, 12]:
-        df[f"sensor_{sensor}_diff"] = (
-            df.groupby("engine_id")[f"sensor_{sensor}"].diff().fillna(0)
-        )
+    values = df[list(sensors)].to_numpy(dtype=np.float64)
+    mean = np.array([np.nanmean(values[labels == r], axis=0) for r in range(n_regimes)])
+    std = np.array([np.nanstd(values[labels == r], axis=0) for r in range(n_regimes)])
+    # Sensors flat within a regime are only centered
+    std[~(std > 0)] = 1.0
+    return RegimeNorm.from_arrays(np.nan_to_num(centroids), scale, np.nan_to_num(mean), std,
+                                  settings, sensors)
 
-    return df
+def assign_regimes(settings, regimes):
+    """
+    Nearest regime centroid for each row of a (rows, settings) array,
+    from one (rows, regimes) squared-distance matrix.
+    """
+    scale = np.asarray(regimes.scale)
+    x = np.asarray(settings, dtype=np.float64) / scale
+    c = np.asarray(regimes.centroids) / scale
+    dist = (c * c).sum(axis=1) - 2.0 * (x @ c.T)  # |x|^2 is the same for every centroid
+    return dist.argmin(axis=1)
+
+def normalize_regimes(df, regimes):
+    """
+    Standardize every sensor by the mean/std of its row's regime.
+    Returns a new frame; settings and all other columns are unchanged.
+    """
+    sensors = list(regimes.sensors)
+    reg = assign_regimes(df[list(regimes.settings)].to_numpy(), regimes)
+    dtype = np.result_type(np.float32, *df[sensors].dtypes)
+    values = df[sensors].to_numpy(dtype=dtype, copy=True)
+    values -= np.asarray(regimes.mean, dtype=dtype)[reg]
+    values /= np.asarray(regimes.std, dtype=dtype)[reg]
+    out = df.copy(deep=False)
+    out[sensors] = values
+    return out
+
+# -----------------------
+# Vectorized window kernel
+# -----------------------
+def _sort_by_engine(df, group_col="engine_id", order_col="cycle"):
+    """
+    Row order that makes each engine contiguous and cycle-ascending,
+    plus the (sorted) index of the first row of each row's engine.
+    Returns order=None when the frame is already in that order.
+    """
+    groups = df[group_col].to_numpy()
+    cycles = df[order_col].to_numpy()
+    order = np.lexsort((cycles, groups))
+    if np.array_equal(order, np.arange(len(order))):
+        order = None
+    else:
+        groups = groups[order]
+
+    n = len(groups)
+    is_start = np.ones(n, dtype=bool)
+    is_start[1:] = groups[1:] != groups[:-1]
+    starts = np.maximum.accumulate(np.where(is_start, np.arange(n), 0))
+    return order, starts
+
+def rolling_mean(values, starts, window):
+    """
+    Trailing rolling mean over a 2-D (rows, sensors) array sorted by
+    engine, matching rolling(window, min_periods=1).mean() per engine.
+    NaNs are skipped like pandas does.
+    """
+    n = len(values)
+    # Sensor-major layout so the cumulative sums run over contiguous memory
+    cols = np.ascontiguousarray(values.T, dtype=np.float64)
+    valid = ~np.isnan(cols)
+    has_nan = not valid.all()
+    # Center each sensor so the cumulative sums stay small
+    offset = np.nan_to_num(np.nanmean(cols, axis=1, keepdims=True)) if n else 0.0
+    cols -= offset
+    if has_nan:
+        cols[~valid] = 0.0
+    csum = np.zeros((cols.shape[0], n + 1))
+    np.cumsum(cols, axis=1, out=csum[:, 1:])
+
+    hi = np.arange(1, n + 1)
+    lo = np.maximum(hi - window, starts)
+    total = csum[:, 1:] - csum[:, lo]
+    if has_nan:
+        ccount = np.zeros((cols.shape[0], n + 1), dtype=np.int64)
+        np.cumsum(valid, axis=1, out=ccount[:, 1:])
+        count = ccount[:, 1:] - ccount[:, lo]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(count > 0, total / count + offset, np.nan)
+    else:
+        total /= hi - lo
+        mean = total + offset
+    return mean.T
+
+def lagged_diff(values, starts, lag=1):
+    """x[t] - x[t - lag] within each engine; NaN where no lagged row exists."""
+    out = np.full(values.shape, np.nan, dtype=values.dtype)
+    rows = np.arange(lag, len(values))
+    rows = rows[rows - lag >= starts[rows]]
+    out[rows] = values[rows] - values[rows - lag]
+    return out
+
+def compile_spec(spec, required=None):
+    """
+    Compile a FeatureSpec into one function df -> DataFrame of op columns.
+    Only ops named in `required` (e.g. a model's feature_names) are
+    computed. Ops sharing a kind and window run as one 2-D kernel call.
+    """
+    if required is not None:
+        spec = spec.select(required)
+    ops = list(spec.ops)
+    sensors = list(dict.fromkeys(op.sensor for op in ops))
+    col_of = {s: i for i, s in enumerate(sensors)}
+
+    plan = {}
+    for j, op in enumerate(ops):
+        src_cols, out_cols = plan.setdefault((op.op, op.window), ([], []))
+        src_cols.append(col_of[op.sensor])
+        out_cols.append(j)
+    names = [op.name for op in ops]
+
+    def run(df):
+        out = np.empty((len(df), len(ops)))
+        if ops:
+            order, starts = _sort_by_engine(df)
+            values = df[sensors].to_numpy()
+            if order is not None:
+                values = values[order]
+            for (kind, window), (src_cols, out_cols) in plan.items():
+                block = values[:, src_cols]
+                if kind == "rollmean":
+                    out[:, out_cols] = rolling_mean(block, starts, window)
+                else:
+                    out[:, out_cols] = np.nan_to_num(lagged_diff(block, starts, window))
+            if order is not None:
+                unsorted = np.empty_like(out)
+                unsorted[order] = out
+                out = unsorted
+        return pd.DataFrame(out, index=df.index, columns=names)
+
+    return run
+
+def add_features(df, spec=DEFAULT_SPEC, required=None):
+    """
+    Add engineered features to match training + app consistently.
+    What gets computed comes from the feature spec (see
+    src/feature_spec.py); by default rolling mean (window=5) and first
+    difference for selected sensors. A spec with fitted regimes first
+    standardizes the sensors per operating regime.
+    """
+    with stage("features", rows=len(df)):
+        if spec.regimes is not None:
+            df = normalize_regimes(df, spec.regimes)
+        return pd.concat([df, compile_spec(spec, required)(df)], axis=1)
@@ -0,0 +1,192 @@
+import numpy as np
+
+# Rows x trees of leaf indices held at once; bounds temporary memory
+_CELLS_PER_BATCH = 1 << 22
+
+
+class FlatForest:
+    """
+    Array-backed copy of a fitted RandomForestRegressor.
+
+    Every tree's nodes live in shared flat arrays indexed globally, with
+    roots[t] the first node of tree t: feature/threshold per split node,
+    children[2*i] / children[2*i + 1] the left / right child of node i
+    (leaves point to themselves) and value the node's mean target. Plain
+    ndarrays mean joblib.load(mmap_mode="r") maps them straight from the
+    page cache instead of copying them into each process.
+    """
+
+    def __init__(self, feature, threshold, children, value, roots, depth, n_features):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.depth = int(depth)
+        self.n_features_in_ = int(n_features)
+        self._is_leaf = None
+
+    @classmethod
+    def from_sklearn(cls, forest, trees=None, max_depth=None, dtype=np.float64):
+        """
+        Flatten a fitted sklearn forest (or a list of fitted regression trees).
+
+        trees keeps only those estimator indices; max_depth turns nodes at
+        that depth into leaves predicting their node mean and drops
+        everything below; dtype=np.float32 halves thresholds and values.
+        float32 thresholds are rounded down, which keeps every split
+        decision identical for the float32 inputs predict() compares.
+        """
+        estimators = list(getattr(forest, "estimators_", forest))
+        if trees is not None:
+            estimators = [estimators[i] for i in trees]
+        feature, threshold, children, value, roots, depths = [], [], [], [], [], []
+        root = 0
+        for est in estimators:
+            tree = est.tree_
+            left, right = tree.children_left, tree.children_right
+            depth = _node_depths(left, right)
+            keep = np.ones(tree.node_count, dtype=bool)
+            is_leaf = left == -1
+            if max_depth is not None:
+                keep = depth <= max_depth
+                is_leaf = is_leaf | (depth == max_depth)
+            # Renumber the kept nodes contiguously from this tree's root
+            new_id = np.cumsum(keep) - 1 + root
+            own = new_id[keep]
+            is_leaf = is_leaf[keep]
+            pair = np.empty((len(own), 2), dtype=np.int64)
+            pair[:, 0] = np.where(is_leaf, own, new_id[left[keep]])
+            pair[:, 1] = np.where(is_leaf, own, new_id[right[keep]])
+            feature.append(np.where(is_leaf, 0, tree.feature[keep]))
+            threshold.append(np.where(is_leaf, 0.0, tree.threshold[keep]))
+            children.append(pair.ravel())
+            value.append(tree.value[keep, 0, 0])
+            roots.append(root)
+            depths.append(depth[keep].max())
+            root += len(own)
+
+        threshold = np.concatenate(threshold)
+        if np.dtype(dtype) == np.float32:
+            t32 = threshold.astype(np.float32)
+            # x <= t (float64) <=> x <= largest float32 not above t, for float32 x
+            up = t32.astype(np.float64) > threshold
+            t32[up] = np.nextafter(t32[up], np.float32(-np.inf))
+            threshold = t32
+        return cls(
+            feature=np.concatenate(feature).astype(np.int32),
+            threshold=threshold.astype(dtype, copy=False),
+            children=np.concatenate(children).astype(np.int32),
+            value=np.concatenate(value).astype(dtype),
+            roots=np.array(roots, dtype=np.int32),
+            depth=max(depths),
+            n_features=estimators[0].tree_.n_features,
+        )
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.children,
+                                      self.value, self.roots))
+
+    @property
+    def is_leaf(self):
+        if self._is_leaf is None:
+            self._is_leaf = self.children[0::2] == np.arange(self.n_nodes)
+        return self._is_leaf
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_is_leaf"] = None
+        return state
+
+    def _check(self, X):
+        # sklearn compares float32 inputs against the split thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} features, got shape {X.shape}")
+        return X
+
+    def _apply(self, X, out):
+        """Fill out[:, t] with the leaf reached by each row of X in tree t."""
+        flat_x = X.ravel()
+        row_base = np.arange(len(X), dtype=np.int64) * X.shape[1]
+        feature, threshold, children = self.feature, self.threshold, self.children
+        is_leaf = self.is_leaf
+        for t, root in enumerate(self.roots):
+            node = np.full(len(X), root, dtype=np.int64)
+            rows = np.arange(len(X))
+            base = row_base
+            # Walk all rows down one level per step; rows that reach a leaf drop out
+            while len(rows):
+                go_right = flat_x[base + feature[node]] > threshold[node]
+                node = children[2 * node + go_right]
+                done = is_leaf[node]
+                if done.any():
+                    out[rows[done], t] = node[done]
+                    keep = ~done
+                    rows, node, base = rows[keep], node[keep], base[keep]
+        return out
+
+    def apply(self, X):
+        """Leaf node index reached by every row in every tree, shape (rows, trees)."""
+        X = self._check(X)
+        out = np.empty((len(X), self.n_trees), dtype=np.int32)
+        step = max(1, _CELLS_PER_BATCH // self.n_trees)
+        for start in range(0, len(X), step):
+            self._apply(X[start:start + step], out[start:start + step])
+        return out
+
+    def predict_trees(self, X):
+        """Per-tree predictions, shape (rows, trees)."""
+        return self.value[self.apply(X)]
+
+    def _tree_values(self, X):
+        """(start, per-tree predictions) for consecutive row batches of X."""
+        step = max(1, _CELLS_PER_BATCH // self.n_trees)
+        leaves = np.empty((min(step, len(X)), self.n_trees), dtype=np.int32)
+        for start in range(0, len(X), step):
+            xb = X[start:start + step]
+            yield start, self.value[self._apply(xb, leaves[:len(xb)])]
+
+    def predict(self, X):
+        X = self._check(X)
+        out = np.empty(len(X))
+        for start, values in self._tree_values(X):
+            out[start:start + len(values)] = values.mean(axis=1)
+        return out
+
+    def predict_quantiles(self, X, quantiles=(0.1, 0.5, 0.9), return_mean=False):
+        """
+        Quantiles of the per-tree predictions, shape (rows, len(quantiles)),
+        from the same single pass over the trees as predict(); with
+        return_mean=True, (predict(X), quantiles) from that one pass.
+        """
+        X = self._check(X)
+        q = np.asarray(quantiles, dtype=np.float64)
+        if q.ndim != 1 or ((q < 0) | (q > 1)).any():
+            raise ValueError(f"quantiles must be a list of values in [0, 1], got {quantiles}")
+        mean = np.empty(len(X))
+        out = np.empty((len(X), len(q)))
+        for start, values in self._tree_values(X):
+            mean[start:start + len(values)] = values.mean(axis=1)
+            out[start:start + len(values)] = np.quantile(values, q, axis=1).T
+        return (mean, out) if return_mean else out
+
+
+def _node_depths(left, right):
+    """Depth of every node of one sklearn tree (root = 0), level by level."""
+    depth = np.zeros(len(left), dtype=np.int64)
+    level, d = np.array([0]), 0
+    while len(level):
+        depth[level] = d
+        kids = np.concatenate([left[level], right[level]])
+        level, d = kids[kids != -1], d + 1
+    return depth
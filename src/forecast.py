@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+# EGT margin limits (°C) and the economics used across the app pages
+PREVENTIVE_LIMIT = 50
+PREDICTIVE_LIMIT = 30
+CYCLES_PER_DAY = 3
+VALUE_PER_DAY = 2500
+
+# P10 / P90 of a normal estimate: the forecast band is slope -/+ Z_P90 * its std. error
+Z_P90 = 1.2815515655446004
+
+FORECAST_COLUMNS = ["Model", "slope", "intercept", "preventive_cycles",
+                    "predictive_cycles", "days_saved", "value",
+                    "x_mean", "slope_se", "predictive_p10", "predictive_p90"]
+
+
+def fit_fleet(df, engine_col="Engine_ID", x_col="Cycles", y_col="EGT_Margin"):
+    """
+    Least-squares degradation fit for every engine in one pass.
+    Returns a frame indexed by engine (first-appearance order) with
+    slope, intercept, n, the mean cycle x_mean, the slope's standard
+    error slope_se (0 with fewer than 3 points) and the first
+    Engine_Model seen for the engine.
+    """
+    codes, engines = pd.factorize(df[engine_col], sort=False)
+    n_eng = len(engines)
+    x = df[x_col].to_numpy(dtype=np.float64)
+    y = df[y_col].to_numpy(dtype=np.float64)
+
+    # Centered sums keep the closed form stable for large cycle counts
+    n = np.bincount(codes, minlength=n_eng).astype(np.float64)
+    x_mean = np.bincount(codes, weights=x, minlength=n_eng) / n
+    y_mean = np.bincount(codes, weights=y, minlength=n_eng) / n
+    dx = x - x_mean[codes]
+    dy = y - y_mean[codes]
+    sxx = np.bincount(codes, weights=dx * dx, minlength=n_eng)
+    sxy = np.bincount(codes, weights=dx * dy, minlength=n_eng)
+    syy = np.bincount(codes, weights=dy * dy, minlength=n_eng)
+
+    # Same convention as LinearRegression: no spread in x -> flat line
+    slope = np.divide(sxy, sxx, out=np.zeros(n_eng), where=sxx > 0)
+    intercept = y_mean - slope * x_mean
+    # Residual variance / sxx; the residual sum is syy - slope * sxy
+    resid_var = np.divide(np.maximum(syy - slope * sxy, 0), n - 2,
+                          out=np.zeros(n_eng), where=n > 2)
+    slope_se = np.sqrt(np.divide(resid_var, sxx, out=np.zeros(n_eng), where=sxx > 0))
+
+    fits = pd.DataFrame({"slope": slope, "intercept": intercept, "n": n,
+                         "x_mean": x_mean, "slope_se": slope_se},
+                        index=pd.Index(np.asarray(engines), name=engine_col))
+    if "Engine_Model" in df.columns:
+        first = np.full(n_eng, len(df), dtype=np.int64)
+        np.minimum.at(first, codes, np.arange(len(df)))
+        fits.insert(0, "Model", df["Engine_Model"].to_numpy()[first])
+    return fits
+
+
+def _stress_vector(stress_factor, index):
+    """Broadcast a scalar, array or per-engine mapping onto the fit index."""
+    if isinstance(stress_factor, dict):
+        stress_factor = pd.Series(stress_factor)
+    if isinstance(stress_factor, pd.Series):
+        stress = stress_factor.reindex(index).to_numpy(dtype=np.float64)
+        if np.isnan(stress).any():
+            missing = index[np.isnan(stress)].tolist()
+            raise ValueError(f"No stress factor for engines: {missing}")
+        return stress
+    stress = np.asarray(stress_factor, dtype=np.float64)
+    if stress.ndim and stress.shape != (len(index),):
+        raise ValueError(f"stress_factor has shape {stress.shape}, "
+                         f"expected ({len(index)},)")
+    return np.broadcast_to(stress, (len(index),))
+
+
+def apply_stress(fits, stress_factor=1.0):
+    """
+    Turn per-engine fits into the forecast table used by the pages.
+    stress_factor scales each engine's slope and may be a scalar, an array
+    aligned with fits.index, or a Series/dict keyed by engine.
+
+    predictive_p10 / predictive_p90 are the cycles to the predictive
+    limit with the slope at its P10 (worst case, steepest decline) and
+    P90: lines through the forecast at x_mean, so the band is
+    forecast -/+ Z_P90 * slope_se * |x - x_mean|.
+    """
+    stress = _stress_vector(stress_factor, fits.index)
+    slope = fits["slope"].to_numpy() * stress
+    intercept = fits["intercept"].to_numpy()
+
+    def to_threshold(th):
+        return np.divide(th - intercept, slope,
+                         out=np.full(len(slope), np.inf), where=slope != 0)
+
+    preventive = to_threshold(PREVENTIVE_LIMIT)
+    predictive = to_threshold(PREDICTIVE_LIMIT)
+    with np.errstate(invalid="ignore"):
+        days = (predictive - preventive) / CYCLES_PER_DAY
+
+    x_mean = fits["x_mean"].to_numpy()
+    slope_se = fits["slope_se"].to_numpy() * stress
+    y_at_mean = intercept + slope * x_mean
+
+    def band_to_threshold(th, z):
+        # A line that isn't declining never reaches the limit
+        s = slope - z * slope_se
+        return np.divide(th - y_at_mean, s, out=np.full(len(s), np.inf), where=s < 0) + x_mean
+
+    out = pd.DataFrame({
+        "slope": slope,
+        "intercept": intercept,
+        "preventive_cycles": preventive,
+        "predictive_cycles": predictive,
+        "days_saved": days,
+        "value": days * VALUE_PER_DAY,
+        "x_mean": x_mean,
+        "slope_se": slope_se,
+        "predictive_p10": band_to_threshold(PREDICTIVE_LIMIT, Z_P90),
+        "predictive_p90": band_to_threshold(PREDICTIVE_LIMIT, -Z_P90),
+    }, index=fits.index)
+    if "Model" in fits.columns:
+        out.insert(0, "Model", fits["Model"])
+    return out
+
+
+def forecast_fleet(df, stress_factor=1.0):
+    """Fit every engine and return its columnar forecast table."""
+    return apply_stress(fit_fleet(df), stress_factor)
@@ -0,0 +1,170 @@
+import numpy as np
+
+from src.feature_spec import DEFAULT_SPEC, FeatureSpec
+from src.features import assign_regimes
+
+# Recompute running sums from the ring every N cycles to cancel float drift
+RESYNC_EVERY = 4096
+
+
+class _EngineState:
+    __slots__ = ("ring", "pos", "n", "sums", "counts")
+
+    def __init__(self, depth, n_windows, n_sensors):
+        self.ring = np.full((depth, n_sensors), np.nan)  # last `depth` raw values
+        self.pos = 0                                     # next ring slot to write
+        self.n = 0                                       # cycles seen
+        self.sums = np.zeros((n_windows, n_sensors))     # non-NaN sum per window
+        self.counts = np.zeros((n_windows, n_sensors), dtype=np.int64)
+
+
+class IncrementalFeatures:
+    """
+    Per-engine rolling state that turns one new cycle into the spec's
+    features in O(1), independent of how long the engine's history is.
+    Produces the same values as src.features.add_features run over the
+    full history (rolling means with min_periods=1, diffs with NaN -> 0,
+    sensors regime-normalized first when the spec has regimes).
+    """
+
+    def __init__(self, spec=DEFAULT_SPEC, required=None):
+        if required is not None:
+            spec = spec.select(required)
+        self.spec = spec
+        self.sensors = list(dict.fromkeys(op.sensor for op in spec.ops))
+        col_of = {s: i for i, s in enumerate(self.sensors)}
+
+        windows = sorted({op.window for op in spec.ops if op.op == "rollmean"})
+        lags = sorted({op.window for op in spec.ops if op.op == "diff"})
+        self._windows = np.array(windows, dtype=np.int64)
+        self._lags = np.array(lags, dtype=np.int64)
+        self._depth = max(windows + lags, default=1)
+
+        # Op position, row in sums/diffs and sensor column, per op kind
+        rm = [(j, windows.index(op.window), col_of[op.sensor])
+              for j, op in enumerate(spec.ops) if op.op == "rollmean"]
+        lag = [(j, lags.index(op.window), col_of[op.sensor])
+               for j, op in enumerate(spec.ops) if op.op == "diff"]
+        self._rollmean_idx = tuple(np.array(a, dtype=np.int64) for a in zip(*rm)) if rm else None
+        self._diff_idx = tuple(np.array(a, dtype=np.int64) for a in zip(*lag)) if lag else None
+        self._engines = {}
+
+        regimes = spec.regimes
+        if regimes is not None:
+            pos = {s: i for i, s in enumerate(regimes.sensors)}
+            # Regime stats for the op sensors, then for raw sensor columns
+            self._op_norm = [pos[s] for s in self.sensors]
+            self._raw_norm = {c: pos[c] for c in spec.raw if c in pos}
+            self._mean = np.asarray(regimes.mean)
+            self._std = np.asarray(regimes.std)
+
+    def __len__(self):
+        return len(self._engines)
+
+    def __contains__(self, engine_id):
+        return engine_id in self._engines
+
+    def _new_state(self):
+        return _EngineState(self._depth, len(self._windows), len(self.sensors))
+
+    def update_values(self, engine_id, values):
+        """
+        Push one cycle of sensor values (ordered like self.sensors, and
+        already regime-normalized if the spec has regimes) and return the
+        op features as an array in spec.ops order.
+        """
+        st = self._engines.get(engine_id)
+        if st is None:
+            st = self._engines[engine_id] = self._new_state()
+        x = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(x)
+        depth = self._depth
+
+        # Rolling windows: add the new value, drop the one leaving each window
+        if len(self._windows):
+            full = st.n >= self._windows
+            leaving = st.ring[(st.pos - self._windows) % depth]
+            leaving_ok = ~np.isnan(leaving) & full[:, None]
+            st.sums -= np.where(leaving_ok, leaving, 0.0)
+            st.counts -= leaving_ok
+            st.sums += np.where(valid, x, 0.0)
+            st.counts += valid
+
+        # Lagged diffs read the ring before the new value overwrites it
+        if len(self._lags):
+            lagged = st.ring[(st.pos - self._lags) % depth]
+            diffs = np.where((st.n >= self._lags)[:, None], x - lagged, np.nan)
+
+        st.ring[st.pos] = x
+        st.pos = (st.pos + 1) % depth
+        st.n += 1
+        if st.n % RESYNC_EVERY == 0:
+            self._resync(st)
+
+        out = np.empty(len(self.spec.ops))
+        if self._rollmean_idx is not None:
+            j, wi, si = self._rollmean_idx
+            c = st.counts[wi, si]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out[j] = np.where(c > 0, st.sums[wi, si] / c, np.nan)
+        if self._diff_idx is not None:
+            j, li, si = self._diff_idx
+            out[j] = np.nan_to_num(diffs[li, si])
+        return out
+
+    def _resync(self, st):
+        """Rebuild running sums exactly from the values still in the ring."""
+        recent = np.roll(st.ring, -st.pos, axis=0)  # oldest -> newest
+        for wi, w in enumerate(self._windows):
+            tail = recent[-w:]
+            st.sums[wi] = np.nansum(tail, axis=0)
+            st.counts[wi] = (~np.isnan(tail)).sum(axis=0)
+
+    def update(self, engine_id, row):
+        """
+        Push one cycle given as a mapping (e.g. a dict or DataFrame row)
+        and return {feature_name: value} for every spec feature.
+        """
+        values = [row[s] for s in self.sensors]
+        features = {c: row[c] for c in self.spec.raw}
+        regimes = self.spec.regimes
+        if regimes is not None:
+            r = assign_regimes([[row[s] for s in regimes.settings]], regimes)[0]
+            values = (np.asarray(values, dtype=np.float64) - self._mean[r, self._op_norm]) \
+                / self._std[r, self._op_norm]
+            for c, i in self._raw_norm.items():
+                features[c] = (features[c] - self._mean[r, i]) / self._std[r, i]
+        ops = self.update_values(engine_id, values)
+        features.update(zip((op.name for op in self.spec.ops), ops.tolist()))
+        return features
+
+    def reset(self, engine_id):
+        """Forget an engine's history (e.g. after a shop visit)."""
+        self._engines.pop(engine_id, None)
+
+    # -----------------------
+    # Snapshot / restore
+    # -----------------------
+    def snapshot(self):
+        """Plain-dict copy of all state, safe to pickle or joblib.dump."""
+        return {
+            "spec": self.spec.to_dict(),
+            "engines": {
+                eid: {"ring": st.ring.copy(), "pos": st.pos, "n": st.n,
+                      "sums": st.sums.copy(), "counts": st.counts.copy()}
+                for eid, st in self._engines.items()
+            },
+        }
+
+    @classmethod
+    def restore(cls, snapshot):
+        """Rebuild the feature state from snapshot(); continues where it left off."""
+        inc = cls(FeatureSpec.from_dict(snapshot["spec"]))
+        for eid, saved in snapshot["engines"].items():
+            st = inc._new_state()
+            st.ring[:] = saved["ring"]
+            st.sums[:] = saved["sums"]
+            st.counts[:] = saved["counts"]
+            st.pos, st.n = int(saved["pos"]), int(saved["n"])
+            inc._engines[eid] = st
+        return inc
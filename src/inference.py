@@ -0,0 +1,179 @@
+import os
+import threading
+import warnings
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+from src.features import compile_spec, normalize_regimes
+from src.flat_forest import FlatForest
+from src.instrument import stage
+from src.model_utils import load_model
+
+# Models kept warm per process before the least recently used is dropped
+MAX_MODELS = int(os.environ.get("STARCHECK_MAX_MODELS", "4"))
+# Rows per predict call; bounds the temporary memory of a single call
+BATCH_SIZE = 16384
+# Removal interval reported next to the point estimate
+QUANTILES = (0.1, 0.5, 0.9)
+
+
+@dataclass
+class LoadedModel:
+    """A model package as returned by model_utils.load_model, kept warm."""
+    path: str
+    mtime: float
+    model: object
+    feature_names: list
+    spec: object
+    _featurize: object = field(default=None, repr=False)
+    _forest: object = field(default=None, repr=False)
+
+    def featurize(self, df):
+        """Only the spec ops this model was trained on, computed in one pass."""
+        if self._featurize is None:
+            self._featurize = compile_spec(self.spec, self.feature_names)
+        if self.spec.regimes is not None:
+            df = normalize_regimes(df, self.spec.regimes)
+        return pd.concat([df, self._featurize(df)], axis=1)
+
+    @property
+    def forest(self):
+        """The model as a FlatForest (converted once), for per-tree quantiles."""
+        if self._forest is None:
+            self._forest = as_flat_forest(self.model)
+        return self._forest
+
+
+class ModelRegistry:
+    """
+    Process-wide LRU cache of loaded models. Each artifact is loaded once
+    through model_utils.load_model and reloaded only if the file changes.
+    """
+
+    def __init__(self, max_models=MAX_MODELS):
+        self.max_models = max_models
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        key = os.path.abspath(path)
+        mtime = os.path.getmtime(key)
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None and entry.mtime == mtime:
+                self._models.move_to_end(key)
+                return entry
+            model, feature_names, spec = load_model(key, with_spec=True)
+            entry = LoadedModel(key, mtime, model, feature_names, spec)
+            self._models[key] = entry
+            self._models.move_to_end(key)
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+            return entry
+
+    def warm(self, paths):
+        """Load several artifacts up front (e.g. at app or worker start)."""
+        for path in paths:
+            self.get(path)
+
+    def evict(self, path):
+        with self._lock:
+            self._models.pop(os.path.abspath(path), None)
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+    def __len__(self):
+        return len(self._models)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_registry():
+    """The shared registry for this process."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
+
+
+def align_features(X, feature_names):
+    """
+    Validate X against a model's feature_names and return a float32 matrix
+    in that column order. A frame whose columns already match and are
+    float32 comes back as a view; otherwise columns are gathered once.
+    """
+    if isinstance(X, pd.DataFrame):
+        missing = [c for c in feature_names if c not in X.columns]
+        if missing:
+            raise ValueError(f"Input is missing model features: {missing}")
+        if list(X.columns) == list(feature_names):
+            return X.to_numpy(dtype=np.float32, copy=False)
+        return X.iloc[:, X.columns.get_indexer(feature_names)].to_numpy(dtype=np.float32)
+
+    X = np.asarray(X, dtype=np.float32)
+    if X.ndim != 2 or X.shape[1] != len(feature_names):
+        raise ValueError(f"Expected a 2-D array with {len(feature_names)} columns, "
+                         f"got shape {X.shape}")
+    return X
+
+
+def predict_batch(model, X, batch_size=BATCH_SIZE):
+    """Score a float32 matrix in fixed-size micro-batches."""
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    out = np.empty(len(X), dtype=np.float32)
+    with stage("predict", rows=len(X)), warnings.catch_warnings():
+        # Columns were already checked against feature_names by align_features
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        for start in range(0, len(X), batch_size):
+            stop = start + batch_size
+            out[start:stop] = model.predict(X[start:stop])
+    return out
+
+
+def as_flat_forest(model):
+    """A RandomForest (sklearn or FlatForest) as a FlatForest; TypeError for anything else."""
+    if isinstance(model, FlatForest):
+        return model
+    if isinstance(model, RandomForestRegressor):
+        return FlatForest.from_sklearn(model)
+    raise TypeError(f"Per-tree quantiles need a RandomForest, got {type(model).__name__}")
+
+
+def predict_quantiles(model, X, quantiles=QUANTILES, batch_size=BATCH_SIZE, return_mean=False):
+    """
+    RUL quantiles across the trees of a forest, shape (rows, len(quantiles)),
+    in micro-batches like predict_batch. Every tree is walked once per row,
+    the same work as the mean prediction; return_mean=True also returns
+    that mean, as (mean, quantiles).
+    """
+    forest = as_flat_forest(model)
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    mean = np.empty(len(X), dtype=np.float32)
+    out = np.empty((len(X), len(quantiles)), dtype=np.float32)
+    with stage("predict_quantiles", rows=len(X)):
+        for start in range(0, len(X), batch_size):
+            stop = start + batch_size
+            mean[start:stop], out[start:stop] = forest.predict_quantiles(
+                X[start:stop], quantiles, return_mean=True)
+    return (mean, out) if return_mean else out
+
+
+def predict_frame(path, df, registry=None, batch_size=BATCH_SIZE):
+    """
+    Featurize raw engine cycles with the model's own spec and score them.
+    Returns one RUL prediction per row of df.
+    """
+    entry = (registry or get_registry()).get(path)
+    if entry.feature_names is None:
+        raise ValueError(f"{path} has no stored feature_names; "
+                         "re-save it with model_utils.save_model")
+    X = align_features(entry.featurize(df), entry.feature_names)
+    return predict_batch(entry.model, X, batch_size)
@@ -0,0 +1,223 @@
+"""
+Stage timers, counters and opt-in profiling for the hot paths.
+
+    with stage("load", bytes=os.path.getsize(path)) as s:
+        df = ...
+        s.add(rows=len(df))
+
+Everything is off unless enabled through the environment:
+
+    STARCHECK_METRICS=1            append one JSON line per stage to reports/metrics.jsonl
+    STARCHECK_METRICS=<path>       ... to <path> instead
+    STARCHECK_PROFILE=cprofile     cProfile each outermost stage (.prof files)
+    STARCHECK_PROFILE=sample       sample all thread stacks every STARCHECK_SAMPLE_INTERVAL
+                                   seconds (collapsed-stack files for flamegraph/speedscope)
+    STARCHECK_PROFILE_DIR=<dir>    where profiles go (default reports/profiles)
+
+When disabled, stage() returns a shared no-op object.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows: no getrusage, peak RSS isn't reported
+    resource = None
+
+DEFAULT_METRICS_PATH = "reports/metrics.jsonl"
+PROFILERS = ("cprofile", "sample")
+
+_metrics = os.environ.get("STARCHECK_METRICS", "")
+METRICS_PATH = (None if _metrics in ("", "0") else
+                DEFAULT_METRICS_PATH if _metrics == "1" else _metrics)
+PROFILE = os.environ.get("STARCHECK_PROFILE", "").lower() or None
+PROFILE_DIR = Path(os.environ.get("STARCHECK_PROFILE_DIR", "reports/profiles"))
+SAMPLE_INTERVAL = float(os.environ.get("STARCHECK_SAMPLE_INTERVAL", "0.005"))
+# Tags every record from this process so one pipeline run can be grouped
+RUN_ID = os.environ.get("STARCHECK_RUN_ID") or f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+
+_enabled = METRICS_PATH is not None or PROFILE is not None
+_local = threading.local()
+_write_lock = threading.Lock()
+# Held by the stage being profiled; profilers don't nest
+_profile_lock = threading.Lock()
+
+
+def configure(metrics_path=None, profile=None):
+    """Enable/disable instrumentation at runtime (overrides the environment)."""
+    global METRICS_PATH, PROFILE, _enabled
+    if profile is not None and profile not in PROFILERS:
+        raise ValueError(f"profile must be one of {PROFILERS}, got {profile!r}")
+    METRICS_PATH, PROFILE = metrics_path, profile
+    _enabled = METRICS_PATH is not None or PROFILE is not None
+
+
+def enabled():
+    return _enabled
+
+
+def peak_rss_mb():
+    """High-water resident set size of this process, in MB (None if unknown)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add(self, **counts):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Sampler(threading.Thread):
+    """Counts the call stacks of every other thread at a fixed interval."""
+
+    def __init__(self, interval):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.counts = Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        names = {}
+        while not self._done.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == self.ident:
+                    continue
+                if ident not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+class Stage:
+    """One timed stage; counters are summed via add() and written on exit."""
+
+    def __init__(self, name, counters):
+        self.name = name
+        self.counters = dict(counters)
+        self._profiler = None
+
+    def add(self, **counts):
+        for key, value in counts.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        # One profile at a time: the outermost stage that gets there first
+        if PROFILE and self.parent is None and _profile_lock.acquire(blocking=False):
+            self._start_profiler()
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._t0
+        if self._profiler is not None:
+            self._stop_profiler()
+        _local.stack.pop()
+        if METRICS_PATH is not None:
+            record = {
+                "run": RUN_ID,
+                "stage": self.name,
+                "parent": self.parent,
+                "start": self.started,
+                "seconds": seconds,
+                **self.counters,
+                "peak_rss_mb": peak_rss_mb(),
+                "pid": os.getpid(),
+            }
+            if exc_type is not None:
+                record["error"] = exc_type.__name__
+            _write(record)
+        return False
+
+    def _start_profiler(self):
+        if PROFILE == "cprofile":
+            import cProfile
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:  # another profiler/debugger already owns the hook
+                _profile_lock.release()
+                return
+            self._profiler = profiler
+        elif PROFILE == "sample":
+            self._profiler = _Sampler(SAMPLE_INTERVAL)
+            self._profiler.start()
+        else:
+            _profile_lock.release()
+
+    def _stop_profiler(self):
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        stem = PROFILE_DIR / f"{self.name}-{RUN_ID}-{int(self.started * 1000)}"
+        if isinstance(self._profiler, _Sampler):
+            self._profiler.stop()
+            with open(f"{stem}.collapsed", "w", encoding="utf-8") as f:
+                for frames, count in self._profiler.counts.most_common():
+                    f.write(f"{frames} {count}\n")
+        else:
+            self._profiler.disable()
+            self._profiler.dump_stats(f"{stem}.prof")
+        self._profiler = None
+        _profile_lock.release()
+
+
+def stage(name, **counters):
+    """
+    Context manager timing a named stage, e.g. stage("predict", rows=n).
+    The `as` target's add(**counts) accumulates more counters.
+    """
+    if not _enabled:
+        return _NULL_STAGE
+    return Stage(name, counters)
+
+
+def _write(record):
+    path = Path(METRICS_PATH)
+    line = json.dumps(record, default=str) + "\n"
+    with _write_lock:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # One short append per record, so lines from several processes don't interleave
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+def read_metrics(path=None):
+    """All recorded stages as a DataFrame (empty if nothing was recorded)."""
+    path = Path(path or METRICS_PATH or DEFAULT_METRICS_PATH)
+    if not path.exists() or path.stat().st_size == 0:
+        return pd.DataFrame(columns=["run", "stage", "parent", "start", "seconds"])
+    df = pd.read_json(path, lines=True)
+    df["start"] = pd.to_datetime(df["start"], unit="s")
+    return df
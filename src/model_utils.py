@@ -1,30 +1,306 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
 import joblib
+import numpy as np
+from sklearn.base import clone
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import GroupKFold
 
-def train_random_forest(X, y, groups, n_estimators=100, max_depth=None):
-    """Train a Random Forest model with GroupKFold cross-validation."""
-    gkf = GroupKFold(n_splits=5)
-    model = RandomForestRegressor(
+from src.feature_spec import FeatureSpec
+from src.flat_forest import FlatForest
+from src.instrument import stage
+
+@dataclass
+class CVResult:
+    """Out-of-fold scores from cross_validate plus the model refit on all data."""
+    model: object
+    oof_pred: np.ndarray
+    rmse: float
+    fold_rmse: list = field(default_factory=list)
+    fold_seconds: list = field(default_factory=list)
+    refit_seconds: float = 0.0
+
+    def summary(self):
+        folds = ", ".join(f"{r:.2f}" for r in self.fold_rmse)
+        secs = ", ".join(f"{s:.1f}" for s in self.fold_seconds)
+        return (f"CV RMSE (out-of-fold): {self.rmse:.2f}\n"
+                f"  per fold: {folds}\n"
+                f"  fold fit+predict seconds: {secs}; refit: {self.refit_seconds:.1f}s")
+
+# Fold data is sent to each worker once, not once per fold
+_fold_data = {}
+
+def _init_fold_worker(X, y):
+    _fold_data["X"], _fold_data["y"] = X, y
+
+def _run_fold(estimator, train_idx, test_idx, n_jobs, X=None, y=None):
+    # Pool workers read the arrays set by _init_fold_worker; inline folds pass
+    # them in, so concurrent cross_validate calls on threads never share state
+    if X is None:
+        X, y = _fold_data["X"], _fold_data["y"]
+    start = time.perf_counter()
+    model = clone(estimator).set_params(n_jobs=n_jobs)
+    model.fit(X[train_idx], y[train_idx])
+    pred = model.predict(X[test_idx])
+    return test_idx, pred, time.perf_counter() - start
+
+def cross_validate(estimator, X, y, groups, n_splits=5, n_workers=None, n_jobs=None):
+    """
+    GroupKFold cross-validation with the folds fitted concurrently.
+
+    Folds run in a pool of n_workers processes (default: one per fold, up
+    to the CPU count), each fitting with n_jobs = n_jobs // n_workers
+    threads so the folds don't oversubscribe the machine. Returns a
+    CVResult with out-of-fold predictions, per-fold RMSE and timings,
+    and the estimator refit once on all rows with n_jobs threads.
+    """
+    n_jobs = n_jobs or os.cpu_count() or 1
+    n_workers = max(1, min(n_workers or n_jobs, n_splits))
+    fold_jobs = max(1, n_jobs // n_workers)
+
+    X_arr = np.asarray(X, dtype=np.float32)
+    y_arr = np.asarray(y, dtype=np.float64)
+    folds = list(GroupKFold(n_splits=n_splits).split(X_arr, y_arr, groups))
+
+    model_name = type(estimator).__name__
+    with stage("cv", rows=len(y_arr), folds=n_splits, model=model_name):
+        if n_workers == 1:
+            results = [_run_fold(estimator, tr, te, fold_jobs, X_arr, y_arr) for tr, te in folds]
+        else:
+            # spawn: callers such as orchestrator.run_jobs are threaded, and a
+            # fork while another thread holds an OpenMP lock can deadlock
+            with ProcessPoolExecutor(n_workers, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_init_fold_worker,
+                                     initargs=(X_arr, y_arr)) as pool:
+                futures = [pool.submit(_run_fold, estimator, tr, te, fold_jobs)
+                           for tr, te in folds]
+                results = [f.result() for f in futures]
+
+    oof = np.empty(len(y_arr))
+    fold_rmse, fold_seconds = [], []
+    for test_idx, pred, seconds in results:
+        oof[test_idx] = pred
+        fold_rmse.append(float(np.sqrt(np.mean((pred - y_arr[test_idx]) ** 2))))
+        fold_seconds.append(seconds)
+
+    start = time.perf_counter()
+    with stage("fit", rows=len(y_arr), model=model_name):
+        model = clone(estimator).set_params(n_jobs=n_jobs).fit(X, y)
+    return CVResult(
+        model=model,
+        oof_pred=oof,
+        rmse=float(np.sqrt(np.mean((oof - y_arr) ** 2))),
+        fold_rmse=fold_rmse,
+        fold_seconds=fold_seconds,
+        refit_seconds=time.perf_counter() - start,
+    )
+
+def train_random_forest(X, y, groups, n_estimators=100, max_depth=None, n_workers=None, **params):
+    """
+    Train a Random Forest model with GroupKFold cross-validation; extra
+    params (e.g. tuned ones from src.tuning) go to the estimator.
+    Returns the model refit on all rows; call cross_validate directly
+    for the out-of-fold scores.
+    """
+    rf = RandomForestRegressor(
         n_estimators=n_estimators,
         max_depth=max_depth,
-        n_jobs=-1,
-        random_state=42
+        random_state=42,
+        **params
     )
-    for train_idx, test_idx in gkf.split(X, y, groups):
-        model.fit(X.iloc[train_idx], y.iloc[train_idx])
-    return model
-
-def save_model(model, path, feature_names=None):
-    """Save model + its feature names together in one package."""
-    package = {"model": model, "feature_names": feature_names}
-    joblib.dump(package, path)
+    return cross_validate(rf, X, y, groups, n_workers=n_workers).model
+
+# -----------------------
+# Compaction
+# -----------------------
+# Validation rows used to select trees and time predictions
+COMPACT_MAX_ROWS = 20_000
+
+@dataclass
+class CompactionReport:
+    """Accuracy / latency / size of the full forest and each compaction candidate."""
+    baseline: dict
+    candidates: list
+    chosen: dict
+    rmse_budget: float
+
+    def summary(self):
+        def row(name, c):
+            return (f"{name:<10}{c['trees']:>6}{str(c['max_depth']):>7}{c['nodes']:>10,}"
+                    f"{c['nbytes'] / 2**20:>9.2f}{c['rmse']:>8.2f}"
+                    f"{c['us_per_row']:>9.2f}{c['ms_single']:>10.2f}")
+        lines = [f"Compaction (RMSE budget +{self.rmse_budget:.2f} over the full forest)",
+                 f"{'':<10}{'Trees':>6}{'Depth':>7}{'Nodes':>10}{'MB':>9}{'RMSE':>8}"
+                 f"{'us/row':>9}{'ms/1row':>10}",
+                 row("full", self.baseline)]
+        lines += [row("chosen" if c is self.chosen else "candidate", c) for c in self.candidates]
+        b, c = self.baseline, self.chosen
+        lines.append(f"Chosen model: {b['nbytes'] / c['nbytes']:.1f}x smaller, "
+                     f"{b['us_per_row'] / c['us_per_row']:.1f}x faster per row in batch, "
+                     f"{b['ms_single'] / c['ms_single']:.1f}x faster on a single row")
+        return "\n".join(lines)
+
+def _greedy_tree_order(P, y):
+    """
+    Forward selection over the columns of P (rows x trees): each step adds
+    the tree whose inclusion gives the lowest RMSE of the averaged
+    prediction. Returns (tree order, RMSE after each step).
+    """
+    n, t = P.shape
+    sq = (P ** 2).sum(axis=0)
+    total = np.zeros(n)
+    remaining = np.ones(t, dtype=bool)
+    order, curve = [], []
+    for k in range(1, t + 1):
+        # |(total + P_j)/k - y|^2 = |r|^2 + 2/k r.P_j + |P_j|^2/k^2 with r = total/k - y
+        r = total / k - y
+        score = 2.0 / k * (P.T @ r) + sq / k ** 2
+        score[~remaining] = np.inf
+        j = int(np.argmin(score))
+        order.append(j)
+        curve.append(float(np.sqrt(max(0.0, (r @ r + score[j]) / n))))
+        remaining[j] = False
+        total += P[:, j]
+    return order, curve
+
+def _profile_forest(flat, X, y, max_depth, repeats=3):
+    start = time.perf_counter()
+    pred = flat.predict(X)
+    batch = time.perf_counter() - start
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        flat.predict(X)
+        batch = min(batch, time.perf_counter() - start)
+    single = []
+    for i in range(min(25, len(X))):
+        start = time.perf_counter()
+        flat.predict(X[i:i + 1])
+        single.append(time.perf_counter() - start)
+    return {
+        "trees": flat.n_trees,
+        "max_depth": max_depth,
+        "nodes": flat.n_nodes,
+        "nbytes": flat.nbytes,
+        "rmse": float(np.sqrt(np.mean((pred - y) ** 2))),
+        "us_per_row": batch / len(X) * 1e6,
+        "ms_single": float(np.median(single)) * 1e3,
+    }
+
+def compact_forest(forest, X_val, y_val, groups=None, rmse_budget=1.0,
+                   depths=(None, 16, 12, 10, 8), max_trees=None, float32=True, seed=42):
+    """
+    Shrink a fitted RandomForestRegressor into a FlatForest that stays
+    within rmse_budget of the full forest on held-out rows.
+
+    For every depth cap in `depths`, trees are ranked by greedy forward
+    selection on the validation rows and the fewest that meet the budget
+    are kept (at most max_trees); thresholds and leaves go to float32 if
+    asked. The candidate with the fewest bytes wins. X_val should be
+    engines the forest never saw; with `groups`, half of those engines
+    select trees and the other half score the candidates.
+    Returns (FlatForest, CompactionReport).
+    """
+    X = np.asarray(X_val, dtype=np.float32)
+    y = np.asarray(y_val, dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    if groups is not None:
+        engines = np.unique(groups)
+        pick = np.isin(groups, rng.permutation(engines)[:max(1, len(engines) // 2)])
+        X_sel, y_sel, X_eval, y_eval = X[pick], y[pick], X[~pick], y[~pick]
+    else:
+        X_sel, y_sel, X_eval, y_eval = X, y, X, y
+    if len(X_sel) > COMPACT_MAX_ROWS:
+        keep = rng.choice(len(X_sel), COMPACT_MAX_ROWS, replace=False)
+        X_sel, y_sel = X_sel[keep], y_sel[keep]
+    if len(X_eval) > COMPACT_MAX_ROWS:
+        keep = rng.choice(len(X_eval), COMPACT_MAX_ROWS, replace=False)
+        X_eval, y_eval = X_eval[keep], y_eval[keep]
+
+    baseline = _profile_forest(FlatForest.from_sklearn(forest), X_eval, y_eval, None)
+    target = baseline["rmse"] + rmse_budget
+    dtype = np.float32 if float32 else np.float64
+
+    candidates, models = [], []
+    for depth in depths:
+        capped = FlatForest.from_sklearn(forest, max_depth=depth)
+        order, _ = _greedy_tree_order(capped.predict_trees(X_sel), y_sel)
+        order = order[:max_trees] if max_trees else order
+        # Fewest leading trees in the greedy order that meet the budget
+        eval_trees = capped.predict_trees(X_eval)[:, order]
+        prefix_rmse = np.sqrt(np.mean(
+            (np.cumsum(eval_trees, axis=1) / np.arange(1, len(order) + 1) - y_eval[:, None]) ** 2,
+            axis=0))
+        within = np.flatnonzero(prefix_rmse <= target)
+        k = int(within[0]) + 1 if len(within) else len(order)
+        flat = FlatForest.from_sklearn(forest, trees=order[:k], max_depth=depth, dtype=dtype)
+        candidates.append(_profile_forest(flat, X_eval, y_eval, depth))
+        models.append(flat)
+
+    ok = [i for i, c in enumerate(candidates) if c["rmse"] <= target]
+    if not ok:
+        raise ValueError(f"No compaction candidate within RMSE {target:.2f} "
+                         f"(full forest {baseline['rmse']:.2f}); raise rmse_budget or max_trees")
+    best = min(ok, key=lambda i: candidates[i]["nbytes"])
+    return models[best], CompactionReport(baseline, candidates, candidates[best], rmse_budget)
+
+def save_model(model, path, feature_names=None, feature_spec=None, mmap=False):
+    """
+    Save model + its feature names + the feature spec together in one package.
+
+    mmap=True writes a layout meant for load_model(mmap_mode="r"): a
+    RandomForest is stored as a FlatForest (plain uncompressed arrays that
+    processes can map and share), an XGBoost model (or a bare Booster) as
+    a native booster file next to the package.
+    """
+    package = {
+        "model": model,
+        "feature_names": feature_names,
+        "feature_spec": feature_spec.to_dict() if feature_spec is not None else None,
+    }
+    path = Path(path)
+    if mmap:
+        if isinstance(model, RandomForestRegressor):
+            package["model"] = FlatForest.from_sklearn(model)
+        elif hasattr(model, "get_booster") or hasattr(model, "save_raw"):  # sklearn API or Booster
+            booster_path = path.with_suffix(".ubj")
+            # xgboost picks the format from the extension, so keep .ubj last
+            tmp = booster_path.with_name(f"{booster_path.stem}.{os.getpid()}.tmp.ubj")
+            model.save_model(tmp)
+            os.replace(tmp, booster_path)
+            package["model"] = None
+            package["xgb_booster"] = booster_path.name
+    # Write then rename so readers never see a half-written artifact
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    joblib.dump(package, tmp)
+    os.replace(tmp, path)
     print(f"✅ Model saved to {path}")
 
-def load_model(path):
-    """Load model + feature names (backward compatible with old pickles)."""
-    package = joblib.load(path)
-    if isinstance(package, dict):
-        return package["model"], package.get("feature_names", None)
-    else:  # fallback if it's an old pickle
-        return package, None
+def load_model(path, mmap_mode="r", with_spec=False):
+    """
+    Load model + feature names (backward compatible with old pickles).
+    with_spec=True also returns the feature spec: packages saved without
+    one get it rebuilt from their feature names. Large arrays are
+    memory-mapped by default.
+    """
+    package = joblib.load(path, mmap_mode=mmap_mode)
+    if not isinstance(package, dict):  # fallback if it's an old pickle
+        return (package, None, None) if with_spec else (package, None)
+    model = package["model"]
+    if package.get("xgb_booster"):
+        import xgboost as xgb
+        model = xgb.XGBRegressor()
+        model.load_model(Path(path).parent / package["xgb_booster"])
+    feature_names = package.get("feature_names", None)
+    if not with_spec:
+        return model, feature_names
+    spec = package.get("feature_spec", None)
+    if spec is not None:
+        spec = FeatureSpec.from_dict(spec)
+    elif feature_names is not None:
+        spec = FeatureSpec.from_feature_names(feature_names)
+    return model, feature_names, spec
@@ -0,0 +1,208 @@
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+
+import numpy as np
+
+from src import data_loader, features
+from src.feature_spec import DEFAULT_SPEC
+from src.instrument import stage
+from src.model_utils import cross_validate, save_model
+
+# Manifest "format" -> loader returning a frame with CMAPSS_COLUMNS
+LOADERS = {
+    "cmapss": data_loader.load_cmapss,   # whitespace-delimited train_FD00x.txt
+    "csv": data_loader.load_cmapss_csv,  # our exports, header row with the same names
+}
+
+
+@dataclass
+class Dataset:
+    name: str
+    path: str
+    format: str = "cmapss"
+    regimes: int = None  # operating regimes to normalize by (6 for FD002/FD004)
+
+
+def load_manifest(path):
+    """
+    Read a dataset manifest:
+
+        {"datasets": [{"name": "FD001", "path": "data/train_FD001.txt"},
+                      {"name": "FD002", "path": "data/train_FD002.txt", "regimes": 6},
+                      {"name": "fleet", "path": "exports/fleet.csv", "format": "csv"}]}
+
+    Relative paths are resolved against the manifest's folder. Every
+    file must exist and names must be unique.
+    """
+    path = Path(path)
+    entries = json.loads(path.read_text(encoding="utf-8"))["datasets"]
+    datasets = [Dataset(**entry) for entry in entries]
+    for d in datasets:
+        if d.format not in LOADERS:
+            raise ValueError(f"{d.name}: unknown format {d.format!r}, expected one of {list(LOADERS)}")
+        if not Path(d.path).is_absolute():
+            d.path = str(path.parent / d.path)
+    names = [d.name for d in datasets]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Dataset names must be unique, got {names}")
+    missing = [d.path for d in datasets if not Path(d.path).exists()]
+    if missing:
+        raise FileNotFoundError(f"Datasets listed in {path} not found: {missing}")
+    return datasets
+
+
+# -----------------------
+# Shared-memory arrays
+# -----------------------
+@dataclass(frozen=True)
+class SharedArray:
+    """Picklable handle to an ndarray living in a SharedMemory block."""
+    name: str
+    shape: tuple
+    dtype: str
+
+    @classmethod
+    def create(cls, arr):
+        shm = shared_memory.SharedMemory(create=True, size=max(1, arr.nbytes))
+        np.ndarray(arr.shape, arr.dtype, buffer=shm.buf)[...] = arr
+        return cls(shm.name, arr.shape, arr.dtype.str), shm
+
+    def attach(self):
+        """(view onto the block, SharedMemory keeping it alive)."""
+        shm = shared_memory.SharedMemory(name=self.name)
+        return np.ndarray(self.shape, np.dtype(self.dtype), buffer=shm.buf), shm
+
+    def unlink(self):
+        shm = shared_memory.SharedMemory(name=self.name)
+        shm.close()
+        shm.unlink()
+
+
+# Blocks created by this worker stay open for its lifetime (on Windows a
+# block disappears once nobody holds it); the parent unlinks them.
+_owned = []
+
+
+def _ingest(dataset, spec):
+    """Worker: load + featurize one dataset, publish X/y/groups in shared memory."""
+    start = time.perf_counter()
+    df = LOADERS[dataset.format](dataset.path)
+    if dataset.regimes:
+        spec = spec.with_regimes(features.fit_regimes(df, dataset.regimes))
+    df = features.add_features(features.add_rul(df), spec)
+    arrays = {
+        "X": df[spec.feature_names].to_numpy(dtype=np.float32),
+        "y": df["RUL"].to_numpy(dtype=np.float64),
+        "groups": df["engine_id"].to_numpy(dtype=np.int32),
+    }
+    handles = {}
+    for key, arr in arrays.items():
+        handles[key], shm = SharedArray.create(arr)
+        _owned.append(shm)
+    return {
+        "dataset": dataset.name,
+        "rows": len(df),
+        "engines": int(df["engine_id"].nunique()),
+        "arrays": handles,
+        "spec": spec,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def _train(dataset, model_name, estimator, threads, arrays, spec, artifact, n_splits):
+    """Worker: cross-validate + refit one model on one dataset's shared arrays."""
+    start = time.perf_counter()
+    (X, x_shm), (y, y_shm), (groups, g_shm) = (arrays[k].attach() for k in ("X", "y", "groups"))
+    try:
+        # Folds run inline: parallelism comes from training jobs side by side
+        cv = cross_validate(estimator, X, y, groups, n_splits=n_splits,
+                            n_workers=1, n_jobs=threads)
+        save_model(cv.model, artifact, spec.feature_names, spec, mmap=True)
+    finally:
+        # Views must go before the blocks can be closed
+        X = y = groups = None
+        for shm in (x_shm, y_shm, g_shm):
+            shm.close()
+    return {
+        "dataset": dataset,
+        "model": model_name,
+        "rmse": cv.rmse,
+        "fold_rmse": cv.fold_rmse,
+        "artifact": str(artifact),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def train_datasets(datasets, models, spec=DEFAULT_SPEC, cpu_budget=None,
+                   models_dir="models", n_splits=5):
+    """
+    Ingest, featurize and train every dataset x model in parallel worker
+    processes. `models` maps a model name to an unfitted estimator.
+
+    Each dataset is loaded and featurized in its own worker, which puts
+    X / y / groups in shared memory; as soon as it is ready, one training
+    job per model starts and maps those arrays instead of receiving a
+    pickled copy. Artifacts go to <models_dir>/<dataset>/<model>_model.pkl.
+    Returns (ingest summaries, training results), both in manifest order.
+    """
+    budget = cpu_budget or os.cpu_count() or 1
+    n_jobs = len(datasets) * len(models)
+    workers = max(1, min(budget, max(len(datasets), n_jobs)))
+    threads = max(1, budget // max(1, n_jobs))
+    # Workers must share the parent's tracker so blocks outlive them
+    resource_tracker.ensure_running()
+
+    ingested, trained, pending = {}, {}, {}
+    try:
+        with stage("train_datasets", datasets=len(datasets), jobs=n_jobs), \
+             ProcessPoolExecutor(workers) as pool:
+            for d in datasets:
+                pending[pool.submit(_ingest, d, spec)] = ("ingest", d.name, None)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind, name, model_name = pending.pop(future)
+                    result = future.result()
+                    if kind == "ingest":
+                        ingested[name] = result
+                        print(f"📂 {name}: {result['rows']:,} rows, {result['engines']} engines "
+                              f"ready in {result['seconds']:.1f}s")
+                        for m, estimator in models.items():
+                            artifact = Path(models_dir) / name / f"{m}_model.pkl"
+                            artifact.parent.mkdir(parents=True, exist_ok=True)
+                            f = pool.submit(_train, name, m, estimator, threads,
+                                            result["arrays"], result["spec"], artifact, n_splits)
+                            pending[f] = ("train", name, m)
+                    else:
+                        trained[(name, model_name)] = result
+                        print(f"✅ {name}/{model_name}: CV RMSE {result['rmse']:.2f} "
+                              f"in {result['seconds']:.1f}s")
+    finally:
+        for summary in ingested.values():
+            for handle in summary["arrays"].values():
+                handle.unlink()
+
+    summaries = [ingested[d.name] for d in datasets]
+    results = [trained[(d.name, m)] for d in datasets for m in models]
+    return summaries, results
+
+
+def write_report(summaries, results, wall_seconds, path="reports/training_results_all.txt"):
+    """One merged report: a row per dataset x model plus overall wall-clock."""
+    rows = {s["dataset"]: s for s in summaries}
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("Model Results per dataset (GroupKFold by engine):\n")
+        f.write(f"{'Dataset':<16}{'Rows':>10}{'Engines':>9}  {'Model':<8}{'CV RMSE':>9}{'Seconds':>9}\n")
+        for r in results:
+            s = rows[r["dataset"]]
+            f.write(f"{r['dataset']:<16}{s['rows']:>10,}{s['engines']:>9}  {r['model']:<8}"
+                    f"{r['rmse']:>9.2f}{r['seconds']:>9.1f}\n")
+        serial = sum(s["seconds"] for s in summaries) + sum(r["seconds"] for r in results)
+        f.write(f"\nWall-clock: {wall_seconds:.1f}s (serial work {serial:.1f}s)\n")
+    return path
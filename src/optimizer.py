@@ -0,0 +1,146 @@
+from heapq import heappop, heappush
+
+import numpy as np
+import pandas as pd
+
+from src.forecast import CYCLES_PER_DAY, PREDICTIVE_LIMIT, PREVENTIVE_LIMIT, VALUE_PER_DAY
+
+OBJECTIVES = ("value", "earliest")
+
+
+def route_matrices(fits, stress):
+    """
+    Predictive cycles and value for every (engine, stress level) pair,
+    each shaped (engines, levels). Uses the same slope/threshold model as
+    forecast.apply_stress, but an engine that isn't degrading under a
+    level never reaches the limit: its predictive cycles are +inf and
+    it unlocks no value.
+    """
+    slope = fits["slope"].to_numpy()[:, None] * np.asarray(stress, dtype=float)[None, :]
+    intercept = fits["intercept"].to_numpy()[:, None]
+    degrading = slope < 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        predictive = np.where(degrading, (PREDICTIVE_LIMIT - intercept) / slope, np.inf)
+        extra = np.where(degrading, (PREDICTIVE_LIMIT - PREVENTIVE_LIMIT) / slope, 0.0)
+    value = extra / CYCLES_PER_DAY * VALUE_PER_DAY
+    return predictive, value
+
+
+def _feasible(allowed, counts):
+    """
+    Can every engine get an allowed level with exactly counts[j] engines
+    on level j? By Hall's theorem, yes iff for every subset S of levels
+    the engines whose allowed levels all lie in S fit in S's capacity.
+    """
+    k = allowed.shape[1]
+    masks = allowed.astype(np.int64) @ (1 << np.arange(k))
+    if (masks == 0).any():
+        return False
+    hist = np.bincount(masks, minlength=1 << k)
+    subsets = np.arange(1 << k)
+    capacity = ((subsets[:, None] >> np.arange(k)) & 1) @ counts
+    # needed[S] = engines whose mask is a subset of S
+    needed = np.array([hist[(subsets & ~s) == 0].sum() for s in subsets])
+    return bool((needed <= capacity).all())
+
+
+def _max_value(value, counts, allowed):
+    """
+    Exact max-value assignment of engines to levels with exactly counts[j]
+    engines per level (a transportation problem with few destinations).
+
+    Successive shortest paths: engines are inserted one at a time, each
+    taking the best chain "engine -> level a, some engine a -> b, ... ->
+    level with room". With k levels that chain is a longest path over k
+    nodes, where edge a -> b is the best single move from a to b, kept in
+    a lazy max-heap per (a, b). Every insertion keeps the partial
+    assignment optimal, so the final one is optimal.
+    """
+    n, k = value.shape
+    v = np.where(allowed, value, -np.inf).tolist()
+    free = [int(c) for c in counts]
+    level = [-1] * n
+    # moves[a][b]: heap of (-(v[e][b] - v[e][a]), e) for engines e on level a
+    moves = [[[] for _ in range(k)] for _ in range(k)]
+
+    def best_move(a, b):
+        heap = moves[a][b]
+        while heap and level[heap[0][1]] != a:
+            heappop(heap)
+        return (-heap[0][0], heap[0][1]) if heap else (-np.inf, -1)
+
+    def place(e, a):
+        level[e] = a
+        for b in range(k):
+            if b != a and v[e][b] > -np.inf:
+                heappush(moves[a][b], (v[e][a] - v[e][b], e))
+
+    for i in range(n):
+        # gain[a]: best total gain of freeing one slot on level a
+        gain = [0.0 if free[a] > 0 else -np.inf for a in range(k)]
+        nxt = [-1] * k
+        edge = [[best_move(a, b) if a != b else (-np.inf, -1) for b in range(k)]
+                for a in range(k)]
+        for _ in range(k - 1):
+            changed = False
+            for a in range(k):
+                for b in range(k):
+                    g = edge[a][b][0] + gain[b]
+                    if g > gain[a]:
+                        gain[a], nxt[a], changed = g, b, True
+            if not changed:
+                break
+
+        j = max(range(k), key=lambda a: v[i][a] + gain[a])
+        if v[i][j] + gain[j] == -np.inf:
+            raise ValueError("No feasible assignment for the given route counts")
+        chain, a = [], j
+        while nxt[a] != -1:
+            e = edge[a][nxt[a]][1]
+            chain.append((e, nxt[a]))
+            a = nxt[a]
+        free[a] -= 1
+        place(i, j)
+        for e, b in chain:
+            place(e, b)
+    return np.array(level)
+
+
+def optimize_assignment(fits, route_counts, stress_map, objective="value"):
+    """
+    Assign every engine in `fits` (from forecast.fit_fleet) to a route so
+    that route r is flown by exactly route_counts[r] engines.
+
+    objective="value" maximizes total value unlocked. objective="earliest"
+    first pushes the earliest predictive removal in the fleet as late as
+    possible, then maximizes value among assignments achieving it.
+    Returns a Series of route names indexed like fits.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"objective must be one of {OBJECTIVES}, got {objective!r}")
+    routes = list(route_counts)
+    counts = np.array([route_counts[r] for r in routes], dtype=np.int64)
+    if counts.sum() != len(fits) or (counts < 0).any():
+        raise ValueError(f"Route counts {dict(route_counts)} must be non-negative "
+                         f"and sum to the number of engines ({len(fits)})")
+
+    predictive, value = route_matrices(fits, [stress_map[r] for r in routes])
+    value = np.nan_to_num(value, nan=0.0, posinf=0.0, neginf=0.0)
+    allowed = np.ones(predictive.shape, dtype=bool)
+
+    if objective == "earliest":
+        # Largest threshold T such that every engine can get a level with
+        # predictive cycles >= T; binary search over the candidate values
+        candidates = np.unique(predictive[np.isfinite(predictive)])
+        lo, hi = 0, len(candidates) - 1
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if _feasible(predictive >= candidates[mid], counts):
+                lo = mid
+            else:
+                hi = mid - 1
+        if len(candidates):
+            allowed = predictive >= candidates[lo]
+
+    choice = _max_value(value, counts, allowed)
+    return pd.Series(np.array(routes, dtype=object)[choice], index=fits.index, name="Assignment")
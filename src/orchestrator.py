@@ -0,0 +1,104 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+
+from src.model_utils import cross_validate, save_model
+
+
+@dataclass
+class TrainJob:
+    """
+    One model config to train. `threads` is the number of CPU threads the
+    job may use for its folds and refit; None shares the budget evenly.
+    """
+    name: str
+    estimator: object
+    threads: int = None
+    artifact: str = None  # defaults to <models_dir>/<name>_model.pkl
+
+
+@dataclass
+class JobResult:
+    name: str
+    threads: int
+    seconds: float
+    artifact: str = None
+    cv: object = None
+    error: str = None
+
+
+def print_progress(event):
+    """Default progress sink: one line per job start/finish."""
+    name, kind = event["job"], event["event"]
+    if kind == "start":
+        print(f"🚀 {name}: started with {event['threads']} thread(s)")
+    elif kind == "done":
+        print(f"✅ {name}: CV RMSE {event['rmse']:.2f} in {event['seconds']:.1f}s")
+    else:
+        print(f"❌ {name}: failed after {event['seconds']:.1f}s – {event['error']}")
+
+
+def _run_job(job, threads, X, y, groups, feature_names, spec, models_dir, n_splits):
+    start = time.perf_counter()
+    # Folds run as separate processes; each gets an even share of the threads
+    cv = cross_validate(job.estimator, X, y, groups, n_splits=n_splits,
+                        n_workers=min(threads, n_splits), n_jobs=threads)
+    artifact = job.artifact or str(Path(models_dir) / f"{job.name}_model.pkl")
+    save_model(cv.model, artifact, feature_names, spec, mmap=True)
+    return cv, artifact, time.perf_counter() - start
+
+
+def run_jobs(jobs, X, y, groups, feature_names=None, spec=None, cpu_budget=None,
+             models_dir="models", n_splits=5, on_event=print_progress):
+    """
+    Train several model configs side by side within a CPU budget.
+
+    Jobs start largest-first as long as their thread allotment fits in
+    the free budget. A job asking for more than the whole budget is
+    clamped to it. Every job cross-validates with its allotment (see
+    model_utils.cross_validate) and writes its artifact atomically under
+    models_dir. Start/finish events go to on_event. Returns JobResults
+    in the order of `jobs`.
+    """
+    names = [job.name for job in jobs]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Job names must be unique, got {names}")
+    budget = cpu_budget or os.cpu_count() or 1
+    default_threads = max(1, budget // max(1, len(jobs)))
+    allot = {job.name: min(budget, job.threads or default_threads) for job in jobs}
+    os.makedirs(models_dir, exist_ok=True)
+
+    pending = sorted(jobs, key=lambda j: allot[j.name], reverse=True)
+    running, results, free = {}, {}, budget
+    with ThreadPoolExecutor(max_workers=len(jobs) or 1) as pool:
+        while pending or running:
+            # Start every pending job that fits; always start one if idle
+            for job in list(pending):
+                if allot[job.name] <= free or not running:
+                    pending.remove(job)
+                    free -= allot[job.name]
+                    on_event({"job": job.name, "event": "start", "threads": allot[job.name]})
+                    future = pool.submit(_run_job, job, allot[job.name], X, y, groups,
+                                         feature_names, spec, models_dir, n_splits)
+                    running[future] = (job, time.perf_counter())
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                job, started = running.pop(future)
+                free += allot[job.name]
+                try:
+                    cv, artifact, seconds = future.result()
+                except Exception as exc:
+                    seconds = time.perf_counter() - started
+                    results[job.name] = JobResult(job.name, allot[job.name], seconds,
+                                                  error=repr(exc))
+                    on_event({"job": job.name, "event": "failed",
+                              "seconds": seconds, "error": repr(exc)})
+                else:
+                    results[job.name] = JobResult(job.name, allot[job.name], seconds,
+                                                  artifact, cv)
+                    on_event({"job": job.name, "event": "done", "seconds": seconds,
+                              "rmse": cv.rmse, "artifact": artifact})
+    return [results[job.name] for job in jobs]
@@ -0,0 +1,222 @@
+import shutil
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.base import clone
+
+from src import features
+from src.data_loader import CHUNK_ROWS, iter_cmapss
+from src.feature_spec import DEFAULT_SPEC
+from src.instrument import peak_rss_mb, stage
+
+# RandomForest sample kept in memory, spread evenly over the engines
+RF_MAX_ROWS = 200_000
+
+
+def engine_stats(path, chunksize=CHUNK_ROWS):
+    """Rows and last cycle per engine, from one pass over two columns."""
+    parts = [chunk.groupby("engine_id")["cycle"].agg(["size", "max"])
+             for chunk in iter_cmapss(path, chunksize, ["engine_id", "cycle"])]
+    return pd.concat(parts).groupby(level=0).agg({"size": "sum", "max": "max"})
+
+
+def iter_featured(path, spec, last_cycle, chunksize=CHUNK_ROWS):
+    """
+    Featurized chunks of a C-MAPSS file with RUL, never holding more than
+    one chunk plus a few carried rows per unfinished engine: the tail of
+    each engine is prepended to the next chunk so windows crossing the
+    chunk boundary see their history.
+    """
+    history = spec.history
+    carry = None
+    for chunk in iter_cmapss(path, chunksize):
+        block = chunk if carry is None else pd.concat([carry, chunk], ignore_index=True)
+        feat = features.add_features(block, spec)
+        if carry is not None:
+            feat = feat.iloc[len(carry):]
+        last = last_cycle.reindex(feat["engine_id"]).to_numpy()
+        feat = feat.assign(RUL=last - feat["cycle"].to_numpy())
+        yield feat
+        if history:
+            tail = block.groupby("engine_id", sort=False).tail(history)
+            # Engines that reached their last cycle need no history
+            carry = tail[tail["cycle"].to_numpy() < last_cycle.reindex(tail["engine_id"]).to_numpy()]
+
+
+@dataclass
+class ChunkStore:
+    """Featurized X / y / groups spilled to disk as one .npy triple per chunk."""
+    directory: Path
+    feature_names: list
+    chunks: list = field(default_factory=list)  # rows per chunk
+
+    @property
+    def rows(self):
+        return sum(self.chunks)
+
+    def append(self, X, y, groups):
+        if not len(X):
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        i = len(self.chunks)
+        np.save(self.directory / f"X_{i:05d}.npy", X)
+        np.save(self.directory / f"y_{i:05d}.npy", y)
+        np.save(self.directory / f"g_{i:05d}.npy", groups)
+        self.chunks.append(len(X))
+
+    def load(self, i):
+        """Chunk i as memory-mapped (X, y, groups)."""
+        return tuple(np.load(self.directory / f"{k}_{i:05d}.npy", mmap_mode="r")
+                     for k in ("X", "y", "g"))
+
+    def __iter__(self):
+        for i in range(len(self.chunks)):
+            yield self.load(i)
+
+
+def spill_features(path, spec, out_dir, holdout=0.2, chunksize=CHUNK_ROWS, seed=42):
+    """
+    Stream-featurize a file into train / holdout ChunkStores, holding out
+    a random `holdout` fraction of engines. Returns (train, holdout, stats).
+    """
+    out_dir = Path(out_dir)
+    stats = engine_stats(path, chunksize)
+    rng = np.random.default_rng(seed)
+    n_hold = int(round(holdout * len(stats)))
+    held = rng.choice(stats.index.to_numpy(), size=n_hold, replace=False)
+
+    train = ChunkStore(out_dir / "train", spec.feature_names)
+    hold = ChunkStore(out_dir / "holdout", spec.feature_names)
+    with stage("spill_features") as s:
+        for feat in iter_featured(path, spec, stats["max"], chunksize):
+            X = feat[spec.feature_names].to_numpy(dtype=np.float32)
+            y = feat["RUL"].to_numpy(dtype=np.float32)
+            groups = feat["engine_id"].to_numpy(dtype=np.int32)
+            is_held = np.isin(groups, held)
+            train.append(X[~is_held], y[~is_held], groups[~is_held])
+            hold.append(X[is_held], y[is_held], groups[is_held])
+            s.add(rows=len(X))
+    return train, hold, stats
+
+
+# -----------------------
+# XGBoost: external memory
+# -----------------------
+class ChunkIter(xgb.DataIter):
+    """Feeds a ChunkStore to XGBoost one chunk at a time."""
+
+    def __init__(self, store, cache_prefix):
+        self.store = store
+        self._i = 0
+        super().__init__(cache_prefix=str(cache_prefix), on_host=False)
+
+    def next(self, input_data):
+        if self._i == len(self.store.chunks):
+            return False
+        X, y, _ = self.store.load(self._i)
+        input_data(data=X, label=y)
+        self._i += 1
+        return True
+
+    def reset(self):
+        self._i = 0
+
+
+def train_xgb_external(estimator, train, holdout, cache_dir):
+    """
+    Train an (unfitted) XGBRegressor config through ExtMemQuantileDMatrix:
+    XGBoost pulls chunks from disk and keeps its quantized pages in
+    cache_dir. Returns the trained Booster.
+    """
+    params = {k: v for k, v in estimator.get_xgb_params().items() if v is not None}
+    params["tree_method"] = "hist"
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    dtrain = xgb.ExtMemQuantileDMatrix(ChunkIter(train, cache_dir / "train"))
+    evals = []
+    if holdout.rows:
+        dval = xgb.ExtMemQuantileDMatrix(ChunkIter(holdout, cache_dir / "holdout"), ref=dtrain)
+        evals = [(dval, "holdout")]
+    return xgb.train(params, dtrain, num_boost_round=estimator.n_estimators,
+                     evals=evals, verbose_eval=False)
+
+
+# -----------------------
+# RandomForest: stratified sample by engine
+# -----------------------
+def sample_by_engine(store, engine_rows, rows_per_engine, seed=42):
+    """
+    In-memory sample of about rows_per_engine rows from every engine in
+    the store (all rows of shorter engines), drawn in one pass with a
+    per-engine keep rate from engine_rows (rows per engine).
+    """
+    rng = np.random.default_rng(seed)
+    rate = np.minimum(1.0, rows_per_engine / engine_rows.astype(np.float64))
+    Xs, ys = [], []
+    for X, y, groups in store:
+        keep = rng.random(len(y)) < rate.reindex(groups).to_numpy()
+        Xs.append(np.asarray(X[keep]))
+        ys.append(np.asarray(y[keep]))
+    return np.concatenate(Xs), np.concatenate(ys)
+
+
+def streaming_rmse(predict, store):
+    """RMSE of predict(X) over every chunk of a store."""
+    sse, n = 0.0, 0
+    for X, y, _ in store:
+        err = predict(np.asarray(X)) - y
+        sse += float(np.dot(err, err))
+        n += len(y)
+    return float(np.sqrt(sse / n)) if n else float("nan")
+
+
+def train_out_of_core(path, rf, xgb_model, spec=DEFAULT_SPEC, spill_dir=".cache/spill",
+                      chunksize=CHUNK_ROWS, rf_max_rows=RF_MAX_ROWS, holdout=0.2):
+    """
+    Train both model configs on a file larger than memory: featurized
+    chunks are spilled to spill_dir, XGBoost trains from them in external
+    memory and the RandomForest on a per-engine stratified sample capped
+    at rf_max_rows. Both are scored on held-out engines, chunk by chunk.
+    Returns (fitted rf, xgb Booster, summary dict).
+    """
+    spill_dir = Path(spill_dir)
+    shutil.rmtree(spill_dir, ignore_errors=True)
+    start = time.perf_counter()
+    try:
+        train, hold, stats = spill_features(path, spec, spill_dir, holdout, chunksize)
+        spilled = time.perf_counter()
+
+        with stage("fit", rows=train.rows, model="xgb_external"):
+            booster = train_xgb_external(xgb_model, train, hold, spill_dir / "xgb_cache")
+        xgb_rmse = streaming_rmse(lambda X: booster.inplace_predict(X), hold)
+        xgb_done = time.perf_counter()
+
+        train_engines = stats["size"].drop(np.unique(np.concatenate(
+            [np.unique(g) for _, _, g in hold])) if hold.rows else [])
+        per_engine = max(1, rf_max_rows // max(1, len(train_engines)))
+        X_rf, y_rf = sample_by_engine(train, train_engines, per_engine)
+        with stage("fit", rows=len(y_rf), model="rf_sampled"):
+            rf = clone(rf).fit(X_rf, y_rf)
+        rf_rmse = streaming_rmse(rf.predict, hold)
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+    summary = {
+        "rows": train.rows + hold.rows,
+        "train_rows": train.rows,
+        "holdout_rows": hold.rows,
+        "engines": len(stats),
+        "chunks": len(train.chunks),
+        "rf_sample_rows": len(y_rf),
+        "xgb_rmse": xgb_rmse,
+        "rf_rmse": rf_rmse,
+        "spill_seconds": spilled - start,
+        "xgb_seconds": xgb_done - spilled,
+        "rf_seconds": time.perf_counter() - xgb_done,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    return rf, booster, summary
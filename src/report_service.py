@@ -0,0 +1,311 @@
+"""
+PDF reports rendered in a pool of worker processes, straight into memory.
+
+    service = ReportService()
+    pdf = service.submit("demo", {}).result()               # bytes
+    zip_bytes = service.render_zip(engine_jobs(forecasts))  # one PDF per tail
+
+Each worker builds the styles and reads the logo once, when it starts.
+Templates are platypus stories, so long tables and lists flow onto new pages.
+
+    python -m src.report_service fleet.csv --out reports/engine_reports.zip
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import sys
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+
+from PIL import Image
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from src.instrument import stage
+
+NAVY, ORANGE = colors.HexColor("#0B1E3D"), colors.HexColor("#FF7A00")
+LOGO_PATH = "logo.png"
+# The logo is drawn at 0.5 in: scale it once instead of embedding the
+# full-size PNG in every report
+LOGO_PX = 144
+# Jobs sent to a worker per round trip when rendering in bulk
+BATCH_SIZE = 32
+
+
+@dataclass
+class ReportAssets:
+    """Styles and logo shared by every report a process renders."""
+    styles: dict
+    table_style: TableStyle
+    logo: object = None  # ImageReader, None if the logo file is missing
+
+
+def load_assets(logo_path=LOGO_PATH):
+    base = getSampleStyleSheet()
+    styles = {
+        "title": ParagraphStyle("TitleStyle", parent=base["Title"], textColor=NAVY),
+        "heading": ParagraphStyle("Heading", parent=base["Heading2"], textColor=ORANGE),
+        "normal": ParagraphStyle("NormalStyle", parent=base["Normal"], textColor=NAVY),
+        "bullet": ParagraphStyle("BulletStyle", parent=base["Normal"], textColor=NAVY,
+                                 leftIndent=18, bulletIndent=6),
+    }
+    table_style = TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), NAVY),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, -1), 9),
+        ("ALIGN", (1, 0), (-1, -1), "RIGHT"),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#F8F9FA")]),
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#DDDDDD")),
+    ])
+    logo = None
+    if logo_path and os.path.exists(logo_path):
+        with Image.open(logo_path) as im:
+            im.thumbnail((LOGO_PX, LOGO_PX))
+            buf = io.BytesIO()
+            im.save(buf, format="PNG")
+        logo = ImageReader(buf)
+    return ReportAssets(styles, table_style, logo)
+
+
+# Per process: set by the pool initializer, or on first use in-process
+_assets = None
+
+
+def _init_worker(logo_path):
+    global _assets
+    _assets = load_assets(logo_path)
+
+
+def _get_assets():
+    global _assets
+    if _assets is None:
+        _assets = load_assets()
+    return _assets
+
+
+# ----------------------------
+# Templates: (assets, data) -> (title, story)
+# ----------------------------
+def demo_story(a, data):
+    s = a.styles
+    return "StarCheck – Predictive Maintenance Report", [
+        Paragraph("StarCheck – Predictive Maintenance Report", s["title"]),
+        Spacer(1, 12),
+        Paragraph("Compliance-First Forecasting for Voyageur Aviation", s["heading"]),
+        Spacer(1, 12),
+        Paragraph("This demo showcases predictive maintenance within regulatory thresholds "
+                  "for CRJ200 (CF34-3B1) and Dash8-100 (PW120A) engines.", s["normal"]),
+        Spacer(1, 12),
+        Paragraph("Forecasts indicate extended usable cycles without breaching preventive "
+                  "or predictive safety margins.", s["normal"]),
+    ]
+
+
+def engine_story(a, data):
+    """data: one engine's forecast (engine, model, preventive, predictive, days_saved, value, slope)."""
+    s = a.styles
+    rows = [
+        ["Metric", "Value"],
+        ["Engine model", data["model"]],
+        ["Preventive removal (cycles)", f"{data['preventive']:,.0f}"],
+        ["Predictive removal (cycles)", f"{data['predictive']:,.0f}"],
+        ["Extra cycles unlocked", f"{data['predictive'] - data['preventive']:,.0f}"],
+        ["Days saved", f"{data['days_saved']:,.0f}"],
+        ["Value unlocked", f"${data['value']:,.0f}"],
+        ["EGT margin trend (°C / cycle)", f"{data['slope']:.3f}"],
+    ]
+    title = f"Engine Report – {data['engine']}"
+    return title, [
+        Paragraph(title, s["title"]),
+        Paragraph("EGT margin forecast against the preventive (50 °C) and "
+                  "predictive (30 °C) limits.", s["normal"]),
+        Spacer(1, 12),
+        Table(rows, colWidths=[3 * inch, 2 * inch], style=a.table_style, hAlign="LEFT"),
+    ]
+
+
+def fleet_story(a, data):
+    """data: {"engines": [engine_story payloads], "title": optional}; the table repeats its header per page."""
+    s = a.styles
+    title = data.get("title", "Fleet Report")
+    engines = data["engines"]
+    rows = [["Engine", "Model", "Preventive", "Predictive", "Days Saved", "Value ($)"]]
+    rows += [[e["engine"], e["model"], f"{e['preventive']:,.0f}", f"{e['predictive']:,.0f}",
+              f"{e['days_saved']:,.0f}", f"{e['value']:,.0f}"] for e in engines]
+    total = sum(e["value"] for e in engines)
+    return title, [
+        Paragraph(title, s["title"]),
+        Paragraph(f"{len(engines):,} engines – total value unlocked ${total:,.0f}", s["heading"]),
+        Spacer(1, 12),
+        Table(rows, repeatRows=1, style=a.table_style, hAlign="LEFT"),
+    ]
+
+
+def compliance_story(a, data):
+    """data: compliance results (document, risk_score, violations, suggestions)."""
+    s = a.styles
+    story = [
+        Paragraph("Billion Dollar Jet Software – Compliance Report", s["title"]),
+        Paragraph(f"Document: {data.get('document', 'N/A')}", s["normal"]),
+        Paragraph(f"Risk Score: {data.get('risk_score', 0)}% compliant", s["normal"]),
+        Spacer(1, 12),
+        Paragraph("Violations Found:", s["heading"]),
+    ]
+    story += [Paragraph(str(v), s["bullet"], bulletText="-") for v in data.get("violations", [])]
+    story.append(Paragraph("Suggested Fixes:", s["heading"]))
+    story += [Paragraph(str(f), s["bullet"], bulletText="-") for f in data.get("suggestions", [])]
+    return "Compliance Report", story
+
+
+TEMPLATES = {
+    "demo": demo_story,
+    "engine": engine_story,
+    "fleet": fleet_story,
+    "compliance": compliance_story,
+}
+
+
+def _draw_frame(canvas, doc):
+    """Logo and page number on every page."""
+    canvas.saveState()
+    logo = doc.assets.logo
+    if logo is not None:
+        canvas.drawImage(logo, doc.leftMargin, letter[1] - 0.6 * inch, width=0.5 * inch,
+                         height=0.5 * inch, preserveAspectRatio=True, mask="auto")
+    canvas.setFont("Helvetica", 8)
+    canvas.setFillColor(NAVY)
+    canvas.drawRightString(letter[0] - doc.rightMargin, 0.5 * inch, f"Page {doc.page}")
+    canvas.restoreState()
+
+
+def render(template, data):
+    """One report as PDF bytes, rendered in this process."""
+    if template not in TEMPLATES:
+        raise ValueError(f"Unknown report template {template!r}, expected one of {list(TEMPLATES)}")
+    assets = _get_assets()
+    title, story = TEMPLATES[template](assets, data)
+    buf = io.BytesIO()
+    doc = SimpleDocTemplate(buf, pagesize=letter, title=title, author="StarCheck")
+    doc.assets = assets
+    doc.build(story, onFirstPage=_draw_frame, onLaterPages=_draw_frame)
+    return buf.getvalue()
+
+
+def _render_batch(jobs):
+    return [(key, render(template, data)) for key, template, data in jobs]
+
+
+def engine_jobs(forecasts):
+    """(file name, "engine", payload) for every engine in a forecast_fleet table."""
+    cols = forecasts[["Model", "preventive_cycles", "predictive_cycles",
+                      "days_saved", "value", "slope"]]
+    return [
+        (f"{engine}.pdf", "engine", {
+            "engine": str(engine), "model": str(model), "preventive": float(prev),
+            "predictive": float(pred), "days_saved": float(days), "value": float(value),
+            "slope": float(slope),
+        })
+        for engine, (model, prev, pred, days, value, slope)
+        in zip(forecasts.index, cols.itertuples(index=False, name=None))
+    ]
+
+
+def fleet_payload(jobs, title="Fleet Report"):
+    """fleet template data from engine_jobs() output."""
+    return {"title": title, "engines": [data for _, _, data in jobs]}
+
+
+class ReportService:
+    """
+    Renders reports in worker processes. Every call returns bytes (or a
+    Future of bytes); nothing is written to a shared file, so concurrent
+    sessions never see each other's reports.
+    """
+
+    def __init__(self, max_workers=None, logo_path=LOGO_PATH):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # spawn: the app forks from a threaded server otherwise
+        self._pool = ProcessPoolExecutor(self.max_workers,
+                                         mp_context=multiprocessing.get_context("spawn"),
+                                         initializer=_init_worker, initargs=(logo_path,))
+        # Collects bulk jobs into ZIPs without blocking the caller
+        self._zips = ThreadPoolExecutor(1)
+
+    def submit(self, template, data):
+        """Future of one report's PDF bytes."""
+        return self._pool.submit(render, template, data)
+
+    def render_many(self, jobs, batch_size=BATCH_SIZE):
+        """
+        Yield (key, PDF bytes) for (key, template, data) jobs as they finish.
+        Jobs go out in batches with at most two per worker in flight, so
+        memory stays flat however many reports are requested.
+        """
+        jobs = iter(jobs)
+        pending = set()
+        with stage("render_reports") as s:
+            while True:
+                while len(pending) < 2 * self.max_workers:
+                    batch = [job for _, job in zip(range(batch_size), jobs)]
+                    if not batch:
+                        break
+                    pending.add(self._pool.submit(_render_batch, batch))
+                if not pending:
+                    return
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results = future.result()
+                    s.add(reports=len(results))
+                    yield from results
+
+    def render_zip(self, jobs, dest=None, batch_size=BATCH_SIZE):
+        """All jobs as one ZIP of PDFs: written to dest, or returned as bytes."""
+        target = dest if dest is not None else io.BytesIO()
+        # PDFs are already compressed
+        with zipfile.ZipFile(target, "w", zipfile.ZIP_STORED) as zf:
+            for key, pdf in self.render_many(jobs, batch_size):
+                zf.writestr(key, pdf)
+        return target.getvalue() if dest is None else dest
+
+    def submit_zip(self, jobs, batch_size=BATCH_SIZE):
+        """Future of render_zip(jobs) bytes."""
+        return self._zips.submit(self.render_zip, list(jobs), None, batch_size)
+
+    def shutdown(self):
+        self._zips.shutdown()
+        self._pool.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render one PDF report per engine in a fleet CSV")
+    parser.add_argument("fleet", help="fleet CSV (Engine_ID, Engine_Model, Cycles, EGT_Margin)")
+    parser.add_argument("--out", default="reports/engine_reports.zip", help="ZIP to write")
+    parser.add_argument("--workers", type=int, help="render processes (default: all cores)")
+    parser.add_argument("--stress", type=float, default=1.0, help="mission stress factor")
+    args = parser.parse_args(argv)
+
+    from src.data_loader import load_fleet_csv
+    from src.forecast import forecast_fleet
+
+    forecasts = forecast_fleet(load_fleet_csv(args.fleet), args.stress)
+    jobs = engine_jobs(forecasts)
+    jobs.append(("fleet.pdf", "fleet", fleet_payload(jobs)))
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    service = ReportService(args.workers)
+    try:
+        service.render_zip(jobs, args.out)
+    finally:
+        service.shutdown()
+    print(f"✅ {len(jobs):,} reports written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,288 @@
+"""
+Fleet risk index: engines ordered by forecast cycles-to-limit, kept
+sorted as forecasts change instead of re-sorting the table per render.
+
+    index = RiskIndex.from_forecasts(forecasts)          # predictive_cycles, Model
+    index.top(3)                                         # most at-risk engines
+    index.top(5, model="PW120A")                         # ... of one engine model
+    index.between(0, 150)                                # (engine, cycles) in a range
+    index.status_counts(model="GE CF34-3B1")             # {"At Risk": 2, ...}
+    index.update("CRJ200-A1", 120.0)                     # one engine re-forecast
+
+Secondary indexes are kept for every attribute passed in (model, base,
+route, ...) and for the derived status, so filtered queries only touch
+the matching engines.
+"""
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from itertools import chain, islice
+
+import numpy as np
+
+# Same bins as the Fleet Charts page: (0, 150] At Risk, (150, 300] Watch, above Healthy
+STATUS_BINS = (0, 150, 300)
+STATUSES = ("At Risk", "Watch", "Healthy")
+
+
+def status_of(cycles):
+    """Status for a cycles-to-limit value; None outside the bins (<= 0 or NaN), like pd.cut."""
+    if not cycles > STATUS_BINS[0]:
+        return None
+    for edge, label in zip(STATUS_BINS[1:], STATUSES):
+        if cycles <= edge:
+            return label
+    return STATUSES[-1]
+
+
+class SortedKeys:
+    """
+    Sorted list of unique keys stored as chunks of at most 2 * LOAD keys,
+    with each chunk's max kept for bisecting: add/remove cost a bisect
+    over the chunk maxes plus an insert into one short list.
+    """
+    LOAD = 256
+
+    def __init__(self, keys=()):
+        keys = sorted(keys)
+        self._chunks = [keys[i:i + self.LOAD] for i in range(0, len(keys), self.LOAD)]
+        self._maxes = [c[-1] for c in self._chunks]
+        self._len = len(keys)
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return chain.from_iterable(self._chunks)
+
+    def add(self, key):
+        if not self._chunks:
+            self._chunks.append([key])
+            self._maxes.append(key)
+        else:
+            i = min(bisect_left(self._maxes, key), len(self._maxes) - 1)
+            chunk = self._chunks[i]
+            insort(chunk, key)
+            self._maxes[i] = chunk[-1]
+            if len(chunk) > 2 * self.LOAD:
+                self._chunks[i:i + 1] = [chunk[:self.LOAD], chunk[self.LOAD:]]
+                self._maxes[i:i + 1] = [chunk[self.LOAD - 1], chunk[-1]]
+        self._len += 1
+
+    def remove(self, key):
+        i = bisect_left(self._maxes, key)
+        chunk = self._chunks[i] if i < len(self._chunks) else None
+        j = bisect_left(chunk, key) if chunk else 0
+        if chunk is None or j == len(chunk) or chunk[j] != key:
+            raise KeyError(key)
+        del chunk[j]
+        if chunk:
+            self._maxes[i] = chunk[-1]
+        else:
+            del self._chunks[i], self._maxes[i]
+        self._len -= 1
+
+    def irange(self, lo, hi):
+        """Keys with lo <= key <= hi, in order."""
+        i = bisect_left(self._maxes, lo)
+        if i == len(self._chunks):
+            return
+        j = bisect_left(self._chunks[i], lo)
+        for chunk in islice(self._chunks, i, None):
+            stop = bisect_right(chunk, hi)
+            yield from chunk[j:stop]
+            if stop < len(chunk):
+                return
+            j = 0
+
+
+class RiskIndex:
+    """
+    Engines keyed by cycles-to-limit (ascending = most at risk first),
+    plus one SortedKeys per (attribute, value) and per status. Ties keep
+    insertion order. NaN forecasts sort last with no status.
+    """
+
+    def __init__(self):
+        self._seq = {}      # engine -> tie-break number, fixed for the engine's lifetime
+        self._next = 0
+        self._engines = {}  # tie-break number -> engine
+        self._cycles = {}   # engine -> cycles
+        self._attrs = {}    # engine -> {attribute: value}
+        self._all = SortedKeys()
+        self._groups = {}   # (attribute, value) -> SortedKeys; ("status", label) too
+        self._counts = {}   # (attribute, value) or None -> Counter of statuses
+
+    @classmethod
+    def from_forecasts(cls, forecasts, column="predictive_cycles", attrs=None):
+        """
+        Bulk-build from a forecast table indexed by engine. attrs maps an
+        attribute name to a column (default {"model": "Model"} when present).
+        """
+        if attrs is None:
+            attrs = {"model": "Model"} if "Model" in forecasts.columns else {}
+        index = cls()
+        engines = forecasts.index.tolist()
+        cycles = forecasts[column].to_numpy(dtype=np.float64).tolist()
+        values = {name: forecasts[col].tolist() for name, col in attrs.items()}
+        members = {}
+        for seq, (engine, c) in enumerate(zip(engines, cycles)):
+            if engine in index._seq:
+                raise ValueError(f"Engine {engine!r} appears twice")
+            index._seq[engine], index._engines[seq] = seq, engine
+            index._cycles[engine] = c
+            a = {name: v[seq] for name, v in values.items()}
+            index._attrs[engine] = a
+            key = (index._sort_value(c), seq)
+            status = status_of(c)
+            for group in index._group_keys(a, status):
+                members.setdefault(group, []).append(key)
+            index._count(a, status, 1)
+        index._all = SortedKeys((cls._sort_value(c), seq) for seq, c in enumerate(cycles))
+        index._groups = {g: SortedKeys(keys) for g, keys in members.items()}
+        index._next = len(engines)
+        return index
+
+    @staticmethod
+    def _sort_value(cycles):
+        return np.inf if cycles != cycles else cycles
+
+    @staticmethod
+    def _group_keys(attrs, status):
+        keys = [(name, value) for name, value in attrs.items()]
+        if status is not None:
+            keys.append(("status", status))
+        return keys
+
+    def _count(self, attrs, status, delta):
+        for group in [None, *((name, value) for name, value in attrs.items())]:
+            counts = self._counts.setdefault(group, Counter())
+            counts[status] += delta
+
+    def __len__(self):
+        return len(self._cycles)
+
+    def __contains__(self, engine):
+        return engine in self._cycles
+
+    def cycles(self, engine):
+        return self._cycles[engine]
+
+    def status(self, engine):
+        return status_of(self._cycles[engine])
+
+    # ----------------------------
+    # Updates
+    # ----------------------------
+    def update(self, engine, cycles, **attrs):
+        """
+        Insert an engine or move it to its new cycles-to-limit (and any
+        changed attributes); attributes not passed keep their value.
+        """
+        cycles = float(cycles)
+        if engine in self._cycles:
+            old_attrs = self._attrs[engine]
+            new_attrs = {**old_attrs, **attrs}
+            old = self._cycles[engine]
+            if new_attrs == old_attrs and (old == cycles or (old != old and cycles != cycles)):
+                return
+            self._unlink(engine)
+        else:
+            seq, self._next = self._next, self._next + 1
+            self._seq[engine], self._engines[seq] = seq, engine
+            new_attrs = dict(attrs)
+        self._link(engine, cycles, new_attrs)
+
+    def remove(self, engine):
+        self._unlink(engine)
+        del self._cycles[engine], self._attrs[engine]
+        del self._engines[self._seq.pop(engine)]
+
+    def sync(self, forecasts, column="predictive_cycles"):
+        """
+        Bring the index in line with a forecast table over the same
+        engines, updating only the rows whose value changed. Returns the
+        number of engines updated.
+        """
+        engines = forecasts.index
+        new = forecasts[column].to_numpy(dtype=np.float64)
+        old = np.array([self._cycles.get(e, np.nan) for e in engines])
+        changed = ~((new == old) | (np.isnan(new) & np.isnan(old)))
+        changed |= ~np.fromiter((e in self._cycles for e in engines), bool, len(engines))
+        for engine, value in zip(engines[changed], new[changed]):
+            self.update(engine, value)
+        return int(changed.sum())
+
+    def _link(self, engine, cycles, attrs):
+        self._cycles[engine], self._attrs[engine] = cycles, attrs
+        key = (self._sort_value(cycles), self._seq[engine])
+        status = status_of(cycles)
+        self._all.add(key)
+        for group in self._group_keys(attrs, status):
+            self._groups.setdefault(group, SortedKeys()).add(key)
+        self._count(attrs, status, 1)
+
+    def _unlink(self, engine):
+        cycles, attrs = self._cycles[engine], self._attrs[engine]
+        key = (self._sort_value(cycles), self._seq[engine])
+        status = status_of(cycles)
+        self._all.remove(key)
+        for group in self._group_keys(attrs, status):
+            self._groups[group].remove(key)
+        self._count(attrs, status, -1)
+
+    # ----------------------------
+    # Queries
+    # ----------------------------
+    def _keys(self, status=None, **filters):
+        """Smallest matching group's keys + the remaining filters to check per engine."""
+        if status is not None:
+            filters["status"] = status
+        if not filters:
+            return self._all, {}
+        groups = [(name, value) for name, value in filters.items()]
+        smallest = min(groups, key=lambda g: len(self._groups.get(g, ())))
+        rest = {name: value for name, value in groups if (name, value) != smallest}
+        return self._groups.get(smallest, SortedKeys()), rest
+
+    def _match(self, engine, rest):
+        if not rest:
+            return True
+        attrs = self._attrs[engine]
+        return all((self.status(engine) if name == "status" else attrs.get(name)) == value
+                   for name, value in rest.items())
+
+    def _engines_of(self, keys, rest):
+        for _, seq in keys:
+            engine = self._engines[seq]
+            if self._match(engine, rest):
+                yield engine
+
+    def top(self, n, status=None, **filters):
+        """The n most at-risk engines as (engine, cycles), optionally filtered (model=..., status=...)."""
+        keys, rest = self._keys(status, **filters)
+        return [(e, self._cycles[e]) for e in islice(self._engines_of(keys, rest), n)]
+
+    def between(self, lo, hi, status=None, **filters):
+        """(engine, cycles) with lo <= cycles <= hi, most at-risk first."""
+        keys, rest = self._keys(status, **filters)
+        found = keys.irange((lo, -1), (hi, np.inf))
+        return [(e, self._cycles[e]) for e in self._engines_of(found, rest)]
+
+    def status_counts(self, status=None, **filters):
+        """Engines per status (STATUSES order, plus None if any are unbinned)."""
+        if len(filters) > 1:
+            keys, rest = self._keys(status, **filters)
+            counts = Counter(self.status(e) for e in self._engines_of(keys, rest))
+        else:
+            counts = self._counts.get(next(iter(filters.items()), None), Counter())
+            if status is not None:
+                counts = Counter({status: counts.get(status, 0)})
+        out = {label: counts.get(label, 0) for label in STATUSES}
+        if counts.get(None):
+            out[None] = counts[None]
+        return out
+
+    def values(self, name):
+        """Distinct values of an attribute, e.g. values("model")."""
+        return sorted((v for (attr, v), keys in self._groups.items() if attr == name and len(keys)),
+                      key=str)
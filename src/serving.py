@@ -0,0 +1,456 @@
+"""
+Local HTTP prediction service for programmatic RUL queries.
+
+    python -m src.serving serve --models models/rf_model.pkl models/xgb_model.pkl
+    python -m src.serving loadgen data/FD001.txt --concurrency 64 --requests 2000
+
+    POST /predict   {"model": "rf", "engine_id": 7,
+                     "cycles": [{"cycle": 1, "setting_1": ..., "sensor_2": ...}, ...]}
+                    -> {"engine_id": 7, "model": "rf", "cycle": 31, "rul": 112.4}
+    GET  /metrics   requests, batch sizes, p50 / p99 latency per model
+    GET  /health
+
+Concurrent requests for the same model are coalesced into micro-batches
+(up to --max-batch requests, waiting at most --max-wait-ms for the batch
+to fill). Each batch is featurized and scored in a thread pool, so the
+event loop keeps accepting requests. Only the standard library is used
+for HTTP.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.batch_scoring import DEFAULT_MODELS, model_name
+from src.inference import align_features, get_registry, predict_batch
+from src.instrument import stage
+
+MAX_BATCH = 64
+MAX_WAIT_MS = 5.0
+MAX_BODY = 8 * 2**20
+# Latencies kept per model for the percentiles
+LATENCY_WINDOW = 10_000
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def required_columns(spec):
+    """Raw input columns a model's spec reads (besides engine_id)."""
+    cols = {"cycle", *spec.raw, *(op.sensor for op in spec.ops)}
+    if spec.regimes is not None:
+        cols.update(spec.regimes.settings)
+        cols.update(spec.regimes.sensors)
+    return sorted(cols)
+
+
+def content_length(headers):
+    """Content-Length as a non-negative int (0 when absent); RequestError(400) otherwise."""
+    value = headers.get("content-length") or "0"
+    try:
+        length = int(value)
+    except ValueError:
+        raise RequestError(400, f"Invalid Content-Length {value!r}")
+    if length < 0:
+        raise RequestError(400, f"Invalid Content-Length {value!r}")
+    return length
+
+
+class Metrics:
+    """Request latencies (seconds) and batch sizes for one model."""
+
+    def __init__(self):
+        self.requests = 0
+        self.batches = 0
+        self.rows = 0
+        self.latency = deque(maxlen=LATENCY_WINDOW)
+        self.batch_sizes = deque(maxlen=LATENCY_WINDOW)
+
+    def summary(self):
+        lat = np.asarray(self.latency) * 1000
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch": float(np.mean(self.batch_sizes)) if self.batch_sizes else None,
+            "max_batch": int(max(self.batch_sizes)) if self.batch_sizes else None,
+            "p50_ms": float(np.percentile(lat, 50)) if len(lat) else None,
+            "p99_ms": float(np.percentile(lat, 99)) if len(lat) else None,
+        }
+
+
+class MicroBatcher:
+    """
+    Collects requests for one model and scores them together. A batch is
+    sent when it holds max_batch requests or max_wait seconds after its
+    first request arrived, whichever comes first.
+    """
+
+    def __init__(self, entry, executor, max_in_flight, max_batch=MAX_BATCH,
+                 max_wait=MAX_WAIT_MS / 1000):
+        self.entry = entry
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.columns = required_columns(entry.spec)
+        self._cycle = self.columns.index("cycle")
+        # Rows before the last cycle that its features look back on
+        self.history = entry.spec.history
+        self.metrics = Metrics()
+        self._pending = []  # (values, future) not yet in a batch
+        self._arrived = asyncio.Event()
+        self._full = asyncio.Event()
+        # At most one batch per predict thread; later requests keep queueing
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._collect())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def prepare(self, cycles):
+        """
+        Validate one request's cycles -> float64 array (rows x columns) of
+        the rows its last cycle needs. Runs on the event loop, so no pandas.
+        """
+        if not isinstance(cycles, list) or not cycles or not all(isinstance(r, dict) for r in cycles):
+            raise RequestError(400, "'cycles' must be a non-empty list of objects")
+        try:
+            values = np.array([[r.get(c) for c in self.columns] for r in cycles], dtype=np.float64)
+        except (TypeError, ValueError) as e:
+            raise RequestError(400, f"Non-numeric value in 'cycles': {e}")
+        missing = [c for c, absent in zip(self.columns, np.isnan(values).all(axis=0)) if absent]
+        if missing:
+            raise RequestError(400, f"'cycles' is missing columns: {missing}")
+        order = np.argsort(values[:, self._cycle], kind="stable")
+        window = values[order[-(self.history + 1):]]
+        # A gap in the window would be featurized and scored as NaN
+        gaps = [c for c, gap in zip(self.columns, np.isnan(window).any(axis=0)) if gap]
+        if gaps:
+            raise RequestError(400, f"Missing or null {gaps} in the last {len(window)} cycles")
+        return window
+
+    async def predict(self, cycles):
+        """RUL at the last cycle of one engine's history; (cycle, rul)."""
+        values = self.prepare(cycles)
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((values, future))
+        self._signal()
+        return await future
+
+    def _signal(self):
+        if self._pending:
+            self._arrived.set()
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._arrived.wait()
+            # The first request waits at most max_wait for the batch to fill
+            try:
+                await asyncio.wait_for(self._full.wait(), self.max_wait)
+            except asyncio.TimeoutError:
+                pass
+            batch = self._pending[:self.max_batch]
+            self._pending = self._pending[self.max_batch:]
+            self._arrived.clear()
+            self._full.clear()
+            self._signal()
+            await self._slots.acquire()
+            loop.create_task(self._run(batch))
+
+    async def _run(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            arrays = [values for values, _ in batch]
+            results = await loop.run_in_executor(self.executor, self._score, arrays)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._slots.release()
+        self.metrics.batches += 1
+        self.metrics.batch_sizes.append(len(batch))
+
+    def _score(self, arrays):
+        """Worker thread: featurize all requests as one frame, keep each last row."""
+        lengths = np.fromiter((len(a) for a in arrays), dtype=np.int64, count=len(arrays))
+        df = pd.DataFrame(np.concatenate(arrays), columns=self.columns).astype(np.float32)
+        df["cycle"] = df["cycle"].astype(np.int32)
+        # Requests become engines 0..n-1, so windows never cross requests
+        df.insert(0, "engine_id", np.repeat(np.arange(len(arrays), dtype=np.int32), lengths))
+        with stage("serve_batch", requests=len(arrays), rows=len(df)):
+            X = align_features(self.entry.featurize(df), self.entry.feature_names)
+            last = np.cumsum(lengths) - 1
+            rul = predict_batch(self.entry.model, X[last])
+        self.metrics.rows += len(df)
+        cycles = df["cycle"].to_numpy()[last]
+        return [(int(c), float(r)) for c, r in zip(cycles, rul)]
+
+
+class PredictionServer:
+    """asyncio HTTP/1.1 server (keep-alive, JSON bodies) around one MicroBatcher per model."""
+
+    def __init__(self, model_paths=DEFAULT_MODELS, threads=2, max_batch=MAX_BATCH,
+                 max_wait_ms=MAX_WAIT_MS):
+        registry = get_registry()
+        registry.max_models = max(registry.max_models, len(model_paths))
+        self.threads = threads
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix="predict")
+        self.entries = {model_name(p): registry.get(p) for p in model_paths}
+        for entry in self.entries.values():
+            if entry.feature_names is None:
+                raise ValueError(f"{entry.path} has no stored feature_names; "
+                                 "re-save it with model_utils.save_model")
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.batchers = {}
+        self.started = time.time()
+        self._server = None
+
+    async def start(self, host="127.0.0.1", port=8000):
+        self.batchers = {name: MicroBatcher(entry, self.executor, self.threads,
+                                            self.max_batch, self.max_wait)
+                         for name, entry in self.entries.items()}
+        for b in self.batchers.values():
+            b.start()
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for b in self.batchers.values():
+            await b.stop()
+        self.executor.shutdown()
+
+    async def serve_forever(self, host="127.0.0.1", port=8000):
+        host, port = await self.start(host, port)
+        print(f"🚀 Serving {', '.join(self.entries)} on http://{host}:{port} "
+              f"(batches of <= {self.max_batch}, <= {self.max_wait * 1000:g} ms wait)")
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    def metrics(self):
+        return {
+            "uptime_s": time.time() - self.started,
+            "models": {name: b.metrics.summary() for name, b in self.batchers.items()},
+        }
+
+    async def _route(self, method, path, body):
+        if path == "/health":
+            return 200, {"status": "ok", "models": list(self.entries)}
+        if path == "/metrics":
+            return 200, self.metrics()
+        if path != "/predict":
+            raise RequestError(404, f"No route {path}")
+        if method != "POST":
+            raise RequestError(405, "Use POST /predict")
+        try:
+            req = json.loads(body or b"null")
+        except ValueError as e:
+            raise RequestError(400, f"Body is not JSON: {e}")
+        if not isinstance(req, dict):
+            raise RequestError(400, "Body must be a JSON object")
+        name = req.get("model") or next(iter(self.batchers))
+        batcher = self.batchers.get(name)
+        if batcher is None:
+            raise RequestError(404, f"Unknown model {name!r}, serving {list(self.batchers)}")
+        start = time.perf_counter()
+        cycle, rul = await batcher.predict(req.get("cycles"))
+        batcher.metrics.requests += 1
+        batcher.metrics.latency.append(time.perf_counter() - start)
+        return 200, {"engine_id": req.get("engine_id"), "model": name, "cycle": cycle, "rul": rul}
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    method, target, _ = line.decode("latin-1").split(" ", 2)
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = h.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                length = None
+                try:
+                    length = content_length(headers)
+                    if length > MAX_BODY:
+                        raise RequestError(413, f"Body over {MAX_BODY} bytes")
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = await self._route(method, target.split("?", 1)[0], body)
+                except RequestError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except Exception as e:
+                    status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+                # Without a usable length the rest of the stream can't be framed
+                if length is None or status == 413:
+                    keep_alive = False
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+# ----------------------------
+# Load generator
+# ----------------------------
+async def _request(reader, writer, host, method, path, payload=None):
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: {host}\r\n"
+                 f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+                 + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        h = await reader.readline()
+        if h in (b"\r\n", b"\n", b""):
+            break
+        key, _, value = h.decode("latin-1").partition(":")
+        if key.strip().lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+def engine_requests(df, model=None, window=30):
+    """One /predict payload per engine: its last `window` cycles of a C-MAPSS frame."""
+    payloads = []
+    for engine, sub in df.groupby("engine_id", sort=False):
+        cycles = sub.drop(columns=["engine_id"]).tail(window)
+        payloads.append({"model": model, "engine_id": int(engine),
+                         "cycles": cycles.to_dict(orient="records")})
+    return payloads
+
+
+async def run_load(url, payloads, n_requests=1000, concurrency=32):
+    """
+    Fire n_requests /predict calls (cycling through payloads) over
+    `concurrency` keep-alive connections. Returns client-side stats plus
+    the server's /metrics.
+    """
+    host, _, port = url.removeprefix("http://").rstrip("/").partition(":")
+    port = int(port or 80)
+    counter = iter(range(n_requests))
+    latencies, errors = [], 0
+
+    async def client():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for i in counter:
+                start = time.perf_counter()
+                status, _ = await _request(reader, writer, host, "POST", "/predict",
+                                           payloads[i % len(payloads)])
+                latencies.append(time.perf_counter() - start)
+                errors += status != 200
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    reader, writer = await asyncio.open_connection(host, port)
+    _, server = await _request(reader, writer, host, "GET", "/metrics")
+    writer.close()
+    lat = np.asarray(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": wall,
+        "requests_per_sec": len(latencies) / wall if wall > 0 else None,
+        "p50_ms": float(np.percentile(lat, 50)),
+        "p99_ms": float(np.percentile(lat, 99)),
+        "server": server,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="RUL prediction service with micro-batching")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="run the HTTP service")
+    serve.add_argument("--models", nargs="+", default=list(DEFAULT_MODELS))
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8000)
+    serve.add_argument("--threads", type=int, default=min(4, os.cpu_count() or 1),
+                       help="predict threads (default: up to 4)")
+    serve.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    serve.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    load = sub.add_parser("loadgen", help="exercise a running service with engine histories")
+    load.add_argument("data", help="C-MAPSS file to draw engine histories from")
+    load.add_argument("--url", default="http://127.0.0.1:8000")
+    load.add_argument("--model", help="model name (default: the server's first)")
+    load.add_argument("--requests", type=int, default=1000)
+    load.add_argument("--concurrency", type=int, default=32)
+    load.add_argument("--window", type=int, default=30, help="cycles sent per request")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        server = PredictionServer(args.models, args.threads, args.max_batch, args.max_wait_ms)
+        try:
+            asyncio.run(server.serve_forever(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    from src.data_loader import load_cmapss
+    payloads = engine_requests(load_cmapss(args.data), args.model, args.window)
+    stats = asyncio.run(run_load(args.url, payloads, args.requests, args.concurrency))
+    print(f"📈 {stats['requests']:,} requests ({stats['errors']} errors) in {stats['seconds']:.1f}s: "
+          f"{stats['requests_per_sec']:,.0f} req/s, p50 {stats['p50_ms']:.1f} ms, "
+          f"p99 {stats['p99_ms']:.1f} ms")
+    for name, m in stats["server"]["models"].items():
+        if m["requests"]:
+            print(f"   {name}: server p50 {m['p50_ms']:.1f} ms, p99 {m['p99_ms']:.1f} ms, "
+                  f"mean batch {m['mean_batch']:.1f}")
+    return 1 if stats["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
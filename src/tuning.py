@@ -0,0 +1,266 @@
+"""
+Hyperparameter search for the RUL models: successive halving over a
+process pool, scored on held-out engines.
+
+    result = tune("xgb", make_models()["xgb"], X, y, groups, spec=spec)
+    result.best_params     # {"learning_rate": 0.04, "max_depth": 5, ..., "n_estimators": 640}
+    print(result.summary())
+
+Every trial is cross-validated with the GroupKFold split that training
+uses. The first rung scores all sampled configs on a small share of each
+fold's training engines, and each later rung keeps the best 1/eta on
+eta times more engines, up to all of them. XGBoost configs grow up to
+XGB_MAX_ROUNDS trees and stop early on engines held out of the fold's
+training set, so the number of trees is tuned too.
+
+Results are cached on disk per (data, feature spec, model, params,
+rung), so a repeated or interrupted search skips the trials already done.
+"""
+import hashlib
+import json
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.model_selection import GroupKFold
+
+from src.cache import CACHE_DIR, cache_key
+from src.instrument import stage
+
+TRIALS_DIR = CACHE_DIR / "trials"
+XGB_MAX_ROUNDS = 2000
+EARLY_STOPPING_ROUNDS = 50
+# Share of a fold's training engines held out for XGBoost early stopping
+EARLY_STOPPING_FRACTION = 0.2
+
+# Values are a list to choose from, or ("uniform" | "log", low, high)
+SEARCH_SPACES = {
+    "rf": {
+        "max_depth": [None, 8, 12, 16, 24],
+        "min_samples_leaf": [1, 2, 5, 10, 20],
+        "max_features": [1.0, 0.5, 0.33, "sqrt"],
+    },
+    "xgb": {
+        "learning_rate": ("log", 0.01, 0.3),
+        "max_depth": [3, 4, 5, 6, 8],
+        "min_child_weight": [1, 3, 10, 30],
+        "subsample": ("uniform", 0.6, 1.0),
+        "colsample_bytree": ("uniform", 0.5, 1.0),
+        "reg_lambda": ("log", 0.1, 10.0),
+    },
+}
+
+
+def sample_params(space, rng):
+    """One config drawn from a search space."""
+    params = {}
+    for name, values in space.items():
+        if isinstance(values, tuple):
+            kind, low, high = values
+            if kind == "log":
+                params[name] = float(math.exp(rng.uniform(math.log(low), math.log(high))))
+            else:
+                params[name] = float(rng.uniform(low, high))
+        else:
+            params[name] = values[int(rng.integers(len(values)))]
+    return params
+
+
+def data_digest(X, y, groups):
+    """Content hash of the training arrays, part of every trial's cache key."""
+    h = hashlib.blake2b(digest_size=16)
+    for arr in (X, y, groups):
+        arr = np.ascontiguousarray(arr)
+        h.update(f"{arr.dtype.str}{arr.shape}".encode())
+        h.update(arr.data)
+    return h.hexdigest()
+
+
+def _is_xgb(estimator):
+    return hasattr(estimator, "get_booster")
+
+
+@dataclass
+class TuningResult:
+    """Every trial of a search plus the winning config."""
+    name: str
+    best_params: dict
+    best_rmse: float
+    trials: list = field(default_factory=list)
+    seconds: float = 0.0
+
+    def summary(self):
+        rungs = sorted({t["rung"] for t in self.trials})
+        lines = [f"{self.name}: best CV RMSE {self.best_rmse:.2f} "
+                 f"({len(self.trials)} trial evaluations, {self.seconds:.1f}s, "
+                 f"{sum(t['cached'] for t in self.trials)} from cache)"]
+        for rung in rungs:
+            ts = [t for t in self.trials if t["rung"] == rung]
+            lines.append(f"  rung {rung}: {len(ts)} config(s) on {ts[0]['fraction']:.0%} of "
+                         f"training engines, best RMSE {min(t['rmse'] for t in ts):.2f}")
+        lines.append("  best params: " + json.dumps(self.best_params, sort_keys=True))
+        return "\n".join(lines)
+
+
+# -----------------------
+# Workers
+# -----------------------
+# Arrays and folds are sent to each worker once, not once per trial
+_data = {}
+
+
+def _init_worker(X, y, groups, n_splits):
+    _data["X"], _data["y"] = X, y
+    _data["groups"] = groups
+    _data["folds"] = list(GroupKFold(n_splits=n_splits).split(X, y, groups))
+
+
+def _subset_engines(groups, idx, fraction, seed):
+    """The first `fraction` of idx's engines in a fixed shuffled order (same for every config)."""
+    engines = np.random.default_rng(seed).permutation(np.unique(groups[idx]))
+    keep = engines[:max(2, math.ceil(fraction * len(engines)))]
+    return idx[np.isin(groups[idx], keep)], keep
+
+
+def _run_fold(estimator, params, fold, fraction, n_jobs, seed):
+    """Fit one config on a fold's (sub-sampled) training engines, score its test engines."""
+    X, y, groups = _data["X"], _data["y"], _data["groups"]
+    train_idx, test_idx = _data["folds"][fold]
+    start = time.perf_counter()
+    train_idx, engines = _subset_engines(groups, train_idx, fraction, seed + fold)
+    model = clone(estimator).set_params(**params, n_jobs=n_jobs)
+    best_iteration = None
+    if _is_xgb(model):
+        n_val = max(1, round(EARLY_STOPPING_FRACTION * len(engines)))
+        val = np.isin(groups[train_idx], engines[:n_val])
+        fit_idx, val_idx = train_idx[~val], train_idx[val]
+        model.set_params(n_estimators=XGB_MAX_ROUNDS, early_stopping_rounds=EARLY_STOPPING_ROUNDS)
+        model.fit(X[fit_idx], y[fit_idx], eval_set=[(X[val_idx], y[val_idx])], verbose=False)
+        best_iteration = int(model.best_iteration)
+    else:
+        model.fit(X[train_idx], y[train_idx])
+    err = model.predict(X[test_idx]) - y[test_idx]
+    return {
+        "fold": fold,
+        "sse": float(err @ err),
+        "rows": len(test_idx),
+        "best_iteration": best_iteration,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+# -----------------------
+# Search
+# -----------------------
+def _trial_path(cache_dir, key_parts):
+    return cache_dir / f"trial-{cache_key(*key_parts)}.json"
+
+
+def _write_json(path, payload):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(payload, sort_keys=True))
+    os.replace(tmp, path)
+
+
+def tune(name, estimator, X, y, groups, space=None, n_trials=27, eta=3, n_rungs=3,
+         n_splits=5, cpu_budget=None, spec=None, data_key=None, cache_dir=TRIALS_DIR, seed=42):
+    """
+    Successive-halving search over `space` (default SEARCH_SPACES[name])
+    for an unfitted estimator. n_trials configs start on 1 / eta**(n_rungs-1)
+    of each fold's training engines; each rung keeps the best 1/eta.
+
+    Fold fits of a rung run side by side in a pool of processes splitting
+    cpu_budget (default: all cores). data_key identifies the training
+    data in the cache (default: a hash of X, y, groups); spec, if given,
+    is part of the key too. Returns a TuningResult whose best_params can
+    go straight into estimator.set_params.
+    """
+    space = SEARCH_SPACES[name] if space is None else space
+    X = np.asarray(X, dtype=np.float32)
+    y = np.asarray(y, dtype=np.float64)
+    groups = np.asarray(groups)
+    data_key = data_key or data_digest(X, y, groups)
+    base = {k: v for k, v in estimator.get_params().items() if k != "n_jobs"}
+    key_base = [name, type(estimator).__name__, base, data_key,
+                spec.to_dict() if spec is not None else None, n_splits, seed]
+
+    rng = np.random.default_rng(seed)
+    configs = [sample_params(space, rng) for _ in range(n_trials)]
+    budget = cpu_budget or os.cpu_count() or 1
+    workers = max(1, min(budget, n_trials * n_splits))
+    n_jobs = max(1, budget // workers)
+
+    start = time.perf_counter()
+    trials, alive = [], list(range(n_trials))
+    with stage("tune", rows=len(y), trials=n_trials, model=name):
+        pool = ProcessPoolExecutor(workers, initializer=_init_worker,
+                                   initargs=(X, y, groups, n_splits)) if workers > 1 else None
+        if pool is None:
+            _init_worker(X, y, groups, n_splits)
+        try:
+            for rung in range(n_rungs):
+                fraction = float(eta) ** (rung - n_rungs + 1)
+                scored = _run_rung(pool, estimator, configs, alive, rung, fraction, key_base,
+                                   n_splits, n_jobs, seed, cache_dir)
+                trials.extend(scored)
+                scored.sort(key=lambda t: t["rmse"])
+                print(f"📊 {name} rung {rung}: {len(scored)} config(s) on {fraction:.0%} of "
+                      f"engines, best RMSE {scored[0]['rmse']:.2f}")
+                alive = [t["trial"] for t in scored[:max(1, len(scored) // eta)]]
+        finally:
+            if pool is None:
+                _data.clear()
+            else:
+                pool.shutdown()
+
+    final = [t for t in trials if t["rung"] == n_rungs - 1]
+    best = min(final, key=lambda t: t["rmse"])
+    best_params = dict(best["params"])
+    if best["best_iterations"]:
+        # Trees for a refit on all engines: the folds' early-stopping point
+        best_params["n_estimators"] = int(np.median(best["best_iterations"])) + 1
+    return TuningResult(name, best_params, best["rmse"], trials, time.perf_counter() - start)
+
+
+def _run_rung(pool, estimator, configs, alive, rung, fraction, key_base, n_splits, n_jobs,
+              seed, cache_dir):
+    """Score the alive configs of one rung: cached ones from disk, the rest fold by fold."""
+    scored, pending, folds = [], {}, {}
+    for trial in alive:
+        params = configs[trial]
+        path = _trial_path(cache_dir, [*key_base, params, fraction])
+        if path.exists():
+            scored.append({**json.loads(path.read_text()), "trial": trial, "rung": rung,
+                           "cached": True})
+            continue
+        folds[trial] = []
+        for fold in range(n_splits):
+            args = (estimator, params, fold, fraction, n_jobs, seed)
+            if pool is None:
+                folds[trial].append(_run_fold(*args))
+            else:
+                pending[pool.submit(_run_fold, *args)] = trial
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            folds[pending.pop(future)].append(future.result())
+
+    for trial, results in folds.items():
+        results.sort(key=lambda r: r["fold"])
+        record = {
+            "params": configs[trial],
+            "fraction": fraction,
+            "rmse": math.sqrt(sum(r["sse"] for r in results) / sum(r["rows"] for r in results)),
+            "fold_rmse": [math.sqrt(r["sse"] / r["rows"]) for r in results],
+            "best_iterations": [r["best_iteration"] for r in results
+                                if r["best_iteration"] is not None],
+            "seconds": sum(r["seconds"] for r in results),
+        }
+        _write_json(_trial_path(cache_dir, [*key_base, configs[trial], fraction]), record)
+        scored.append({**record, "trial": trial, "rung": rung, "cached": False})
+    return scored
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from src.data_loader import CMAPSS_COLUMNS, CMAPSS_DTYPES
+from src.feature_spec import DEFAULT_SPEC
+from src.features import add_features, add_rul
+from src.model_utils import save_model
+
+
+def make_cmapss(n_engines=8, min_life=3, max_life=60, seed=0):
+    """Synthetic C-MAPSS frame: engines 1..n, cycles 1..life, sensors drifting with wear."""
+    rng = np.random.default_rng(seed)
+    parts = []
+    for engine in range(1, n_engines + 1):
+        life = int(rng.integers(min_life, max_life + 1))
+        cycle = np.arange(1, life + 1)
+        settings = rng.normal(0, 1, (life, 3))
+        sensors = (500 + np.arange(21) * 10 + 0.05 * cycle[:, None]
+                   + rng.normal(0, 1, (life, 21)))
+        parts.append(np.column_stack([np.full(life, engine), cycle, settings, sensors]))
+    df = pd.DataFrame(np.concatenate(parts), columns=CMAPSS_COLUMNS)
+    return df.astype(CMAPSS_DTYPES)
+
+
+def write_cmapss(df, path):
+    """Whitespace-delimited file in the raw FD00x layout."""
+    np.savetxt(path, df[CMAPSS_COLUMNS].to_numpy(dtype=np.float64), fmt="%.6g")
+    return path
+
+
+@pytest.fixture
+def cmapss():
+    return make_cmapss
+
+
+@pytest.fixture(scope="session")
+def rf_package(tmp_path_factory):
+    """A small RF saved with its feature names + spec, like pipeline artifacts."""
+    df = add_features(add_rul(make_cmapss(20, 10, 80, seed=1)), DEFAULT_SPEC)
+    names = DEFAULT_SPEC.feature_names
+    rf = RandomForestRegressor(n_estimators=10, max_depth=8, random_state=0)
+    rf.fit(df[names], df["RUL"])
+    path = tmp_path_factory.mktemp("models") / "rf_model.pkl"
+    save_model(rf, path, names, DEFAULT_SPEC)
+    return path
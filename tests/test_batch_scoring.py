@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.batch_scoring import last_cycles, score_shard
+
+from conftest import write_cmapss
+
+
+@pytest.fixture
+def shard(cmapss, tmp_path):
+    # Engines interleaved cycle by cycle, so every chunk boundary splits histories
+    df = cmapss(12, 2, 50, seed=10).sort_values(["cycle", "engine_id"], kind="stable")
+    return df, write_cmapss(df, tmp_path / "shard.txt")
+
+
+@pytest.mark.parametrize("chunksize", [1, 7, 64])
+def test_small_chunks_match_one_chunk(rf_package, shard, tmp_path, chunksize):
+    df, path = shard
+    kwargs = dict(fmt="cmapss", model_paths=[rf_package], quantiles=(0.1, 0.9))
+    score_shard(path, out_path=tmp_path / "whole.parquet", chunksize=len(df), **kwargs)
+    rows, engines = score_shard(path, out_path=tmp_path / "chunked.parquet",
+                                chunksize=chunksize, **kwargs)
+    whole = pd.read_parquet(tmp_path / "whole.parquet")
+    chunked = pd.read_parquet(tmp_path / "chunked.parquet")
+    assert (rows, engines) == (len(df), 12)
+    assert list(chunked.columns) == ["engine_id", "cycle", "rul_rf", "rul_rf_p10", "rul_rf_p90"]
+    pd.testing.assert_frame_equal(chunked, whole)
+
+
+def test_last_cycles(shard):
+    df, path = shard
+    expected = df.groupby("engine_id")["cycle"].max()
+    for chunksize in (5, len(df)):
+        got = last_cycles(path, "cmapss", chunksize)
+        assert got.sort_index().to_dict() == expected.to_dict()
+
+
+@pytest.mark.parametrize("chunksize", [4, 1000])
+def test_out_of_order_cycles_are_rejected(rf_package, cmapss, tmp_path, chunksize):
+    df = cmapss(3, 10, 20, seed=11)
+    # Swap cycles 3 and 10 of engine 2: 1, 2, 10, 4, ...
+    rows = np.flatnonzero(df["engine_id"] == 2)[[2, 9]]
+    df.iloc[rows] = df.iloc[rows[::-1]].to_numpy()
+    path = write_cmapss(df, tmp_path / "bad.txt")
+    with pytest.raises(ValueError, match="engine 2 goes from cycle 10 back to 4"):
+        score_shard(path, "cmapss", [rf_package], tmp_path / "bad.parquet", chunksize)
+    assert not list(tmp_path.glob("bad.parquet*"))
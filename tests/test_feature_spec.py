@@ -0,0 +1,67 @@
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from src.feature_spec import DEFAULT_SPEC, FeatureSpec
+from src.features import add_features, compile_spec
+from src.model_utils import load_model, save_model
+
+
+def legacy_add_features(df):
+    """pipeline.add_features before the feature spec: rolling mean (w=5) of every sensor."""
+    feat_df = df.copy()
+    for col in [c for c in df.columns if "sensor_" in c]:
+        feat_df[f"{col}_rollmean_w5"] = df.groupby("engine_id")[col].transform(
+            lambda x: x.rolling(window=5, min_periods=1).mean()
+        )
+    return feat_df
+
+
+def legacy_default_features(df):
+    """src.features.add_features before the feature spec (DEFAULT_SPEC's ops)."""
+    df = df.copy()
+    for sensor in [7, 11, 12]:
+        df[f"sensor_{sensor}_rollmean_w5"] = (
+            df.groupby("engine_id")[f"sensor_{sensor}"]
+              .transform(lambda x: x.rolling(window=5, min_periods=1).mean())
+        )
+    for sensor in [7, 11, 12]:
+        df[f"sensor_{sensor}_diff"] = df.groupby("engine_id")[f"sensor_{sensor}"].diff().fillna(0)
+    return df
+
+
+def test_compile_spec_computes_only_required_columns(cmapss):
+    df = cmapss(6, 2, 30, seed=3)
+    legacy = legacy_add_features(df)
+    names = [c for c in legacy.columns if c.endswith("_rollmean_w5")]
+    spec = FeatureSpec.from_feature_names(names)
+    required = ["sensor_2_rollmean_w5", "sensor_15_rollmean_w5"]
+
+    out = compile_spec(spec, required)(df)
+    assert list(out.columns) == required
+    np.testing.assert_allclose(out.to_numpy(), legacy[required].to_numpy(), rtol=1e-6)
+
+
+def test_default_spec_matches_legacy_features(cmapss):
+    df = cmapss(6, 2, 30, seed=4)
+    legacy = legacy_default_features(df)
+    out = add_features(df, DEFAULT_SPEC)
+    names = DEFAULT_SPEC.feature_names
+    assert set(names) <= set(legacy.columns)
+    np.testing.assert_allclose(out[names].to_numpy(), legacy[names].to_numpy(), rtol=1e-6)
+
+
+def test_spec_survives_save_and_load(tmp_path, cmapss):
+    spec = FeatureSpec.from_feature_names(["sensor_3", "sensor_4_rollmean_w10", "sensor_9_diff_3"])
+    df = add_features(cmapss(3, 5, 20), spec)
+    X = df[spec.feature_names].to_numpy(np.float32)
+    rf = RandomForestRegressor(n_estimators=2, random_state=0).fit(X, df["cycle"])
+    for mmap in (False, True):
+        path = tmp_path / f"model_{mmap}.pkl"
+        save_model(rf, path, spec.feature_names, spec, mmap=mmap)
+        model, names, loaded = load_model(path, with_spec=True)
+        assert loaded == spec
+        assert names == spec.feature_names
+        # The two-value form callers have always unpacked still works
+        model, names = load_model(path)
+        assert names == spec.feature_names
+        np.testing.assert_allclose(model.predict(X), rf.predict(X), rtol=1e-6)
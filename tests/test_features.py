@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from src.feature_spec import FeatureSpec
+from src.features import _sort_by_engine, compile_spec, lagged_diff, rolling_mean
+
+SENSORS = ["sensor_2", "sensor_7", "sensor_11"]
+
+
+@pytest.fixture
+def shuffled(cmapss):
+    """12 engines of 1-9 cycles (two of a single cycle), rows in random order."""
+    df = cmapss(12, 1, 10, seed=6)
+    return df.sample(frac=1, random_state=0)
+
+
+def pandas_rolling(df, col, window):
+    by_engine = df.sort_values(["engine_id", "cycle"]).groupby("engine_id")[col]
+    return (by_engine.rolling(window, min_periods=1).mean()
+            .reset_index(level=0, drop=True).reindex(df.index))
+
+
+def pandas_diff(df, col, lag):
+    return df.sort_values(["engine_id", "cycle"]).groupby("engine_id")[col].diff(lag).reindex(df.index)
+
+
+@pytest.mark.parametrize("window", [1, 2, 5, 20])
+def test_rolling_mean_matches_pandas(shuffled, window):
+    order, starts = _sort_by_engine(shuffled)
+    assert order is not None
+    values = shuffled[SENSORS].to_numpy()[order]
+    out = np.empty((len(shuffled), len(SENSORS)))
+    out[order] = rolling_mean(values, starts, window)
+    for i, col in enumerate(SENSORS):
+        np.testing.assert_allclose(out[:, i], pandas_rolling(shuffled, col, window), rtol=1e-9)
+
+
+def test_rolling_mean_skips_nans_like_pandas(shuffled):
+    df = shuffled.copy()
+    df.loc[df.sample(frac=0.3, random_state=1).index, "sensor_7"] = np.nan
+    order, starts = _sort_by_engine(df)
+    out = np.empty((len(df), len(SENSORS)))
+    out[order] = rolling_mean(df[SENSORS].to_numpy()[order], starts, 3)
+    for i, col in enumerate(SENSORS):
+        np.testing.assert_allclose(out[:, i], pandas_rolling(df, col, 3), rtol=1e-9)
+
+
+@pytest.mark.parametrize("lag", [1, 3])
+def test_lagged_diff_matches_pandas(shuffled, lag):
+    order, starts = _sort_by_engine(shuffled)
+    out = np.empty((len(shuffled), len(SENSORS)))
+    out[order] = lagged_diff(shuffled[SENSORS].to_numpy()[order], starts, lag)
+    for i, col in enumerate(SENSORS):
+        np.testing.assert_allclose(out[:, i], pandas_diff(shuffled, col, lag), rtol=1e-9)
+
+
+def test_compile_spec_matches_pandas(shuffled):
+    names = ["sensor_2_rollmean_w5", "sensor_7_rollmean_w5", "sensor_11_rollmean_w3",
+             "sensor_7_diff", "sensor_11_diff_2"]
+    out = compile_spec(FeatureSpec.from_feature_names(names))(shuffled)
+    assert list(out.columns) == names
+    assert out.index.equals(shuffled.index)
+    expected = {
+        "sensor_2_rollmean_w5": pandas_rolling(shuffled, "sensor_2", 5),
+        "sensor_7_rollmean_w5": pandas_rolling(shuffled, "sensor_7", 5),
+        "sensor_11_rollmean_w3": pandas_rolling(shuffled, "sensor_11", 3),
+        "sensor_7_diff": pandas_diff(shuffled, "sensor_7", 1).fillna(0),
+        "sensor_11_diff_2": pandas_diff(shuffled, "sensor_11", 2).fillna(0),
+    }
+    for name, values in expected.items():
+        np.testing.assert_allclose(out[name], values, rtol=1e-9, err_msg=name)
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from src.feature_spec import DEFAULT_SPEC
+from src.features import add_features, add_rul
+from src.flat_forest import FlatForest
+from src.model_utils import compact_forest
+
+
+@pytest.fixture(scope="module")
+def forest():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(600, 5)).astype(np.float32)
+    # Coarse values force many rows to sit exactly on the split thresholds
+    X[:, 0] = np.round(X[:, 0], 1)
+    y = X[:, 0] * 3 + np.sin(X[:, 1] * 2) + rng.normal(scale=0.1, size=600)
+    return RandomForestRegressor(n_estimators=15, max_depth=10, random_state=0).fit(X, y), X
+
+
+def at_thresholds(forest):
+    """Rows whose split feature equals, or is one float32 step from, every split threshold."""
+    rows = []
+    for est in forest.estimators_:
+        tree = est.tree_
+        split = tree.children_left != -1
+        t = tree.threshold[split].astype(np.float32)
+        for x in (t, np.nextafter(t, np.float32(-np.inf)), np.nextafter(t, np.float32(np.inf))):
+            row = np.zeros((len(x), tree.n_features), dtype=np.float32)
+            row[np.arange(len(x)), tree.feature[split]] = x
+            rows.append(row)
+    return np.concatenate(rows)
+
+
+@pytest.mark.parametrize("dtype, rtol", [(np.float64, 1e-12), (np.float32, 1e-6)])
+def test_predict_matches_sklearn(forest, dtype, rtol):
+    rf, X = forest
+    flat = FlatForest.from_sklearn(rf, dtype=dtype)
+    for rows in (X, at_thresholds(rf)):
+        np.testing.assert_allclose(flat.predict(rows), rf.predict(rows), rtol=rtol)
+        # Leaves reached must be the same ones, not just close predictions
+        per_tree = np.column_stack([est.predict(rows) for est in rf.estimators_])
+        np.testing.assert_allclose(flat.predict_trees(rows), per_tree, rtol=rtol)
+
+
+def test_float32_thresholds_round_down(forest):
+    rf, _ = forest
+    flat64 = FlatForest.from_sklearn(rf)
+    flat32 = FlatForest.from_sklearn(rf, dtype=np.float32)
+    split = ~flat64.is_leaf
+    assert (flat32.threshold[split].astype(np.float64) <= flat64.threshold[split]).all()
+
+
+def test_tree_subset_and_depth_cap(forest):
+    rf, X = forest
+    flat = FlatForest.from_sklearn(rf, trees=[3, 7], max_depth=4)
+    assert flat.n_trees == 2 and flat.depth == 4
+    expected = []
+    for est in (rf.estimators_[3], rf.estimators_[7]):
+        # Deepest node at depth <= 4 on each row's decision path
+        path = est.decision_path(X).toarray().astype(bool)
+        depth = path.cumsum(axis=1) - 1
+        node = np.where(path & (depth <= 4), np.arange(path.shape[1]), -1).max(axis=1)
+        expected.append(est.tree_.value[node, 0, 0])
+    np.testing.assert_allclose(flat.predict_trees(X), np.column_stack(expected), rtol=1e-12)
+
+
+def test_compaction_stays_within_budget_on_held_out_engines(cmapss):
+    train = add_features(add_rul(cmapss(30, 20, 120, seed=11)), DEFAULT_SPEC)
+    held = add_features(add_rul(cmapss(16, 20, 120, seed=12)), DEFAULT_SPEC)
+    names = DEFAULT_SPEC.feature_names
+    rf = RandomForestRegressor(n_estimators=40, random_state=0).fit(
+        train[names].to_numpy(np.float32), train["RUL"])
+
+    X, y = held[names].to_numpy(np.float32), held["RUL"].to_numpy()
+    budget = 2.0
+    flat, report = compact_forest(rf, X, y, groups=held["engine_id"].to_numpy(),
+                                  rmse_budget=budget)
+    assert report.chosen["rmse"] <= report.baseline["rmse"] + budget
+    assert flat.nbytes < FlatForest.from_sklearn(rf).nbytes
+
+    full = np.sqrt(np.mean((rf.predict(X) - y) ** 2))
+    compact = np.sqrt(np.mean((flat.predict(X) - y) ** 2))
+    assert compact <= full + budget
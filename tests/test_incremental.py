@@ -0,0 +1,83 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from src import incremental
+from src.feature_spec import DEFAULT_SPEC, FeatureSpec
+from src.features import add_features
+from src.incremental import IncrementalFeatures
+
+SPEC = FeatureSpec.from_feature_names(
+    ["sensor_4", "sensor_7_rollmean_w5", "sensor_7_diff", "sensor_11_rollmean_w10",
+     "sensor_11_rollmean_w3", "sensor_12_diff_4", "sensor_12_rollmean_w5"])
+
+
+def stream(inc, rows):
+    """Push rows one cycle at a time in their given order; features indexed like rows."""
+    return {idx: inc.update(row["engine_id"], row) for idx, row in rows.iterrows()}
+
+
+def check(streamed, expected):
+    names = list(expected.columns)
+    got = np.array([[streamed[idx][n] for n in names] for idx in expected.index])
+    np.testing.assert_allclose(got, expected.to_numpy(), rtol=1e-9, atol=1e-9)
+
+
+@pytest.fixture
+def fleet(cmapss):
+    # Engines interleaved cycle by cycle, like a live feed; a few NaN readings
+    df = cmapss(5, 1, 40, seed=9).sort_values(["cycle", "engine_id"])
+    df.loc[df.sample(frac=0.05, random_state=2).index, "sensor_11"] = np.nan
+    return df
+
+
+def test_streaming_matches_add_features(fleet):
+    expected = add_features(fleet, SPEC)[SPEC.feature_names]
+    check(stream(IncrementalFeatures(SPEC), fleet), expected)
+
+
+def test_default_spec_streaming(fleet):
+    expected = add_features(fleet, DEFAULT_SPEC)[DEFAULT_SPEC.feature_names]
+    check(stream(IncrementalFeatures(), fleet), expected)
+
+
+def test_resync_boundary(fleet, monkeypatch):
+    # Resync every 7 cycles so every engine crosses several boundaries
+    monkeypatch.setattr(incremental, "RESYNC_EVERY", 7)
+    expected = add_features(fleet, SPEC)[SPEC.feature_names]
+    check(stream(IncrementalFeatures(SPEC), fleet), expected)
+
+
+def test_long_history_past_resync():
+    # One engine past the real RESYNC_EVERY, values with a large offset
+    n = incremental.RESYNC_EVERY + 300
+    rng = np.random.default_rng(3)
+    spec = FeatureSpec.from_feature_names(["sensor_2_rollmean_w5", "sensor_2_diff"])
+    values = 1e6 + rng.normal(size=n)
+    inc = IncrementalFeatures(spec)
+    got = np.array([inc.update_values(1, [v]) for v in values])
+    roll = np.convolve(values, np.ones(5) / 5)[4:n]
+    np.testing.assert_allclose(got[4:, 0], roll, rtol=1e-12)
+    np.testing.assert_allclose(got[1:, 1], np.diff(values), atol=1e-6)
+
+
+def test_snapshot_restore_continues(fleet):
+    expected = add_features(fleet, SPEC)[SPEC.feature_names]
+    half = len(fleet) // 2
+    inc = IncrementalFeatures(SPEC)
+    streamed = stream(inc, fleet.iloc[:half])
+    restored = IncrementalFeatures.restore(pickle.loads(pickle.dumps(inc.snapshot())))
+    assert len(restored) == len(inc)
+    streamed.update(stream(restored, fleet.iloc[half:]))
+    check(streamed, expected)
+
+
+def test_reset_starts_engine_over(fleet):
+    inc = IncrementalFeatures(SPEC)
+    stream(inc, fleet)
+    engine = fleet[fleet["engine_id"] == 1]
+    inc.reset(1)
+    assert 1 not in inc
+    expected = add_features(engine, SPEC)[SPEC.feature_names]
+    check(stream(inc, engine), expected)
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from sklearn.base import BaseEstimator, RegressorMixin
+from sklearn.ensemble import RandomForestRegressor
+
+from src.model_utils import cross_validate, train_random_forest
+
+
+class EngineProbe(RegressorMixin, BaseEstimator):
+    """Predicts each row's index (column 1), or -1 for rows of engines it was fitted on."""
+
+    def __init__(self, n_jobs=None):
+        self.n_jobs = n_jobs
+
+    def fit(self, X, y):
+        self.engines_ = np.unique(X[:, 0])
+        return self
+
+    def predict(self, X):
+        return np.where(np.isin(X[:, 0], self.engines_), -1.0, X[:, 1])
+
+
+def engine_data(n_engines=23, seed=0):
+    rng = np.random.default_rng(seed)
+    groups = np.repeat(np.arange(n_engines), rng.integers(3, 12, n_engines))
+    rng.shuffle(groups)
+    X = np.column_stack([groups, np.arange(len(groups)), rng.normal(size=(len(groups), 3))])
+    y = X[:, 2] * 3 + rng.normal(scale=0.1, size=len(groups))
+    return X.astype(np.float32), y, groups
+
+
+def test_out_of_fold_rows_come_from_models_without_their_engine():
+    X, y, groups = engine_data()
+    cv = cross_validate(EngineProbe(), X, y, groups, n_splits=5, n_workers=1, n_jobs=1)
+    # Every row is predicted, once, by the fold model that never saw its engine
+    np.testing.assert_array_equal(cv.oof_pred, np.arange(len(y)))
+    assert len(cv.fold_rmse) == 5
+
+
+def test_pool_matches_inline():
+    X, y, groups = engine_data(seed=1)
+    rf = RandomForestRegressor(n_estimators=10, random_state=0)
+    inline = cross_validate(rf, X, y, groups, n_splits=4, n_workers=1, n_jobs=2)
+    pooled = cross_validate(rf, X, y, groups, n_splits=4, n_workers=2, n_jobs=2)
+    np.testing.assert_allclose(pooled.oof_pred, inline.oof_pred)
+    assert pooled.rmse == pytest.approx(inline.rmse)
+    assert pooled.fold_rmse == pytest.approx(inline.fold_rmse)
+
+
+def test_train_random_forest_returns_the_refit_model():
+    X, y, groups = engine_data(seed=2)
+    model = train_random_forest(X, y, groups, n_estimators=5, n_workers=1)
+    assert isinstance(model, RandomForestRegressor)
+    assert model.predict(X).shape == y.shape
@@ -0,0 +1,116 @@
+from itertools import product
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.optimize import linear_sum_assignment
+
+from src.optimizer import _feasible, _max_value, optimize_assignment, route_matrices
+
+
+def random_counts(rng, n, k):
+    """Engines per level summing to n, some levels possibly empty."""
+    return np.bincount(rng.integers(k, size=n), minlength=k)
+
+
+def lsa_value(value, counts, allowed):
+    """Optimum via linear_sum_assignment with each level expanded into counts[j] slots."""
+    slots = np.repeat(np.arange(value.shape[1]), counts)
+    big = 1e9
+    cost = np.where(allowed[:, slots], -value[:, slots], big)
+    rows, cols = linear_sum_assignment(cost)
+    if cost[rows, cols].max(initial=0) >= big:
+        return None
+    return -cost[rows, cols].sum()
+
+
+def brute_feasible(allowed, counts):
+    n, k = allowed.shape
+    return any(np.array_equal(np.bincount(levels, minlength=k), counts)
+               and allowed[np.arange(n), levels].all()
+               for levels in map(np.array, product(range(k), repeat=n)))
+
+
+def check_assignment(level, counts, allowed):
+    assert np.array_equal(np.bincount(level, minlength=len(counts)), counts)
+    assert allowed[np.arange(len(level)), level].all()
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_max_value_matches_linear_sum_assignment(seed):
+    rng = np.random.default_rng(seed)
+    n, k = int(rng.integers(1, 12)), int(rng.integers(1, 5))
+    counts = random_counts(rng, n, k)
+    # Every other seed draws from a few integers, so many assignments tie
+    value = (rng.integers(0, 3, (n, k)).astype(float) if seed % 2
+             else rng.normal(size=(n, k)))
+    allowed = rng.random((n, k)) < 0.7
+
+    expected = lsa_value(value, counts, allowed)
+    assert _feasible(allowed, counts) == (expected is not None)
+    if expected is None:
+        with pytest.raises(ValueError, match="No feasible assignment"):
+            _max_value(value, counts, allowed)
+    else:
+        level = _max_value(value, counts, allowed)
+        check_assignment(level, counts, allowed)
+        assert value[np.arange(n), level].sum() == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_feasible_matches_brute_force(seed):
+    rng = np.random.default_rng(100 + seed)
+    n, k = int(rng.integers(1, 7)), int(rng.integers(1, 4))
+    counts = random_counts(rng, n, k)
+    allowed = rng.random((n, k)) < 0.5
+    assert _feasible(allowed, counts) == brute_feasible(allowed, counts)
+
+
+def test_all_ties_fill_counts_exactly():
+    counts = np.array([5, 0, 3, 2])
+    level = _max_value(np.zeros((10, 4)), counts, np.ones((10, 4), bool))
+    check_assignment(level, counts, np.ones((10, 4), bool))
+
+
+def fleet(rng, n):
+    fits = pd.DataFrame({"slope": -rng.uniform(0.05, 1.0, n),
+                         "intercept": rng.uniform(60, 200, n)},
+                        index=[f"E{i}" for i in range(n)])
+    fits.iloc[0, 0] = 0.01  # one engine not degrading: never reaches the limit
+    return fits
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("objective", ["value", "earliest"])
+def test_optimize_assignment_matches_brute_force(seed, objective):
+    rng = np.random.default_rng(200 + seed)
+    n = int(rng.integers(2, 8))
+    fits = fleet(rng, n)
+    stress_map = {"short": 1.4, "mid": 1.0, "long": 0.7}
+    routes = list(stress_map)
+    counts = dict(zip(routes, random_counts(rng, n, len(routes)).tolist()))
+
+    predictive, value = route_matrices(fits, [stress_map[r] for r in routes])
+    value = np.nan_to_num(value, nan=0.0, posinf=0.0, neginf=0.0)
+
+    def score(levels):
+        earliest = predictive[np.arange(n), levels].min()
+        total = value[np.arange(n), levels].sum()
+        return (earliest, total) if objective == "earliest" else (total,)
+
+    target = [routes.index(r) for r in routes for _ in range(counts[r])]
+    best = max(score(np.array(levels)) for levels in product(range(len(routes)), repeat=n)
+               if sorted(levels) == target)
+
+    got = optimize_assignment(fits, counts, stress_map, objective)
+    assert list(got.index) == list(fits.index)
+    assert got.value_counts().reindex(routes, fill_value=0).tolist() == list(counts.values())
+    assert score(np.array([routes.index(r) for r in got])) == pytest.approx(best)
+
+
+def test_optimize_assignment_rejects_bad_counts():
+    fits = fleet(np.random.default_rng(0), 3)
+    with pytest.raises(ValueError, match="sum to the number of engines"):
+        optimize_assignment(fits, {"a": 1, "b": 1}, {"a": 1.0, "b": 1.2})
+    with pytest.raises(ValueError, match="objective"):
+        optimize_assignment(fits, {"a": 3}, {"a": 1.0}, objective="fastest")
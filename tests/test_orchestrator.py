@@ -0,0 +1,38 @@
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+
+from src.orchestrator import TrainJob, run_jobs
+
+
+def test_one_thread_jobs_run_side_by_side(tmp_path):
+    # Two 1-thread jobs cross-validate inline on their own threads at once
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 4)).astype(np.float32)
+    y = X @ np.array([1.0, -2.0, 0.5, 0.0]) + rng.normal(scale=0.1, size=400)
+    groups = np.repeat(np.arange(20), 20)
+    jobs = [TrainJob("rf", RandomForestRegressor(n_estimators=50, random_state=0)),
+            TrainJob("lr", LinearRegression())]
+    results = run_jobs(jobs, X, y, groups, cpu_budget=2, models_dir=tmp_path,
+                       on_event=lambda event: None)
+    assert [r.error for r in results] == [None, None]
+    assert [r.threads for r in results] == [1, 1]
+    assert all(np.isfinite(r.cv.rmse) for r in results)
+
+
+def test_multi_worker_job_next_to_a_threaded_job(tmp_path):
+    # The RF job gets 2 threads, so its folds run in a process pool started
+    # from a job thread while the other job fits on its own thread
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(400, 4)).astype(np.float32)
+    y = X @ np.array([1.0, -2.0, 0.5, 0.0]) + rng.normal(scale=0.1, size=400)
+    groups = np.repeat(np.arange(20), 20)
+    jobs = [TrainJob("rf", RandomForestRegressor(n_estimators=20, random_state=0), threads=2),
+            TrainJob("lr", LinearRegression(), threads=1)]
+    results = run_jobs(jobs, X, y, groups, cpu_budget=3, models_dir=tmp_path,
+                       on_event=lambda event: None)
+    assert [r.error for r in results] == [None, None]
+    assert [r.threads for r in results] == [2, 1]
+    inline = run_jobs(jobs[:1], X, y, groups, cpu_budget=1, models_dir=tmp_path / "inline",
+                      on_event=lambda event: None)[0]
+    np.testing.assert_allclose(results[0].cv.oof_pred, inline.cv.oof_pred)
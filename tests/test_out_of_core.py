@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_loader import load_cmapss
+from src.feature_spec import DEFAULT_SPEC, FeatureSpec
+from src.features import add_features, add_rul
+from src.out_of_core import engine_stats, iter_featured, sample_by_engine, spill_features
+
+from conftest import write_cmapss
+
+SPEC = FeatureSpec.from_feature_names(
+    ["sensor_2", *DEFAULT_SPEC.feature_names, "sensor_4_rollmean_w10", "sensor_9_diff_3"])
+
+
+@pytest.fixture
+def fleet_file(cmapss, tmp_path):
+    # Interleaved engines, a few of them only 1-3 cycles long
+    df = cmapss(15, 1, 40, seed=12).sort_values(["cycle", "engine_id"], kind="stable")
+    return write_cmapss(df, tmp_path / "fleet.txt")
+
+
+@pytest.mark.parametrize("chunksize", [3, 50, 100_000])
+def test_iter_featured_matches_in_memory(fleet_file, chunksize):
+    df = load_cmapss(fleet_file)
+    expected = add_rul(add_features(df, SPEC))
+    stats = engine_stats(fleet_file, chunksize)
+    got = pd.concat(iter_featured(fleet_file, SPEC, stats["max"], chunksize), ignore_index=True)
+    columns = ["engine_id", "cycle", *SPEC.feature_names, "RUL"]
+    np.testing.assert_allclose(got[columns].to_numpy(np.float64),
+                               expected[columns].to_numpy(np.float64), rtol=1e-9)
+
+
+def test_spill_and_sample_keep_engines_whole(fleet_file, tmp_path):
+    train, hold, stats = spill_features(fleet_file, SPEC, tmp_path / "spill", holdout=0.2,
+                                        chunksize=40)
+    train_engines = np.unique(np.concatenate([np.asarray(g) for _, _, g in train]))
+    hold_engines = np.unique(np.concatenate([np.asarray(g) for _, _, g in hold]))
+    assert len(hold_engines) == round(0.2 * len(stats))
+    assert not set(train_engines) & set(hold_engines)
+    assert set(train_engines) | set(hold_engines) == set(stats.index)
+    # Every row of an engine lands on the side the engine was assigned to
+    assert train.rows == stats["size"].reindex(train_engines).sum()
+    assert hold.rows == stats["size"].reindex(hold_engines).sum()
+
+    X_rf, y_rf = sample_by_engine(train, stats["size"].reindex(train_engines), 5)
+    engine_of = {r.tobytes(): e for X, _, g in train for r, e in zip(np.asarray(X), g)}
+    hold_rows = {r.tobytes() for X, _, _ in hold for r in np.asarray(X)}
+    sampled = pd.Series([engine_of.get(r.tobytes()) for r in X_rf])
+    assert sampled.notna().all()
+    assert not {r.tobytes() for r in X_rf} & hold_rows
+    # Engines of up to 5 rows are kept whole, longer ones thinned
+    per_engine = sampled.value_counts().reindex(train_engines, fill_value=0)
+    short = stats["size"].reindex(train_engines) <= 5
+    assert short.any() and (per_engine[short] == stats["size"].reindex(train_engines)[short]).all()
+    assert len(y_rf) < train.rows
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.risk_index import STATUSES, RiskIndex, status_of
+
+
+@pytest.fixture
+def forecasts():
+    rng = np.random.default_rng(0)
+    cycles = rng.normal(250, 200, 500)
+    cycles[::50] = np.nan
+    return pd.DataFrame({"predictive_cycles": cycles,
+                         "Model": rng.choice(["GE CF34-3B1", "PW120A"], 500)},
+                        index=[f"E{i}" for i in range(500)])
+
+
+def expected_counts(forecasts, model=None, status=None):
+    rows = forecasts if model is None else forecasts[forecasts["Model"] == model]
+    found = pd.Series([status_of(c) for c in rows["predictive_cycles"]], dtype=object)
+    if status is not None:
+        found = found[found == status]
+    return {label: int((found == label).sum()) for label in STATUSES}
+
+
+@pytest.mark.parametrize("model", [None, "PW120A"])
+@pytest.mark.parametrize("status", [None, *STATUSES])
+def test_status_counts_match_brute_force(forecasts, model, status):
+    index = RiskIndex.from_forecasts(forecasts)
+    filters = {} if model is None else {"model": model}
+    got = index.status_counts(status=status, **filters)
+    assert {label: got[label] for label in STATUSES} == expected_counts(forecasts, model, status)
+
+
+def test_updates_keep_top_and_counts_in_step(forecasts):
+    index = RiskIndex.from_forecasts(forecasts)
+    forecasts = forecasts.copy()
+    forecasts.iloc[:40, 0] = np.linspace(-10, 400, 40)
+    assert index.sync(forecasts) == 40
+    order = forecasts["predictive_cycles"].fillna(np.inf).sort_values(kind="stable")
+    assert [e for e, _ in index.top(10)] == order.index[:10].tolist()
+    assert index.status_counts(status="At Risk")["At Risk"] == expected_counts(forecasts)["At Risk"]
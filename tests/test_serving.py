@@ -0,0 +1,125 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from src.inference import predict_frame
+from src.serving import PredictionServer, _request
+
+
+def payload(df, engine, model="rf"):
+    cycles = df[df["engine_id"] == engine].drop(columns=["engine_id"])
+    return {"model": model, "engine_id": engine, "cycles": cycles.to_dict(orient="records")}
+
+
+async def raw_request(port, data):
+    """Send raw bytes, return everything the server sends before closing."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(data)
+    await writer.drain()
+    response = await asyncio.wait_for(reader.read(), 10)
+    writer.close()
+    return response
+
+
+def serve(rf_package, scenario, **kwargs):
+    """Run scenario(port, server) against a server on an ephemeral port."""
+    async def main():
+        server = PredictionServer([rf_package], threads=1, **kwargs)
+        _, port = await server.start("127.0.0.1", 0)
+        try:
+            return await scenario(port, server)
+        finally:
+            await server.stop()
+    return asyncio.run(main())
+
+
+def test_predict_matches_predict_frame(rf_package, cmapss):
+    df = cmapss(3, 20, 40, seed=5)
+
+    async def scenario(port, server):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            return [await _request(reader, writer, "127.0.0.1", "POST", "/predict", payload(df, e))
+                    for e in (1, 2, 3)]
+        finally:
+            writer.close()
+
+    expected = predict_frame(rf_package, df)
+    last = df.groupby("engine_id").tail(1).index
+    for (status, body), row in zip(serve(rf_package, scenario), last):
+        assert status == 200
+        assert body["cycle"] == df.loc[row, "cycle"]
+        assert body["rul"] == pytest.approx(float(expected[row]), rel=1e-5)
+
+
+def test_concurrent_requests_are_batched(rf_package, cmapss):
+    df = cmapss(16, 20, 40, seed=6)
+
+    async def scenario(port, server):
+        async def one(engine):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            try:
+                return await _request(reader, writer, "127.0.0.1", "POST", "/predict",
+                                      payload(df, engine))
+            finally:
+                writer.close()
+        results = await asyncio.gather(*(one(e) for e in range(1, 17)))
+        return results, server.metrics()["models"]["rf"]
+
+    results, metrics = serve(rf_package, scenario, max_batch=16, max_wait_ms=200)
+    assert [status for status, _ in results] == [200] * 16
+    assert metrics["requests"] == 16
+    assert metrics["max_batch"] > 1
+    expected = predict_frame(rf_package, df)[df.groupby("engine_id").tail(1).index]
+    np.testing.assert_allclose([body["rul"] for _, body in results], expected, rtol=1e-5)
+
+
+@pytest.mark.parametrize("length", [b"abc", b"-1"])
+def test_bad_content_length_is_400_and_closes(rf_package, length):
+    async def scenario(port, server):
+        return await raw_request(port, b"POST /predict HTTP/1.1\r\nHost: x\r\n"
+                                       b"Content-Length: " + length + b"\r\n\r\n{}")
+
+    response = serve(rf_package, scenario)
+    assert response.startswith(b"HTTP/1.1 400 ")
+    assert b"Connection: close" in response
+    assert b"Invalid Content-Length" in response.split(b"\r\n\r\n", 1)[1]
+
+
+def test_missing_sensor_in_window_is_400(rf_package, cmapss):
+    df = cmapss(1, 20, 20, seed=7)
+    body = payload(df, 1)
+    body["cycles"][-1]["sensor_2"] = None
+
+    async def scenario(port, server):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            bad = await _request(reader, writer, "127.0.0.1", "POST", "/predict", body)
+            # Same keep-alive connection still serves a good request afterwards
+            good = await _request(reader, writer, "127.0.0.1", "POST", "/predict", payload(df, 1))
+            return bad, good
+        finally:
+            writer.close()
+
+    (status, error), (good_status, _) = serve(rf_package, scenario)
+    assert status == 400 and "sensor_2" in error["error"]
+    assert good_status == 200
+
+
+@pytest.mark.parametrize("path, body, status", [
+    ("/predict", {"model": "nope", "cycles": []}, 404),
+    ("/predict", {"cycles": []}, 400),
+    ("/predict", {"cycles": [{"cycle": 1}]}, 400),
+    ("/nowhere", {}, 404),
+])
+def test_request_errors(rf_package, path, body, status):
+    async def scenario(port, server):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            return await _request(reader, writer, "127.0.0.1", "POST", path, body)
+        finally:
+            writer.close()
+
+    got, payload = serve(rf_package, scenario)
+    assert got == status and "error" in payload
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from src.feature_spec import DEFAULT_SPEC, FeatureSpec
+from src.tuning import tune
+
+SPACE = {"max_depth": [2, 4, 8], "min_samples_leaf": [1, 5]}
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(240, 3)).astype(np.float32)
+    y = X[:, 0] * 2 + rng.normal(scale=0.1, size=240)
+    return X, y, np.repeat(np.arange(12), 20)
+
+
+def run(data, cache_dir, **kwargs):
+    X, y, groups = data
+    kwargs = {"spec": DEFAULT_SPEC, **kwargs}
+    return tune("rf", RandomForestRegressor(n_estimators=5, random_state=0), X, y, groups,
+                space=SPACE, n_trials=4, eta=2, n_rungs=2, n_splits=3, cpu_budget=1,
+                cache_dir=cache_dir, **kwargs)
+
+
+def test_successive_halving(data, tmp_path):
+    result = run(data, tmp_path)
+    assert [t["rung"] for t in result.trials] == [0] * 4 + [1] * 2
+    assert [t["fraction"] for t in result.trials] == [0.5] * 4 + [1.0] * 2
+    rung0 = sorted(result.trials[:4], key=lambda t: t["rmse"])
+    # The best half of rung 0 moves on to the full training engines
+    assert {t["trial"] for t in result.trials[4:]} == {t["trial"] for t in rung0[:2]}
+    assert result.best_params == min(result.trials[4:], key=lambda t: t["rmse"])["params"]
+
+
+def test_second_run_hits_the_cache(data, tmp_path):
+    first = run(data, tmp_path)
+    second = run(data, tmp_path)
+    assert not any(t["cached"] for t in first.trials)
+    assert all(t["cached"] for t in second.trials)
+    assert second.best_params == first.best_params
+    assert second.best_rmse == first.best_rmse
+
+
+@pytest.mark.parametrize("change", [
+    {"spec": FeatureSpec.from_feature_names(["sensor_2", "sensor_7_rollmean_w10"])},
+    {"spec": None},
+    {"data_key": "another-dataset"},
+])
+def test_changed_spec_or_data_misses_the_cache(data, tmp_path, change):
+    run(data, tmp_path)
+    result = run(data, tmp_path, **change)
+    assert not any(t["cached"] for t in result.trials)
+
+
+def test_changed_data_misses_the_cache(data, tmp_path):
+    X, y, groups = data
+    run(data, tmp_path)
+    result = run((X, y + 1.0, groups), tmp_path)
+    assert not any(t["cached"] for t in result.trials)
+
+
+def test_pool_run_fills_the_cache_for_inline_run(data, tmp_path):
+    X, y, groups = data
+    pooled = tune("rf", RandomForestRegressor(n_estimators=5, random_state=0), X, y, groups,
+                  space=SPACE, n_trials=4, eta=2, n_rungs=2, n_splits=3, cpu_budget=2,
+                  spec=DEFAULT_SPEC, cache_dir=tmp_path)
+    inline = run(data, tmp_path)
+    assert all(t["cached"] for t in inline.trials)
+    assert inline.best_params == pooled.best_params